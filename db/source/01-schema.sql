@@ -0,0 +1,79 @@
+-- Source (MySQL) schema, as modelled in etl/src/source_models.py and
+-- source-schema.mwb. Loaded by `make elocal` into the dw_ecommerce database.
+
+CREATE TABLE `Couriers` (
+    `id`          INTEGER NOT NULL AUTO_INCREMENT,
+    `name`        VARCHAR(255),
+    `createdAt`   DATETIME NOT NULL,
+    `updatedAt`   DATETIME NOT NULL,
+    PRIMARY KEY (`id`)
+);
+
+CREATE TABLE `Products` (
+    `id`          INTEGER NOT NULL AUTO_INCREMENT,
+    `productCode` VARCHAR(255),
+    `category`    VARCHAR(255),
+    `description` VARCHAR(255),
+    `name`        VARCHAR(255),
+    `price`       FLOAT,
+    `createdAt`   DATETIME NOT NULL,
+    `updatedAt`   DATETIME NOT NULL,
+    PRIMARY KEY (`id`)
+);
+
+CREATE TABLE `Users` (
+    `id`          INTEGER NOT NULL AUTO_INCREMENT,
+    `username`    VARCHAR(255),
+    `firstName`   VARCHAR(255),
+    `lastName`    VARCHAR(255),
+    `address1`    VARCHAR(255),
+    `address2`    VARCHAR(255),
+    `city`        VARCHAR(255),
+    `country`     VARCHAR(255),
+    `zipCode`     VARCHAR(255),
+    `phoneNumber` VARCHAR(255),
+    `dateOfBirth` VARCHAR(255),
+    `gender`      VARCHAR(255),
+    `createdAt`   DATETIME NOT NULL,
+    `updatedAt`   DATETIME NOT NULL,
+    PRIMARY KEY (`id`)
+);
+
+CREATE TABLE `Riders` (
+    `id`          INTEGER NOT NULL AUTO_INCREMENT,
+    `firstName`   VARCHAR(255),
+    `lastName`    VARCHAR(255),
+    `vehicleType` VARCHAR(255),
+    `courierId`   INTEGER,
+    `age`         INTEGER,
+    `gender`      VARCHAR(255),
+    `createdAt`   DATETIME NOT NULL,
+    `updatedAt`   DATETIME NOT NULL,
+    PRIMARY KEY (`id`),
+    FOREIGN KEY (`courierId`) REFERENCES `Couriers` (`id`)
+);
+
+CREATE TABLE `Orders` (
+    `id`              INTEGER NOT NULL AUTO_INCREMENT,
+    `orderNumber`     VARCHAR(255),
+    `userId`          INTEGER,
+    `deliveryDate`    VARCHAR(255),
+    `deliveryRiderId` INTEGER,
+    `createdAt`       DATETIME NOT NULL,
+    `updatedAt`       DATETIME NOT NULL,
+    PRIMARY KEY (`id`),
+    FOREIGN KEY (`userId`) REFERENCES `Users` (`id`),
+    FOREIGN KEY (`deliveryRiderId`) REFERENCES `Riders` (`id`)
+);
+
+CREATE TABLE `OrderItems` (
+    `OrderId`     INTEGER NOT NULL,
+    `ProductId`   INTEGER NOT NULL,
+    `quantity`    INTEGER,
+    `notes`       VARCHAR(255),
+    `createdAt`   DATETIME NOT NULL,
+    `updatedAt`   DATETIME NOT NULL,
+    PRIMARY KEY (`OrderId`, `ProductId`),
+    FOREIGN KEY (`OrderId`) REFERENCES `Orders` (`id`),
+    FOREIGN KEY (`ProductId`) REFERENCES `Products` (`id`)
+);
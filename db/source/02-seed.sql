@@ -0,0 +1,30 @@
+-- A few rows to try the ETL on, including values the transforms cleanse
+-- (gender and vehicle synonyms, m/d/Y dates, padded categories).
+
+INSERT INTO `Couriers` (`id`, `name`, `createdAt`, `updatedAt`) VALUES
+    (1, 'Lalamove', '2025-01-02 08:00:00', '2025-01-02 08:00:00'),
+    (2, 'Grab Express', '2025-01-02 08:00:00', '2025-01-02 08:00:00');
+
+INSERT INTO `Products` (`id`, `productCode`, `category`, `description`, `name`, `price`, `createdAt`, `updatedAt`) VALUES
+    (1, 'P-0001', 'electronics', 'Wireless mouse', 'Mouse', 499.00, '2025-01-03 09:00:00', '2025-01-03 09:00:00'),
+    (2, 'P-0002', ' Toys ', 'Building blocks', 'Blocks', 899.50, '2025-01-03 09:00:00', '2025-02-10 10:00:00'),
+    (3, 'P-0003', 'groceries', 'Ground coffee, 500 g', 'Coffee', 320.00, '2025-01-03 09:00:00', '2025-01-03 09:00:00');
+
+INSERT INTO `Users` (`id`, `username`, `firstName`, `lastName`, `address1`, `address2`, `city`, `country`, `zipCode`, `phoneNumber`, `dateOfBirth`, `gender`, `createdAt`, `updatedAt`) VALUES
+    (1, 'jdelacruz', 'Juan', 'Dela Cruz', '12 Rizal St', NULL, 'Manila', 'Philippines', '1000', '09170000001', '1990-04-12', 'm', '2025-01-04 10:00:00', '2025-01-04 10:00:00'),
+    (2, 'msantos', 'Maria', 'Santos', '3 Osmeña Blvd', 'Unit 4', 'Cebu City', 'Philippines', '6000', '09170000002', '07/21/1995', 'F', '2025-01-05 11:00:00', '2025-03-01 12:00:00');
+
+INSERT INTO `Riders` (`id`, `firstName`, `lastName`, `vehicleType`, `courierId`, `age`, `gender`, `createdAt`, `updatedAt`) VALUES
+    (1, 'Pedro', 'Reyes', 'motorbike', 1, 28, 'male', '2025-01-06 07:00:00', '2025-01-06 07:00:00'),
+    (2, 'Ana', 'Garcia', 'Bicycle', 2, 24, 'f', '2025-01-06 07:00:00', '2025-01-06 07:00:00');
+
+INSERT INTO `Orders` (`id`, `orderNumber`, `userId`, `deliveryDate`, `deliveryRiderId`, `createdAt`, `updatedAt`) VALUES
+    (1, 'ORD-0001', 1, '2025-02-01', 1, '2025-01-30 14:00:00', '2025-01-30 14:00:00'),
+    (2, 'ORD-0002', 2, '03/15/2025', 2, '2025-03-12 16:30:00', '2025-03-12 16:30:00'),
+    (3, 'ORD-0003', 1, '2025-04-20', 1, '2025-04-18 09:15:00', '2025-04-18 09:15:00');
+
+INSERT INTO `OrderItems` (`OrderId`, `ProductId`, `quantity`, `notes`, `createdAt`, `updatedAt`) VALUES
+    (1, 1, 1, NULL, '2025-01-30 14:00:00', '2025-01-30 14:00:00'),
+    (1, 3, 2, 'Gift wrap', '2025-01-30 14:00:00', '2025-01-30 14:00:00'),
+    (2, 2, 1, NULL, '2025-03-12 16:30:00', '2025-03-12 16:30:00'),
+    (3, 3, 4, NULL, '2025-04-18 09:15:00', '2025-04-18 09:15:00');
@@ -53,36 +53,45 @@ export type Database = {
           createdAt: string
           description: string | null
           id: number
+          isCurrent: boolean
           name: string
           price: number
           productCode: string
           sourceId: number
           sourceSystem: Database["public"]["Enums"]["source_system"]
           updatedAt: string
+          validFrom: string
+          validTo: string | null
         }
         Insert: {
           category?: string
           createdAt: string
           description?: string | null
           id?: number
+          isCurrent?: boolean
           name: string
           price: number
           productCode?: string
           sourceId: number
           sourceSystem?: Database["public"]["Enums"]["source_system"]
           updatedAt?: string
+          validFrom: string
+          validTo?: string | null
         }
         Update: {
           category?: string
           createdAt?: string
           description?: string | null
           id?: number
+          isCurrent?: boolean
           name?: string
           price?: number
           productCode?: string
           sourceId?: number
           sourceSystem?: Database["public"]["Enums"]["source_system"]
           updatedAt?: string
+          validFrom?: string
+          validTo?: string | null
         }
         Relationships: []
       }
@@ -94,10 +103,13 @@ export type Database = {
           firstName: string
           gender: string
           id: number
+          isCurrent: boolean
           lastName: string
           sourceId: number
           sourceSystem: Database["public"]["Enums"]["source_system"]
           updatedAt: string
+          validFrom: string
+          validTo: string | null
           vehicleType: Database["public"]["Enums"]["rider_vehicle_type"]
         }
         Insert: {
@@ -107,10 +119,13 @@ export type Database = {
           firstName?: string
           gender?: string
           id?: number
+          isCurrent?: boolean
           lastName?: string
           sourceId: number
           sourceSystem?: Database["public"]["Enums"]["source_system"]
           updatedAt?: string
+          validFrom: string
+          validTo?: string | null
           vehicleType: Database["public"]["Enums"]["rider_vehicle_type"]
         }
         Update: {
@@ -120,10 +135,13 @@ export type Database = {
           firstName?: string
           gender?: string
           id?: number
+          isCurrent?: boolean
           lastName?: string
           sourceId?: number
           sourceSystem?: Database["public"]["Enums"]["source_system"]
           updatedAt?: string
+          validFrom?: string
+          validTo?: string | null
           vehicleType?: Database["public"]["Enums"]["rider_vehicle_type"]
         }
         Relationships: []
@@ -137,10 +155,13 @@ export type Database = {
           firstName: string
           gender: string
           id: number
+          isCurrent: boolean
           lastName: string
           sourceId: number
           sourceSystem: Database["public"]["Enums"]["source_system"]
           updatedAt: string
+          validFrom: string
+          validTo: string | null
         }
         Insert: {
           city: string
@@ -150,10 +171,13 @@ export type Database = {
           firstName: string
           gender: string
           id?: number
+          isCurrent?: boolean
           lastName: string
           sourceId: number
           sourceSystem?: Database["public"]["Enums"]["source_system"]
           updatedAt: string
+          validFrom: string
+          validTo?: string | null
         }
         Update: {
           city?: string
@@ -163,24 +187,120 @@ export type Database = {
           firstName?: string
           gender?: string
           id?: number
+          isCurrent?: boolean
           lastName?: string
           sourceId?: number
           sourceSystem?: Database["public"]["Enums"]["source_system"]
           updatedAt?: string
+          validFrom?: string
+          validTo?: string | null
         }
         Relationships: []
       }
       ETLControl: {
         Row: {
           lastLoadTime: string
+          sourceName: string
           tableName: string
         }
         Insert: {
           lastLoadTime: string
+          sourceName: string
           tableName: string
         }
         Update: {
           lastLoadTime?: string
+          sourceName?: string
+          tableName?: string
+        }
+        Relationships: []
+      }
+      ETLPartitions: {
+        Row: {
+          attempts: number
+          error: string | null
+          high: number
+          id: number
+          leaseExpiresAt: string | null
+          leaseOwner: string | null
+          low: number
+          phase: number
+          rows: number | null
+          runId: string
+          since: string | null
+          sourceName: string
+          status: string
+          tableName: string
+          updatedAt: string
+          watermark: string
+        }
+        Insert: {
+          attempts?: number
+          error?: string | null
+          high: number
+          id?: number
+          leaseExpiresAt?: string | null
+          leaseOwner?: string | null
+          low: number
+          phase: number
+          rows?: number | null
+          runId: string
+          since?: string | null
+          sourceName: string
+          status?: string
+          tableName: string
+          updatedAt?: string
+          watermark: string
+        }
+        Update: {
+          attempts?: number
+          error?: string | null
+          high?: number
+          id?: number
+          leaseExpiresAt?: string | null
+          leaseOwner?: string | null
+          low?: number
+          phase?: number
+          rows?: number | null
+          runId?: string
+          since?: string | null
+          sourceName?: string
+          status?: string
+          tableName?: string
+          updatedAt?: string
+          watermark?: string
+        }
+        Relationships: []
+      }
+      ETLQuarantine: {
+        Row: {
+          id: number
+          quarantinedAt: string
+          record: Json
+          rules: string[]
+          runId: string
+          sourceId: number | null
+          sourceSystem: string | null
+          tableName: string
+        }
+        Insert: {
+          id?: number
+          quarantinedAt?: string
+          record: Json
+          rules: string[]
+          runId: string
+          sourceId?: number | null
+          sourceSystem?: string | null
+          tableName: string
+        }
+        Update: {
+          id?: number
+          quarantinedAt?: string
+          record?: Json
+          rules?: string[]
+          runId?: string
+          sourceId?: number | null
+          sourceSystem?: string | null
           tableName?: string
         }
         Relationships: []
@@ -188,6 +308,7 @@ export type Database = {
       FactSales: {
         Row: {
           createdAt: string
+          deliveryDate: string
           deliveryDateId: number
           deliveryRiderId: number
           id: number
@@ -199,6 +320,7 @@ export type Database = {
         }
         Insert: {
           createdAt: string
+          deliveryDate: string
           deliveryDateId: number
           deliveryRiderId: number
           id?: number
@@ -210,6 +332,7 @@ export type Database = {
         }
         Update: {
           createdAt?: string
+          deliveryDate?: string
           deliveryDateId?: number
           deliveryRiderId?: number
           id?: number
@@ -250,12 +373,59 @@ export type Database = {
           },
         ]
       }
+
     }
     Views: {
       [_ in never]: never
     }
     Functions: {
-      [_ in never]: never
+      claim_etl_partition: {
+        Args: { lease_seconds: number; max_attempts: number; worker: string }
+        Returns: {
+          attempts: number
+          error: string | null
+          high: number
+          id: number
+          leaseExpiresAt: string | null
+          leaseOwner: string | null
+          low: number
+          phase: number
+          rows: number | null
+          runId: string
+          since: string | null
+          sourceName: string
+          status: string
+          tableName: string
+          updatedAt: string
+          watermark: string
+        }[]
+      }
+      delete_moved_facts: { Args: { facts: Json }; Returns: number }
+      merge_dimension_versions: {
+        Args: {
+          closed: Json
+          columns: string[]
+          dimension: string
+          inserted: Json
+        }
+        Returns: number
+      }
+      partition_checksums: {
+        Args: {
+          excluded: number[]
+          hash_updated_at: boolean
+          high: number
+          low: number
+          source_system: string
+          table_name: string
+          width: number
+        }
+        Returns: Json
+      }
+      renew_etl_partition_lease: {
+        Args: { lease_seconds: number; partition_id: number; worker: string }
+        Returns: boolean
+      }
     }
     Enums: {
       rider_vehicle_type: "Motorcycle" | "Bicycle" | "Tricycle" | "Car"
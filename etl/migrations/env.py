@@ -0,0 +1,60 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from src.config import WAREHOUSE_SETTINGS
+from src.warehouse_models import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def get_url() -> str:
+    if not WAREHOUSE_SETTINGS.db_url:
+        raise ValueError(
+            "Missing warehouse database URL. Ensure WAREHOUSE_DB_URL is set in .env"
+        )
+    return WAREHOUSE_SETTINGS.db_url
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    # Monthly FactSales partitions are created at runtime, not declared in the models
+    return not (type_ == "table" and name.startswith("FactSales_y"))
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without connecting (alembic upgrade --sql)."""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(get_url(), poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,140 @@
+"""Star schema as previously managed by hand
+
+Existing warehouses already have these tables: mark them as migrated with
+`alembic stamp 0001` instead of running this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: str | Sequence[str] | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+source_system = postgresql.ENUM("MySQL", name="source_system", create_type=False)
+rider_vehicle_type = postgresql.ENUM(
+    "Motorcycle",
+    "Bicycle",
+    "Tricycle",
+    "Car",
+    name="rider_vehicle_type",
+    create_type=False,
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    source_system.create(op.get_bind(), checkfirst=True)
+    rider_vehicle_type.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        "DimUsers",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("firstName", sa.String(), nullable=False),
+        sa.Column("lastName", sa.String(), nullable=False),
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("country", sa.String(), nullable=False),
+        sa.Column("dateOfBirth", sa.Date(), nullable=False),
+        sa.Column("gender", sa.String(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+        sa.Column("sourceId", sa.BigInteger(), nullable=False),
+        sa.Column("sourceSystem", source_system, nullable=False),
+    )
+    op.create_table(
+        "DimDate",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("fullDate", sa.Date(), nullable=False, unique=True),
+        sa.Column("year", sa.SmallInteger(), nullable=False),
+        sa.Column("month", sa.SmallInteger(), nullable=False),
+        sa.Column("day", sa.SmallInteger(), nullable=False),
+        sa.Column("monthName", sa.String(), nullable=False),
+        sa.Column("dayOfTheWeek", sa.String(), nullable=False),
+        sa.Column("quarter", sa.String(), nullable=False),
+    )
+    op.create_table(
+        "DimRiders",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("firstName", sa.String(), nullable=False),
+        sa.Column("lastName", sa.String(), nullable=False),
+        sa.Column("vehicleType", rider_vehicle_type, nullable=False),
+        sa.Column("courierName", sa.String(), nullable=False),
+        sa.Column("age", sa.SmallInteger(), nullable=False),
+        sa.Column("gender", sa.String(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+        sa.Column("sourceId", sa.BigInteger(), nullable=False),
+        sa.Column("sourceSystem", source_system, nullable=False),
+    )
+    op.create_table(
+        "DimProducts",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("productCode", sa.String(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("description", sa.String()),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("updatedAt", sa.DateTime(), nullable=False),
+        sa.Column("sourceId", sa.BigInteger(), nullable=False),
+        sa.Column("sourceSystem", source_system, nullable=False),
+    )
+    op.create_table(
+        "FactSales",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "userId", sa.BigInteger(), sa.ForeignKey("DimUsers.id"), nullable=False
+        ),
+        sa.Column(
+            "deliveryDateId",
+            sa.BigInteger(),
+            sa.ForeignKey("DimDate.id"),
+            nullable=False,
+        ),
+        sa.Column(
+            "deliveryRiderId",
+            sa.BigInteger(),
+            sa.ForeignKey("DimRiders.id"),
+            nullable=False,
+        ),
+        sa.Column(
+            "productId",
+            sa.BigInteger(),
+            sa.ForeignKey("DimProducts.id"),
+            nullable=False,
+        ),
+        sa.Column("quantitySold", sa.BigInteger(), nullable=False),
+        sa.Column("createdAt", sa.DateTime(), nullable=False),
+        sa.Column("sourceId", sa.BigInteger(), nullable=False),
+        sa.Column("sourceSystem", source_system, nullable=False),
+    )
+    op.create_table(
+        "ETLControl",
+        sa.Column("tableName", sa.Text(), primary_key=True),
+        sa.Column("lastLoadTime", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in [
+        "ETLControl",
+        "FactSales",
+        "DimProducts",
+        "DimRiders",
+        "DimDate",
+        "DimUsers",
+    ]:
+        op.drop_table(table_name)
+    rider_vehicle_type.drop(op.get_bind(), checkfirst=True)
+    source_system.drop(op.get_bind(), checkfirst=True)
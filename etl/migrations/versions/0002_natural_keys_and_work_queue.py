@@ -0,0 +1,159 @@
+"""Natural keys, fact deduplication and the distributed work queue
+
+Replaces the hand-run db/queries/fact-sales-natural-key.sql,
+multi-source-keys.sql and etl-partitions.sql; every statement is idempotent, so
+it is safe on warehouses where those were already run.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:10:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: str | Sequence[str] | None = "0001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+DIMENSION_TABLES = ["DimUsers", "DimProducts", "DimRiders"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Remove FactSales duplicates, keeping the newest row of each natural key
+    op.execute(
+        """
+        DELETE FROM "FactSales" fs
+        USING       "FactSales" newer
+        WHERE       fs."sourceSystem" = newer."sourceSystem"
+        AND         fs."sourceId" = newer."sourceId"
+        AND         fs."productId" = newer."productId"
+        AND         fs."id" < newer."id"
+        """
+    )
+    op.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS "FactSales_natural_key"
+        ON "FactSales" ("sourceSystem", "sourceId", "productId")
+        """
+    )
+
+    # Equal ids from different sources must not overwrite each other
+    for table_name in DIMENSION_TABLES:
+        op.execute(
+            f'''
+            CREATE UNIQUE INDEX IF NOT EXISTS "{table_name}_natural_key"
+            ON "{table_name}" ("sourceSystem", "sourceId")
+            '''
+        )
+
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS "ETLPartitions" (
+            "id"              bigserial PRIMARY KEY,
+            "runId"           text NOT NULL,
+            "sourceName"      text NOT NULL,
+            "tableName"       text NOT NULL,
+            -- 1 = dimensions, 2 = facts; facts are only claimable once every
+            -- dimension partition of the run is done
+            "phase"           smallint NOT NULL,
+            -- Source primary key range [low, high)
+            "low"             bigint NOT NULL,
+            "high"            bigint NOT NULL,
+            -- Incremental window: rows updated after "since" (NULL = full load), and the
+            -- ETLControl watermark to record once the whole run is done
+            "since"           timestamp,
+            "watermark"       timestamp NOT NULL,
+            "status"          text NOT NULL DEFAULT 'pending',  -- pending | claimed | done | failed
+            "leaseOwner"      text,
+            "leaseExpiresAt"  timestamptz,
+            "attempts"        integer NOT NULL DEFAULT 0,
+            "rows"            integer,
+            "error"           text,
+            "updatedAt"       timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS "ETLPartitions_claim"
+        ON "ETLPartitions" ("status", "phase", "id")
+        """
+    )
+
+    # Claim one partition for `worker`: a pending one, or a claimed one whose lease
+    # expired (its worker crashed). SKIP LOCKED lets many workers claim at once
+    # without blocking or double-claiming.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION claim_etl_partition(worker text, lease_seconds integer)
+        RETURNS SETOF "ETLPartitions"
+        LANGUAGE sql
+        AS $$
+            UPDATE      "ETLPartitions" p
+            SET         "status" = 'claimed',
+                        "leaseOwner" = worker,
+                        "leaseExpiresAt" = now() + make_interval(secs => lease_seconds),
+                        "attempts" = p."attempts" + 1,
+                        "updatedAt" = now()
+            WHERE       p."id" = (
+                SELECT      c."id"
+                FROM        "ETLPartitions" c
+                WHERE       (c."status" = 'pending'
+                            OR (c."status" = 'claimed' AND c."leaseExpiresAt" < now()))
+                AND         NOT EXISTS (
+                    SELECT      1
+                    FROM        "ETLPartitions" d
+                    WHERE       d."runId" = c."runId"
+                    AND         d."phase" < c."phase"
+                    AND         d."status" <> 'done'
+                )
+                ORDER BY    c."phase", c."id"
+                LIMIT       1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING   p.*;
+        $$;
+        """
+    )
+
+    # Extend the lease of a partition `worker` still owns. Returns false if the
+    # lease was lost (expired and reclaimed by another worker).
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION renew_etl_partition_lease(
+            partition_id bigint, worker text, lease_seconds integer
+        )
+        RETURNS boolean
+        LANGUAGE sql
+        AS $$
+            WITH renewed AS (
+                UPDATE      "ETLPartitions"
+                SET         "leaseExpiresAt" = now() + make_interval(secs => lease_seconds),
+                            "updatedAt" = now()
+                WHERE       "id" = partition_id
+                AND         "leaseOwner" = worker
+                AND         "status" = 'claimed'
+                RETURNING   1
+            )
+            SELECT EXISTS (SELECT 1 FROM renewed);
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "DROP FUNCTION IF EXISTS renew_etl_partition_lease(bigint, text, integer)"
+    )
+    op.execute("DROP FUNCTION IF EXISTS claim_etl_partition(text, integer)")
+    op.execute('DROP TABLE IF EXISTS "ETLPartitions"')
+    for table_name in DIMENSION_TABLES:
+        op.execute(f'DROP INDEX IF EXISTS "{table_name}_natural_key"')
+    op.execute('DROP INDEX IF EXISTS "FactSales_natural_key"')
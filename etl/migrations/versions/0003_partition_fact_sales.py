@@ -0,0 +1,192 @@
+"""Range-partition FactSales by delivery month
+
+Adds FactSales."deliveryDate" (the partition key, copied from DimDate), rebuilds
+FactSales as a partitioned table with one partition per month of DimDate, and
+indexes its foreign keys. Postgres requires the partition key in every unique
+key, so it joins the primary and natural keys.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:20:00
+
+"""
+
+from collections.abc import Sequence
+from datetime import date
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: str | Sequence[str] | None = "0002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# DimDate's range when the warehouse has no dates yet (see generate_dim_date)
+DEFAULT_FIRST_MONTH = date(2020, 1, 1)
+DEFAULT_LAST_MONTH = date(2029, 12, 1)
+
+FK_INDEXES = {
+    "FactSales_userId_idx": "userId",
+    "FactSales_productId_idx": "productId",
+    "FactSales_deliveryDateId_idx": "deliveryDateId",
+    "FactSales_deliveryRiderId_idx": "deliveryRiderId",
+}
+
+COLUMNS = (
+    '"id", "userId", "deliveryDateId", "deliveryRiderId", "productId", '
+    '"quantitySold", "createdAt", "sourceId", "sourceSystem"'
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('ALTER TABLE "FactSales" RENAME TO "FactSales_unpartitioned"')
+    op.execute(
+        'ALTER SEQUENCE IF EXISTS "FactSales_id_seq" RENAME TO "FactSales_unpartitioned_id_seq"'
+    )
+    for name in ["FactSales_pkey", "FactSales_natural_key"]:
+        op.execute(f'ALTER INDEX IF EXISTS "{name}" RENAME TO "{name}_unpartitioned"')
+
+    op.execute('CREATE SEQUENCE "FactSales_id_seq" AS bigint')
+    op.execute(
+        """
+        CREATE TABLE "FactSales" (
+            "id"              bigint NOT NULL DEFAULT nextval('"FactSales_id_seq"'),
+            "userId"          bigint NOT NULL REFERENCES "DimUsers" ("id"),
+            "deliveryDateId"  bigint NOT NULL REFERENCES "DimDate" ("id"),
+            "deliveryRiderId" bigint NOT NULL REFERENCES "DimRiders" ("id"),
+            "productId"       bigint NOT NULL REFERENCES "DimProducts" ("id"),
+            "deliveryDate"    date NOT NULL,
+            "quantitySold"    bigint NOT NULL,
+            "createdAt"       timestamp NOT NULL,
+            "sourceId"        bigint NOT NULL,
+            "sourceSystem"    source_system NOT NULL,
+            PRIMARY KEY ("id", "deliveryDate")
+        ) PARTITION BY RANGE ("deliveryDate")
+        """
+    )
+    op.execute('ALTER SEQUENCE "FactSales_id_seq" OWNED BY "FactSales"."id"')
+
+    # DimDate's range is read by the server, so the migration also renders
+    # offline (alembic upgrade --sql)
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month       date;
+            last_month  date;
+        BEGIN
+            SELECT  COALESCE(date_trunc('month', MIN("fullDate"))::date, '{DEFAULT_FIRST_MONTH.isoformat()}'),
+                    COALESCE(MAX("fullDate"), '{DEFAULT_LAST_MONTH.isoformat()}')
+            INTO    month, last_month
+            FROM    "DimDate";
+
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF "FactSales" FOR VALUES FROM (%L) TO (%L)',
+                    'FactSales_y' || to_char(month, 'YYYY"m"MM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END
+        $$
+        """
+    )
+
+    op.execute(
+        f"""
+        INSERT INTO "FactSales" ({COLUMNS}, "deliveryDate")
+        SELECT      {", ".join(f"fs.{c.strip()}" for c in COLUMNS.split(","))}, dd."fullDate"
+        FROM        "FactSales_unpartitioned" fs
+        JOIN        "DimDate" dd ON dd."id" = fs."deliveryDateId"
+        """
+    )
+    op.execute(
+        """
+        SELECT setval('"FactSales_id_seq"', COALESCE(MAX("id"), 0) + 1, false)
+        FROM "FactSales"
+        """
+    )
+    op.execute('DROP TABLE "FactSales_unpartitioned"')
+
+    op.execute(
+        """
+        CREATE UNIQUE INDEX "FactSales_natural_key"
+        ON "FactSales" ("sourceSystem", "sourceId", "productId", "deliveryDate")
+        """
+    )
+    for name, column in FK_INDEXES.items():
+        op.execute(f'CREATE INDEX "{name}" ON "FactSales" ("{column}")')
+
+    # Facts whose order moved to another delivery month would otherwise live on in
+    # the old partition; the load deletes them through this function
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION delete_moved_facts(facts jsonb)
+        RETURNS integer
+        LANGUAGE sql
+        AS $$
+            WITH deleted AS (
+                DELETE FROM "FactSales" fs
+                USING       jsonb_to_recordset(facts)
+                            AS f("sourceSystem" text, "sourceId" bigint, "deliveryDate" date)
+                WHERE       fs."sourceSystem"::text = f."sourceSystem"
+                AND         fs."sourceId" = f."sourceId"
+                AND         fs."deliveryDate" <> f."deliveryDate"
+                RETURNING   1
+            )
+            SELECT COUNT(*)::integer FROM deleted;
+        $$
+        """
+    )
+    op.execute('ANALYZE "FactSales"')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS delete_moved_facts(jsonb)")
+    op.execute('ALTER TABLE "FactSales" RENAME TO "FactSales_partitioned"')
+    op.execute(
+        'ALTER SEQUENCE "FactSales_id_seq" RENAME TO "FactSales_partitioned_id_seq"'
+    )
+    for name in ["FactSales_pkey", "FactSales_natural_key", *FK_INDEXES]:
+        op.execute(f'ALTER INDEX IF EXISTS "{name}" RENAME TO "{name}_partitioned"')
+
+    op.execute(
+        """
+        CREATE TABLE "FactSales" (
+            "id"              bigserial PRIMARY KEY,
+            "userId"          bigint NOT NULL REFERENCES "DimUsers" ("id"),
+            "deliveryDateId"  bigint NOT NULL REFERENCES "DimDate" ("id"),
+            "deliveryRiderId" bigint NOT NULL REFERENCES "DimRiders" ("id"),
+            "productId"       bigint NOT NULL REFERENCES "DimProducts" ("id"),
+            "quantitySold"    bigint NOT NULL,
+            "createdAt"       timestamp NOT NULL,
+            "sourceId"        bigint NOT NULL,
+            "sourceSystem"    source_system NOT NULL
+        )
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO "FactSales" ({COLUMNS})
+        SELECT      {COLUMNS}
+        FROM        "FactSales_partitioned"
+        """
+    )
+    op.execute(
+        """
+        SELECT setval('"FactSales_id_seq"', COALESCE(MAX("id"), 0) + 1, false)
+        FROM "FactSales"
+        """
+    )
+    op.execute('DROP TABLE "FactSales_partitioned"')
+    op.execute(
+        """
+        CREATE UNIQUE INDEX "FactSales_natural_key"
+        ON "FactSales" ("sourceSystem", "sourceId", "productId")
+        """
+    )
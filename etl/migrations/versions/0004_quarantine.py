@@ -0,0 +1,51 @@
+"""Quarantine table for rows failing validation
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 09:30:00
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: str | Sequence[str] | None = "0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ETLQuarantine",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("runId", sa.Text(), nullable=False),
+        sa.Column("tableName", sa.Text(), nullable=False),
+        sa.Column("sourceSystem", sa.Text()),
+        sa.Column("sourceId", sa.BigInteger()),
+        # Names of the failed rules, e.g. {foreign_key:userId,not_null:deliveryDate}
+        sa.Column("rules", postgresql.ARRAY(sa.Text()), nullable=False),
+        # The transformed row as it would have been loaded
+        sa.Column("record", postgresql.JSONB(), nullable=False),
+        sa.Column(
+            "quarantinedAt",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+    op.create_index(
+        "ETLQuarantine_run",
+        "ETLQuarantine",
+        ["runId", "tableName", "sourceSystem", "sourceId"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("ETLQuarantine")
@@ -0,0 +1,115 @@
+"""Versioned dimensions for Slowly Changing Dimension Type 2
+
+Adds validFrom/validTo/isCurrent to DimUsers, DimProducts and DimRiders. Existing
+rows become the first (current) version of their source row, valid from its
+createdAt. The natural key gains validFrom, so a source row can have several
+versions but only one current one, and merge_dimension_versions closes and
+inserts versions of a batch in one transaction (see scd.py).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 09:40:00
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: str | Sequence[str] | None = "0004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+DIMENSION_TABLES = ["DimUsers", "DimProducts", "DimRiders"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name in DIMENSION_TABLES:
+        op.add_column(table_name, sa.Column("validFrom", sa.DateTime()))
+        op.add_column(table_name, sa.Column("validTo", sa.DateTime()))
+        op.add_column(
+            table_name,
+            sa.Column(
+                "isCurrent", sa.Boolean(), nullable=False, server_default=sa.true()
+            ),
+        )
+        op.execute(f'UPDATE "{table_name}" SET "validFrom" = "createdAt"')
+        op.alter_column(table_name, "validFrom", nullable=False)
+
+        op.execute(f'DROP INDEX IF EXISTS "{table_name}_natural_key"')
+        op.create_index(
+            f"{table_name}_natural_key",
+            table_name,
+            ["sourceSystem", "sourceId", "validFrom"],
+            unique=True,
+        )
+        op.create_index(
+            f"{table_name}_current",
+            table_name,
+            ["sourceSystem", "sourceId"],
+            unique=True,
+            postgresql_where=sa.text('"isCurrent"'),
+        )
+
+    # Close the versions in `closed` ([{id, validTo}]) and insert `inserted`
+    # (rows of `dimension` with the given columns) atomically. Returns the
+    # versions inserted.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION merge_dimension_versions(
+            dimension text, closed jsonb, inserted jsonb, columns text[]
+        )
+        RETURNS integer
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            column_list text := (SELECT string_agg(quote_ident(c), ', ') FROM unnest(columns) AS c);
+            inserted_rows integer;
+        BEGIN
+            EXECUTE format(
+                'UPDATE     %1$I d
+                 SET        "validTo" = v."validTo", "isCurrent" = false
+                 FROM       jsonb_to_recordset($1) AS v("id" bigint, "validTo" timestamp)
+                 WHERE      d."id" = v."id"
+                 AND        d."isCurrent"',
+                dimension
+            ) USING closed;
+            EXECUTE format(
+                'INSERT INTO %1$I (%2$s)
+                 SELECT     %2$s
+                 FROM       jsonb_populate_recordset(NULL::%1$I, $1)',
+                dimension,
+                column_list
+            ) USING inserted;
+            GET DIAGNOSTICS inserted_rows = ROW_COUNT;
+            RETURN inserted_rows;
+        END;
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "DROP FUNCTION IF EXISTS merge_dimension_versions(text, jsonb, jsonb, text[])"
+    )
+    for table_name in DIMENSION_TABLES:
+        # Only current versions fit the single-version natural key (this fails
+        # while facts still reference closed versions)
+        op.execute(f'DELETE FROM "{table_name}" WHERE NOT "isCurrent"')
+        op.drop_index(f"{table_name}_current", table_name=table_name)
+        op.drop_index(f"{table_name}_natural_key", table_name=table_name)
+        op.create_index(
+            f"{table_name}_natural_key",
+            table_name,
+            ["sourceSystem", "sourceId"],
+            unique=True,
+        )
+        op.drop_column(table_name, "isCurrent")
+        op.drop_column(table_name, "validTo")
+        op.drop_column(table_name, "validFrom")
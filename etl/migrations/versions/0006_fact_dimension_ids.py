@@ -0,0 +1,107 @@
+"""Facts referencing dimension ids
+
+FactSales.userId, productId and deliveryRiderId held source ids, so facts of
+one source pointed at whichever dimension row had that id, often another
+source's. They are rewritten to the id of the dimension row with the same
+(sourceSystem, sourceId), which is what loads now store. The migration fails,
+changing nothing, if any fact has no such dimension row.
+
+Facts loaded with WAREHOUSE_SCD2 already reference dimension versions; on such
+a warehouse run it with `alembic -x scd2=true upgrade 0006` (and the same flag
+to downgrade), which skips the rewrite. Source system tags are added by loads
+and `plan` (see warehouse.ensure_source_systems), not here.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 10:00:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: str | Sequence[str] | None = "0005"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+FACT_DIMENSION_COLUMNS = {
+    "userId": "DimUsers",
+    "productId": "DimProducts",
+    "deliveryRiderId": "DimRiders",
+}
+
+
+def facts_reference_versions() -> bool:
+    """Whether `-x scd2=true` was passed: facts already hold dimension version ids."""
+    x_args = context.get_x_argument(as_dictionary=True)
+    return x_args.get("scd2", "false").lower() == "true"
+
+
+def check_fact_columns(old: str) -> None:
+    """Fail if a fact references no dimension row of its source by `old`."""
+    for column, table_name in FACT_DIMENSION_COLUMNS.items():
+        # Counted in the server, so the check also runs from --sql output
+        op.execute(
+            f'''
+            DO $$
+            DECLARE
+                unmatched bigint;
+            BEGIN
+                SELECT  COUNT(*)
+                INTO    unmatched
+                FROM    "FactSales" fs
+                WHERE   NOT EXISTS (
+                            SELECT  1
+                            FROM    "{table_name}" d
+                            WHERE   d."sourceSystem" = fs."sourceSystem"
+                            AND     d."{old}" = fs."{column}"
+                            AND     d."isCurrent"
+                        );
+                IF unmatched > 0 THEN
+                    RAISE EXCEPTION '% FactSales rows have a "{column}" matching no current "{table_name}" row of their source system', unmatched;
+                END IF;
+            END
+            $$
+            '''
+        )
+
+
+def remap_fact_columns(to_dimension_ids: bool) -> None:
+    old, new = ("sourceId", "id") if to_dimension_ids else ("id", "sourceId")
+    check_fact_columns(old)
+
+    # The natural key includes productId, and rows are checked one at a time,
+    # so it is rebuilt around the rewrite
+    op.execute('DROP INDEX "FactSales_natural_key"')
+    for column, table_name in FACT_DIMENSION_COLUMNS.items():
+        op.execute(
+            f'''
+            UPDATE  "FactSales" fs
+            SET     "{column}" = d."{new}"
+            FROM    "{table_name}" d
+            WHERE   d."sourceSystem" = fs."sourceSystem"
+            AND     d."{old}" = fs."{column}"
+            AND     d."isCurrent"
+            '''
+        )
+    op.execute(
+        """
+        CREATE UNIQUE INDEX "FactSales_natural_key"
+        ON "FactSales" ("sourceSystem", "sourceId", "productId", "deliveryDate")
+        """
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not facts_reference_versions():
+        remap_fact_columns(to_dimension_ids=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not facts_reference_versions():
+        remap_fact_columns(to_dimension_ids=False)
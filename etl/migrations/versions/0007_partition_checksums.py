@@ -0,0 +1,108 @@
+"""Partition checksums computed in the warehouse
+
+partition_checksums returns per-partition row counts and checksums of one
+source's rows of a table, with the row hash reconcile.py computes in MySQL, so
+reconciliation no longer pages every warehouse row through PostgREST. Keys in
+`excluded` (those in ETLQuarantine) are left out. The result is a single jsonb
+array of [bucket, rowCount, checksum], so PostgREST's max_rows never truncates it.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 10:10:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: str | Sequence[str] | None = "0006"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# reconcile.HASH_P1, HASH_P2 and HASH_MOD
+HASH_P1 = 1_000_003
+HASH_P2 = 10_007
+HASH_MOD = 2_147_483_647
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Dimensions hash updatedAt (unless hash_updated_at is false, under SCD2) of
+    # their current versions; facts hash the product's sourceId and the quantity
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION partition_checksums(
+            table_name text,
+            source_system text,
+            low bigint,
+            high bigint,
+            width bigint,
+            hash_updated_at boolean,
+            excluded bigint[]
+        )
+        RETURNS jsonb
+        LANGUAGE plpgsql
+        STABLE
+        AS $$
+        DECLARE
+            result jsonb;
+        BEGIN
+            IF table_name = 'FactSales' THEN
+                SELECT  COALESCE(jsonb_agg(jsonb_build_array(bucket, row_count, checksum)), '[]')
+                INTO    result
+                FROM (
+                    SELECT      fs."sourceId" / width AS bucket,
+                                COUNT(*) AS row_count,
+                                SUM(MOD(
+                                    fs."sourceId" * {HASH_P1}
+                                    + p."sourceId" * {HASH_P2}
+                                    + COALESCE(fs."quantitySold", 0),
+                                    {HASH_MOD}
+                                )) AS checksum
+                    FROM        "FactSales" fs
+                    JOIN        "DimProducts" p ON p."id" = fs."productId"
+                    WHERE       fs."sourceSystem"::text = source_system
+                    AND         fs."sourceId" >= low
+                    AND         fs."sourceId" < high
+                    AND         NOT (fs."sourceId" = ANY(excluded))
+                    GROUP BY    1
+                ) buckets;
+            ELSE
+                EXECUTE format(
+                    'SELECT COALESCE(jsonb_agg(jsonb_build_array(bucket, row_count, checksum)), ''[]'')
+                     FROM (
+                         SELECT     "sourceId" / $3 AS bucket,
+                                    COUNT(*) AS row_count,
+                                    SUM(MOD(
+                                        "sourceId" * {HASH_P1}
+                                        + CASE WHEN $4 THEN FLOOR(EXTRACT(EPOCH FROM "updatedAt"))::bigint ELSE 0 END * {HASH_P2},
+                                        {HASH_MOD}
+                                    )) AS checksum
+                         FROM       %I
+                         WHERE      "sourceSystem"::text = $1
+                         AND        "isCurrent"
+                         AND        "sourceId" >= $2
+                         AND        "sourceId" < $5
+                         AND        NOT ("sourceId" = ANY($6))
+                         GROUP BY   1
+                     ) buckets',
+                    table_name
+                )
+                INTO    result
+                USING   source_system, low, width, hash_updated_at, high, excluded;
+            END IF;
+            RETURN result;
+        END;
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "DROP FUNCTION IF EXISTS partition_checksums(text, text, bigint, bigint, bigint, boolean, bigint[])"
+    )
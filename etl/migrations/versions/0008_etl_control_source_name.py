@@ -0,0 +1,64 @@
+"""ETLControl per source
+
+Watermarks of sources other than the default were stored with their source
+name packed into tableName ("FactSales@eu"). ETLControl gets a sourceName
+column instead, keyed on (tableName, sourceName), and existing rows are split
+into the two; unpacked rows belong to the default source.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 10:20:00
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: str | Sequence[str] | None = "0007"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# config.DEFAULT_SOURCE_NAME
+DEFAULT_SOURCE_NAME = "default"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "ETLControl",
+        sa.Column(
+            "sourceName",
+            sa.Text(),
+            nullable=False,
+            server_default=DEFAULT_SOURCE_NAME,
+        ),
+    )
+    op.execute(
+        """
+        UPDATE  "ETLControl"
+        SET     "sourceName" = split_part("tableName", '@', 2),
+                "tableName" = split_part("tableName", '@', 1)
+        WHERE   "tableName" LIKE '%@%'
+        """
+    )
+    op.alter_column("ETLControl", "sourceName", server_default=None)
+    op.drop_constraint("ETLControl_pkey", "ETLControl", type_="primary")
+    op.create_primary_key("ETLControl_pkey", "ETLControl", ["tableName", "sourceName"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("ETLControl_pkey", "ETLControl", type_="primary")
+    op.execute(
+        f"""
+        UPDATE  "ETLControl"
+        SET     "tableName" = "tableName" || '@' || "sourceName"
+        WHERE   "sourceName" <> '{DEFAULT_SOURCE_NAME}'
+        """
+    )
+    op.create_primary_key("ETLControl_pkey", "ETLControl", ["tableName"])
+    op.drop_column("ETLControl", "sourceName")
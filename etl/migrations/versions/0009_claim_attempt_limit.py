@@ -0,0 +1,125 @@
+"""Attempt limit on reclaimed partitions
+
+claim_etl_partition reclaimed partitions whose lease expired however often
+their worker had died on them, so a partition that crashes its worker was
+retried forever. It now takes `max_attempts`: expired partitions that used
+them all are marked failed (along with the pending later phases of their run,
+as fail_partition does) instead of being claimed again.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 10:30:00
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: str | Sequence[str] | None = "0008"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS claim_etl_partition(text, integer)")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION claim_etl_partition(
+            worker text, lease_seconds integer, max_attempts integer
+        )
+        RETURNS SETOF "ETLPartitions"
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            WITH expired AS (
+                UPDATE      "ETLPartitions" p
+                SET         "status" = 'failed',
+                            "leaseOwner" = NULL,
+                            "leaseExpiresAt" = NULL,
+                            "error" = COALESCE(p."error", 'Lease expired on the last attempt'),
+                            "updatedAt" = now()
+                WHERE       p."status" = 'claimed'
+                AND         p."leaseExpiresAt" < now()
+                AND         p."attempts" >= max_attempts
+                RETURNING   p."id", p."runId", p."phase"
+            )
+            UPDATE      "ETLPartitions" b
+            SET         "status" = 'failed',
+                        "error" = 'Blocked by failed partition ' || e."id",
+                        "updatedAt" = now()
+            FROM        expired e
+            WHERE       b."runId" = e."runId"
+            AND         b."phase" > e."phase"
+            AND         b."status" = 'pending';
+
+            RETURN QUERY
+            UPDATE      "ETLPartitions" p
+            SET         "status" = 'claimed',
+                        "leaseOwner" = worker,
+                        "leaseExpiresAt" = now() + make_interval(secs => lease_seconds),
+                        "attempts" = p."attempts" + 1,
+                        "updatedAt" = now()
+            WHERE       p."id" = (
+                SELECT      c."id"
+                FROM        "ETLPartitions" c
+                WHERE       (c."status" = 'pending'
+                            OR (c."status" = 'claimed'
+                                AND c."leaseExpiresAt" < now()
+                                AND c."attempts" < max_attempts))
+                AND         NOT EXISTS (
+                    SELECT      1
+                    FROM        "ETLPartitions" d
+                    WHERE       d."runId" = c."runId"
+                    AND         d."phase" < c."phase"
+                    AND         d."status" <> 'done'
+                )
+                ORDER BY    c."phase", c."id"
+                LIMIT       1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING   p.*;
+        END;
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS claim_etl_partition(text, integer, integer)")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION claim_etl_partition(worker text, lease_seconds integer)
+        RETURNS SETOF "ETLPartitions"
+        LANGUAGE sql
+        AS $$
+            UPDATE      "ETLPartitions" p
+            SET         "status" = 'claimed',
+                        "leaseOwner" = worker,
+                        "leaseExpiresAt" = now() + make_interval(secs => lease_seconds),
+                        "attempts" = p."attempts" + 1,
+                        "updatedAt" = now()
+            WHERE       p."id" = (
+                SELECT      c."id"
+                FROM        "ETLPartitions" c
+                WHERE       (c."status" = 'pending'
+                            OR (c."status" = 'claimed' AND c."leaseExpiresAt" < now()))
+                AND         NOT EXISTS (
+                    SELECT      1
+                    FROM        "ETLPartitions" d
+                    WHERE       d."runId" = c."runId"
+                    AND         d."phase" < c."phase"
+                    AND         d."status" <> 'done'
+                )
+                ORDER BY    c."phase", c."id"
+                LIMIT       1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING   p.*;
+        $$;
+        """
+    )
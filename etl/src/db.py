@@ -8,28 +8,51 @@ from tenacity import (
 )
 from mysql.connector import Error as MySQLError
 from sqlalchemy.exc import OperationalError
-from src.config import SOURCE_SETTINGS
+from src.config import SOURCES, SOURCE_SETTINGS, WAREHOUSE_SETTINGS, MySQLSettings
 from supabase import create_client, Client
+import logging
 import os
 
-# Global cached engines
-_source_engine: Engine | None = None
+logger = logging.getLogger(__name__)
+
+# Global cached engines (one pool per source)
+_source_engines: dict[str, Engine] = {}
 _supabase_client: Client | None = None
+_warehouse_engine: Engine | None = None
 
 
 # Source (MySQL)
-def get_source_engine() -> Engine:
-    global _source_engine
-    if _source_engine is None:
-        _source_engine = create_engine(
-            SOURCE_SETTINGS.sqlalchemy_url(),
-            pool_size=SOURCE_SETTINGS.pool_size,
+def get_source_settings(name: str | None = None) -> MySQLSettings:
+    """Settings of the named source, or of the first configured source."""
+    if name is None:
+        return SOURCE_SETTINGS
+    for source in SOURCES:
+        if source.name == name:
+            return source
+    raise ValueError(f"Unknown source: {name}")
+
+
+def get_source_engine(name: str | None = None, replica: bool = False) -> Engine:
+    """
+    Engine of the named source. `replica` selects its read replica when one is
+    configured (MYSQL_REPLICA_HOST), else the primary.
+    """
+    settings = get_source_settings(name)
+    replica = replica and bool(settings.replica_host)
+    key = f"{settings.name}@replica" if replica else settings.name
+    if key not in _source_engines:
+        _source_engines[key] = create_engine(
+            settings.sqlalchemy_url(replica),
+            pool_size=settings.pool_size,
             pool_pre_ping=True,
-            pool_timeout=SOURCE_SETTINGS.pool_timeout,
+            pool_timeout=settings.pool_timeout,
             future=True,
-            echo=True,
+            echo=settings.echo,
         )
-    return _source_engine
+        # SQLAlchemy leaves mysqlconnector's unbuffered cursor off, so without
+        # this stream_results still buffers the whole result set client-side
+        _source_engines[key].dialect.supports_server_side_cursors = True
+    return _source_engines[key]
 
 
 @retry(
@@ -38,9 +61,9 @@ def get_source_engine() -> Engine:
     wait=wait_exponential(multiplier=0.5, min=0.5, max=8),
     retry=retry_if_exception_type((OperationalError, MySQLError)),
 )
-def ping_source() -> None:
+def ping_source(name: str | None = None, replica: bool = False) -> None:
     """Ping the source MySQL DB to verify connectivity"""
-    engine = get_source_engine()
+    engine = get_source_engine(name, replica)
     with engine.connect() as conn:
         conn.execute(text("SELECT 1"))
 
@@ -65,12 +88,28 @@ def get_supabase_client():
     return _supabase_client
 
 
+def get_warehouse_engine() -> Engine:
+    """
+    Create or return a cached engine connected directly to the warehouse Postgres.
+    Requires WAREHOUSE_DB_URL in .env
+    """
+    global _warehouse_engine
+    if _warehouse_engine is None:
+        if not WAREHOUSE_SETTINGS.db_url:
+            raise ValueError(
+                "Missing warehouse database URL. Ensure WAREHOUSE_DB_URL is set in .env"
+            )
+        _warehouse_engine = create_engine(
+            WAREHOUSE_SETTINGS.db_url, pool_pre_ping=True, future=True
+        )
+    return _warehouse_engine
+
+
 def ping_warehouse() -> None:
     """Ping Supabase by performing a lightweight query."""
     supabase = get_supabase_client()
     try:
-        response = supabase.table("ETLControl").select("tableName").limit(1).execute()
-        print(response)
-        print("\tSupabase connection successful!")
+        supabase.table("ETLControl").select("tableName").limit(1).execute()
+        logger.debug("Supabase connection successful")
     except Exception as e:
         raise ConnectionError(f"\tSupabase connection failed: {e}")
@@ -0,0 +1,284 @@
+import logging
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from .config import SOURCE_SETTINGS, SOURCES, MySQLSettings
+from .db import get_source_engine, get_supabase_client
+from .source_models import Order, OrderItem, Product, Rider, User
+
+logger = logging.getLogger(__name__)
+
+# Warehouse keys are diffed against the source one chunk at a time, so memory
+# stays bounded by KEY_CHUNK_SIZE no matter how large the tables get
+KEY_CHUNK_SIZE = 100_000
+KEY_PAGE_SIZE = 1000  # PostgREST max_rows
+DELETE_BATCH_SIZE = 500
+
+# Facts go first so dimension deletes never trip the FactSales foreign keys.
+# FactSales rows are order items, so they are diffed on (order, product) pairs
+# (see find_deleted_fact_rows) rather than on their sourceId alone.
+SYNC_TABLES = {
+    "FactSales": OrderItem,
+    "DimUsers": User,
+    "DimProducts": Product,
+    "DimRiders": Rider,
+}
+
+
+def stream_warehouse_keys(
+    table_name: str,
+    source_system: str = SOURCE_SETTINGS.source_system,
+    chunk_size: int = KEY_CHUNK_SIZE,
+) -> Iterator[np.ndarray]:
+    """Yield the distinct sourceIds of a warehouse table as sorted int64 chunks."""
+    supabase = get_supabase_client()
+    last_key = -1
+    chunk: list[int] = []
+
+    while True:
+        res = (
+            supabase.table(table_name)
+            .select("sourceId")
+            .eq("sourceSystem", source_system)
+            .gt("sourceId", last_key)
+            .order("sourceId")
+            .limit(KEY_PAGE_SIZE)
+            .execute()
+        )
+        page = [row["sourceId"] for row in res.data or []]
+        chunk.extend(page)
+
+        if len(page) < KEY_PAGE_SIZE:
+            break
+        last_key = page[-1]
+
+        if len(chunk) >= chunk_size:
+            yield np.unique(np.asarray(chunk, dtype=np.int64))
+            chunk = []
+
+    if chunk:
+        yield np.unique(np.asarray(chunk, dtype=np.int64))
+
+
+def fetch_source_keys(
+    model_class, low: int, high: int, source_name: str | None = None
+) -> np.ndarray:
+    """Fetch the source primary keys in [low, high] as a sorted int64 array."""
+    engine = get_source_engine(source_name)
+    query = (
+        select(model_class.id)
+        .where(model_class.id.between(low, high))
+        .order_by(model_class.id)
+    )
+    with engine.connect() as conn:
+        keys = conn.execute(query).scalars()
+        return np.fromiter(keys, dtype=np.int64)
+
+
+def find_deleted_keys(
+    table_name: str, source: MySQLSettings = SOURCE_SETTINGS
+) -> Iterator[np.ndarray]:
+    """Yield warehouse sourceIds that no longer exist in the source, chunk by chunk."""
+    model_class = SYNC_TABLES[table_name]
+    for warehouse_keys in stream_warehouse_keys(table_name, source.source_system):
+        source_keys = fetch_source_keys(
+            model_class, int(warehouse_keys[0]), int(warehouse_keys[-1]), source.name
+        )
+        missing = np.setdiff1d(warehouse_keys, source_keys, assume_unique=True)
+        if missing.size:
+            yield missing
+
+
+def fetch_fact_rows(
+    low: int, high: int, source_system: str = SOURCE_SETTINGS.source_system
+) -> pd.DataFrame:
+    """
+    id, sourceId (order) and productSourceId of the FactSales rows of orders in
+    [low, high). productId holds a DimProducts id, mapped back to its sourceId.
+    """
+    supabase = get_supabase_client()
+    pages = []
+    last_id = -1
+    while True:
+        res = (
+            supabase.table("FactSales")
+            .select("id,sourceId,productId")
+            .eq("sourceSystem", source_system)
+            .gte("sourceId", low)
+            .lt("sourceId", high)
+            .gt("id", last_id)
+            .order("id")
+            .limit(KEY_PAGE_SIZE)
+            .execute()
+        )
+        page = res.data or []
+        if page:
+            pages.append(pd.DataFrame(page, columns=["id", "sourceId", "productId"]))
+        if len(page) < KEY_PAGE_SIZE:
+            break
+        last_id = page[-1]["id"]
+
+    if not pages:
+        return pd.DataFrame(
+            columns=["id", "sourceId", "productSourceId"], dtype="int64"
+        )
+    facts = pd.concat(pages, ignore_index=True)
+
+    product_ids = facts["productId"].unique().tolist()
+    products: list[dict] = []
+    for i in range(0, len(product_ids), DELETE_BATCH_SIZE):
+        res = (
+            supabase.table("DimProducts")
+            .select("id,sourceId")
+            .in_("id", product_ids[i : i + DELETE_BATCH_SIZE])
+            .execute()
+        )
+        products.extend(res.data or [])
+    source_ids = {row["id"]: row["sourceId"] for row in products}
+
+    return pd.DataFrame(
+        {
+            "id": facts["id"].astype("int64"),
+            "sourceId": facts["sourceId"].astype("int64"),
+            "productSourceId": facts["productId"].map(source_ids),
+        }
+    )
+
+
+def fetch_source_order_items(
+    low: int, high: int, source_name: str | None = None
+) -> pd.DataFrame:
+    """(sourceId, productSourceId) of the source order items of orders in [low, high)."""
+    engine = get_source_engine(source_name)
+    # Same inner joins as extract_joined_data: items it would skip have no fact
+    query = (
+        select(
+            OrderItem.OrderId.label("sourceId"),
+            OrderItem.ProductId.label("productSourceId"),
+        )
+        .join(Order, Order.id == OrderItem.OrderId)
+        .join(User, User.id == Order.userId)
+        .join(Product, Product.id == OrderItem.ProductId)
+        .where(OrderItem.OrderId >= low, OrderItem.OrderId < high)
+    )
+    with engine.connect() as conn:
+        return pd.DataFrame(
+            conn.execute(query).all(), columns=["sourceId", "productSourceId"]
+        ).astype("int64")
+
+
+def find_deleted_fact_rows(
+    low: int, high: int, source: MySQLSettings = SOURCE_SETTINGS
+) -> np.ndarray:
+    """
+    ids of FactSales rows of orders in [low, high) whose order item no longer
+    exists in the source, whether the whole order or just the item was deleted.
+    """
+    facts = fetch_fact_rows(low, high, source.source_system)
+    if facts.empty:
+        return np.array([], dtype=np.int64)
+
+    items = fetch_source_order_items(low, high, source.name)
+    matched = facts.merge(
+        items, on=["sourceId", "productSourceId"], how="left", indicator=True
+    )
+    return matched.loc[matched["_merge"] == "left_only", "id"].to_numpy(dtype=np.int64)
+
+
+def get_fact_key_upper_bound(source_system: str) -> int:
+    """One past the largest FactSales sourceId of a source system."""
+    res = (
+        get_supabase_client()
+        .table("FactSales")
+        .select("sourceId")
+        .eq("sourceSystem", source_system)
+        .order("sourceId", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return res.data[0]["sourceId"] + 1 if res.data else 0
+
+
+def delete_fact_rows(ids: np.ndarray, batch_size: int = DELETE_BATCH_SIZE) -> None:
+    """Bulk-delete FactSales rows by id in batches."""
+    supabase = get_supabase_client()
+    for i in range(0, len(ids), batch_size):
+        batch = ids[i : i + batch_size].tolist()
+        try:
+            supabase.table("FactSales").delete().in_("id", batch).execute()
+            logger.debug(f"Deleted batch {i}-{i + len(batch) - 1} from FactSales")
+        except Exception as e:
+            raise RuntimeError(
+                f"\tDelete from FactSales failed on batch {i}-{i + len(batch) - 1}: {e}"
+            ) from e
+
+
+def delete_keys(
+    table_name: str,
+    keys: np.ndarray,
+    source_system: str = SOURCE_SETTINGS.source_system,
+    batch_size: int = DELETE_BATCH_SIZE,
+) -> None:
+    """Bulk-delete warehouse rows by sourceId in batches."""
+    supabase = get_supabase_client()
+    for i in range(0, len(keys), batch_size):
+        batch = keys[i : i + batch_size].tolist()
+        try:
+            (
+                supabase.table(table_name)
+                .delete()
+                .eq("sourceSystem", source_system)
+                .in_("sourceId", batch)
+                .execute()
+            )
+            logger.debug(f"Deleted batch {i}-{i + len(batch) - 1} from {table_name}")
+        except Exception as e:
+            raise RuntimeError(
+                f"\tDelete from {table_name} failed on batch {i}-{i + len(batch) - 1}: {e}"
+            ) from e
+
+
+def sync_deletes(
+    tables: list[str] | None = None, dry_run: bool = False
+) -> dict[str, int]:
+    """
+    Remove warehouse rows whose source rows were hard-deleted, for every source.
+    Returns the number of deleted (or, on a dry run, deletable) sourceIds per
+    dimension, and rows for FactSales.
+    """
+    tables = tables or list(SYNC_TABLES)
+    unknown = set(tables) - set(SYNC_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown warehouse tables: {sorted(unknown)}")
+
+    counts = {}
+    for table_name in SYNC_TABLES:
+        if table_name not in tables:
+            continue
+
+        counts[table_name] = 0
+        for source in SOURCES:
+            if table_name == "FactSales":
+                # Order id windows, so memory stays bounded as for other tables
+                upper = get_fact_key_upper_bound(source.source_system)
+                for low in range(0, upper, KEY_CHUNK_SIZE):
+                    missing = find_deleted_fact_rows(low, low + KEY_CHUNK_SIZE, source)
+                    counts[table_name] += len(missing)
+                    if missing.size and not dry_run:
+                        delete_fact_rows(missing)
+                continue
+
+            for missing in find_deleted_keys(table_name, source):
+                counts[table_name] += len(missing)
+                if not dry_run:
+                    delete_keys(table_name, missing, source.source_system)
+
+        unit = "rows" if table_name == "FactSales" else "sourceIds"
+        logger.info(
+            f"{'Found' if dry_run else 'Deleted'} {counts[table_name]} orphaned {unit} in {table_name}"
+        )
+
+    return counts
@@ -0,0 +1,523 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+from typing_extensions import Self
+
+from .config import DISTRIBUTED_SETTINGS, SOURCES, TRANSFORM_SETTINGS, MySQLSettings
+from .db import get_source_engine, get_source_settings, get_supabase_client
+from .extract import extract_joined_data, extract_table, get_key_bounds
+from .load import get_last_load_times, update_last_load_time
+from .pushdown import extract_dimension
+from .scd import load_dimension, load_fact_sales
+from .snapshot import get_source_watermark
+from .source_models import Courier, Order, Product, Rider, User
+from .transform import load_dim_date
+from .transform_engines import get_transform_engine
+from .validate import (
+    clear_quarantine,
+    get_dimension_keys,
+    insert_quarantine,
+    resolve_quarantine,
+    validate_frame,
+)
+from .warehouse import (
+    analyze_tables,
+    create_fact_indexes,
+    ensure_source_systems,
+    physical_design_enabled,
+)
+
+logger = logging.getLogger(__name__)
+
+# Warehouse tables split into source primary key ranges, with the source table
+# whose keys are partitioned and the phase they run in. Facts run after every
+# dimension partition of the run is done (enforced by claim_etl_partition).
+PARTITION_TABLES = {
+    "DimUsers": (User, 1),
+    "DimProducts": (Product, 1),
+    "DimRiders": (Rider, 1),
+    "FactSales": (Order, 2),
+}
+# Dimensions pushdown can extract cleansed, by their source table key (see pushdown.py)
+PUSHDOWN_KEYS = {"DimUsers": "users", "DimProducts": "products", "DimRiders": "riders"}
+INSERT_BATCH_SIZE = 1000
+UPSERT_BATCH_SIZE = 20000
+UPSERT_WAIT_SEC = 1.0
+
+# Statuses that may still be claimed by a worker
+OUTSTANDING_STATUSES = ["pending", "claimed"]
+
+_dim_date_df: pd.DataFrame | None = None
+# Dimension source ids per (run, source system), fetched once the run's facts start
+_dimension_keys: dict[tuple[str, str], dict] = {}
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def get_outstanding_partitions() -> list[dict]:
+    """Fetch (up to a page of) the partitions not yet done or failed, from every run."""
+    res = (
+        get_supabase_client()
+        .table("ETLPartitions")
+        .select("id,runId,status")
+        .in_("status", OUTSTANDING_STATUSES)
+        .execute()
+    )
+    return res.data or []
+
+
+def build_partitions(
+    run_id: str,
+    source: MySQLSettings,
+    partition_size: int = DISTRIBUTED_SETTINGS.partition_size,
+) -> list[dict]:
+    """Split every partitioned table of one source into key ranges."""
+    # Rows updated after this source instant are left to the next run. Partitions
+    # are extracted at different times, so unlike run_extract they can't share a
+    # snapshot; the watermark still accounts for transactions open right now.
+    watermark = get_source_watermark(source).isoformat()
+    last_load_times = get_last_load_times(source.name)
+
+    partitions = []
+    for table_name, (model, phase) in PARTITION_TABLES.items():
+        low, high = get_key_bounds(model, source.name)
+        for part_low in range(low, high, partition_size):
+            partitions.append(
+                {
+                    "runId": run_id,
+                    "sourceName": source.name,
+                    "tableName": table_name,
+                    "phase": phase,
+                    "low": part_low,
+                    "high": min(part_low + partition_size, high),
+                    "since": last_load_times.get(table_name),
+                    "watermark": watermark,
+                }
+            )
+        logger.info(
+            f"{table_name} ({source.name}): keys {low}-{high - 1}, {len(partitions)} partitions so far"
+        )
+
+    return partitions
+
+
+def plan_run(partition_size: int = DISTRIBUTED_SETTINGS.partition_size) -> str:
+    """
+    Record the partitions of a new run in ETLPartitions for workers to claim.
+    Returns the run id.
+    """
+    outstanding = get_outstanding_partitions()
+    if outstanding:
+        run_ids = sorted({p["runId"] for p in outstanding})
+        raise RuntimeError(f"Runs {run_ids} still have unfinished partitions")
+
+    # Sources added to ETL_SOURCES since the migrations ran need their tags
+    if physical_design_enabled():
+        ensure_source_systems(source.source_system for source in SOURCES)
+
+    # Generate DimDate up front so concurrent fact partitions never race to create it
+    load_dim_date()
+
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    partitions = [
+        p
+        for source in SOURCES
+        for p in build_partitions(run_id, source, partition_size)
+    ]
+
+    supabase = get_supabase_client()
+    for i in range(0, len(partitions), INSERT_BATCH_SIZE):
+        batch = partitions[i : i + INSERT_BATCH_SIZE]
+        try:
+            supabase.table("ETLPartitions").insert(batch).execute()
+        except Exception as e:
+            raise RuntimeError(
+                f"\tFailed to record partitions of run {run_id}: {e}"
+            ) from e
+
+    logger.info(f"Planned run {run_id} with {len(partitions)} partitions")
+    return run_id
+
+
+def claim_partition(
+    worker_id: str, lease_seconds: int = DISTRIBUTED_SETTINGS.lease_seconds
+) -> dict | None:
+    """Claim a pending partition, or one whose lease expired. None if there is none."""
+    res = (
+        get_supabase_client()
+        .rpc(
+            "claim_etl_partition",
+            {
+                "worker": worker_id,
+                "lease_seconds": lease_seconds,
+                "max_attempts": DISTRIBUTED_SETTINGS.max_attempts,
+            },
+        )
+        .execute()
+    )
+    return res.data[0] if res.data else None
+
+
+def renew_lease(
+    partition: dict,
+    worker_id: str,
+    lease_seconds: int = DISTRIBUTED_SETTINGS.lease_seconds,
+) -> None:
+    """Extend the lease on a partition, or raise if another worker reclaimed it."""
+    res = (
+        get_supabase_client()
+        .rpc(
+            "renew_etl_partition_lease",
+            {
+                "partition_id": partition["id"],
+                "worker": worker_id,
+                "lease_seconds": lease_seconds,
+            },
+        )
+        .execute()
+    )
+    if not res.data:
+        raise RuntimeError(f"Lost the lease on partition {partition['id']}")
+
+
+class LeaseHeartbeat:
+    """
+    Renews the lease on a partition from a background thread while the worker
+    processes it, so partitions taking longer than one lease are not reclaimed.
+    `check` raises once a renewal failed.
+    """
+
+    def __init__(
+        self,
+        partition: dict,
+        worker_id: str,
+        lease_seconds: int = DISTRIBUTED_SETTINGS.lease_seconds,
+    ):
+        self.partition = partition
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.error: Exception | None = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"lease-{partition['id']}", daemon=True
+        )
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                renew_lease(self.partition, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.debug(
+                    f"Renewing the lease on partition {self.partition['id']} failed",
+                    exc_info=True,
+                )
+                self.error = e
+                return
+
+    def check(self) -> None:
+        """Raise if the lease could not be renewed (e.g. another worker has it)."""
+        if self.error is not None:
+            raise RuntimeError(
+                f"Lease on partition {self.partition['id']} not renewed: {self.error}"
+            )
+
+    def __enter__(self) -> Self:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+
+def complete_partition(partition: dict, worker_id: str, rows: int) -> None:
+    res = (
+        get_supabase_client()
+        .table("ETLPartitions")
+        .update(
+            {
+                "status": "done",
+                "rows": rows,
+                "error": None,
+                "leaseExpiresAt": None,
+                "updatedAt": datetime.now().astimezone().isoformat(),
+            }
+        )
+        .eq("id", partition["id"])
+        .eq("leaseOwner", worker_id)
+        .eq("status", "claimed")
+        .execute()
+    )
+    if not res.data:
+        # The upserts are idempotent, so the new owner just loads the range again
+        logger.warning(
+            f"Partition {partition['id']} was reclaimed before it was marked done"
+        )
+
+
+def fail_partition(partition: dict, worker_id: str, error: Exception) -> None:
+    """Release a partition for retry, or mark it failed after its last attempt."""
+    supabase = get_supabase_client()
+    failed = partition["attempts"] >= DISTRIBUTED_SETTINGS.max_attempts
+    res = (
+        supabase.table("ETLPartitions")
+        .update(
+            {
+                "status": "failed" if failed else "pending",
+                "leaseOwner": None,
+                "leaseExpiresAt": None,
+                "error": str(error),
+                "updatedAt": datetime.now().astimezone().isoformat(),
+            }
+        )
+        .eq("id", partition["id"])
+        .eq("leaseOwner", worker_id)
+        .eq("status", "claimed")
+        .execute()
+    )
+
+    if failed and res.data:
+        # Later phases of the run can never be claimed now, so stop them too
+        (
+            supabase.table("ETLPartitions")
+            .update(
+                {
+                    "status": "failed",
+                    "error": f"Blocked by failed partition {partition['id']}",
+                }
+            )
+            .eq("runId", partition["runId"])
+            .gt("phase", partition["phase"])
+            .eq("status", "pending")
+            .execute()
+        )
+
+
+def get_dim_date() -> pd.DataFrame:
+    """DimDate, fetched once per worker process."""
+    global _dim_date_df
+    if _dim_date_df is None:
+        _dim_date_df = load_dim_date()
+    return _dim_date_df
+
+
+def process_partition(partition: dict) -> pd.DataFrame:
+    """
+    Extract and transform one partition's key range: the rows updated after
+    `since` and up to the run's watermark, later rows being left to the next run.
+    """
+    source = get_source_settings(partition["sourceName"])
+    engine = get_source_engine(source.name)
+    table_name = partition["tableName"]
+    since = partition["since"]
+    until = datetime.fromisoformat(partition["watermark"])
+    id_range = (partition["low"], partition["high"])
+    tag = source.source_system
+    transforms = get_transform_engine()
+
+    if TRANSFORM_SETTINGS.pushdown and table_name in PUSHDOWN_KEYS:
+        return extract_dimension(
+            engine,
+            PUSHDOWN_KEYS[table_name],
+            tag,
+            since,
+            id_range=id_range,
+            until=until,
+        )
+    if table_name == "DimUsers":
+        return transforms.transform_dim_users(
+            extract_table(engine, User, since, id_range=id_range, until=until), tag
+        )
+    if table_name == "DimProducts":
+        return transforms.transform_dim_products(
+            extract_table(engine, Product, since, id_range=id_range, until=until), tag
+        )
+    if table_name == "DimRiders":
+        return transforms.transform_dim_riders(
+            extract_table(engine, Rider, since, id_range=id_range, until=until),
+            extract_table(engine, Courier),
+            tag,
+        )
+
+    joined_df = extract_joined_data(
+        since, id_range=id_range, source=source.name, until=until
+    )
+    if joined_df.empty:
+        return joined_df
+    return transforms.transform_fact_sales(joined_df, get_dim_date(), tag)
+
+
+def get_fact_keys(partition: dict, source_system: str) -> dict:
+    """
+    Dimension source ids facts of a run may reference. Facts only run once every
+    dimension partition is loaded, so the warehouse has them all by then.
+    """
+    cache_key = (partition["runId"], source_system)
+    if cache_key not in _dimension_keys:
+        _dimension_keys[cache_key] = get_dimension_keys(source_system)
+    return _dimension_keys[cache_key]
+
+
+def run_partition(partition: dict, worker_id: str) -> int:
+    """
+    Extract, transform, validate and load one claimed partition, renewing its
+    lease throughout. Returns the rows loaded (quarantined rows excluded).
+    """
+    table_name = partition["tableName"]
+    tag = get_source_settings(partition["sourceName"]).source_system
+
+    with LeaseHeartbeat(partition, worker_id) as heartbeat:
+        df = process_partition(partition)
+        if df.empty:
+            return 0
+
+        keys = get_fact_keys(partition, tag) if table_name == "FactSales" else None
+        df, quarantined, counts = validate_frame(table_name, df, keys)
+
+        # Don't write for a range another worker has taken over
+        heartbeat.check()
+        # A retried partition replaces the quarantined rows of its earlier attempt
+        clear_quarantine(
+            partition["runId"], [table_name], tag, (partition["low"], partition["high"])
+        )
+        insert_quarantine(partition["runId"], table_name, quarantined)
+        if counts:
+            logger.warning(
+                f"Partition {partition['id']} failed validation rules: {counts}"
+            )
+        if df.empty:
+            return 0
+
+        if table_name == "FactSales":
+            load_fact_sales(
+                df, batch_size=UPSERT_BATCH_SIZE, wait_seconds=UPSERT_WAIT_SEC
+            )
+        else:
+            load_dimension(
+                table_name,
+                df,
+                batch_size=UPSERT_BATCH_SIZE,
+                wait_seconds=UPSERT_WAIT_SEC,
+            )
+        resolve_quarantine(partition["runId"], table_name, df)
+        return len(df)
+
+
+def get_run_rows(run_id: str) -> dict[str, int]:
+    """Rows loaded per warehouse table by the done partitions of a run."""
+    supabase = get_supabase_client()
+    totals: dict[str, int] = {}
+    offset = 0
+
+    while True:
+        res = (
+            supabase.table("ETLPartitions")
+            .select("tableName,rows")
+            .eq("runId", run_id)
+            .eq("status", "done")
+            .order("id")
+            .range(offset, offset + INSERT_BATCH_SIZE - 1)
+            .execute()
+        )
+        page = res.data or []
+        for row in page:
+            totals[row["tableName"]] = totals.get(row["tableName"], 0) + (
+                row["rows"] or 0
+            )
+        if len(page) < INSERT_BATCH_SIZE:
+            return totals
+        offset += INSERT_BATCH_SIZE
+
+
+def finalize_run(run_id: str) -> bool:
+    """
+    Advance the ETLControl watermarks of a run once all its partitions are done.
+    Safe to call from several workers. Returns whether the run is complete.
+    """
+    res = (
+        get_supabase_client()
+        .table("ETLPartitions")
+        .select("status")
+        .eq("runId", run_id)
+        .neq("status", "done")
+        .limit(1)
+        .execute()
+    )
+    if res.data:
+        return False
+
+    # Every partition of a source shares its watermark
+    watermarks = {}
+    for source in SOURCES:
+        res = (
+            get_supabase_client()
+            .table("ETLPartitions")
+            .select("watermark")
+            .eq("runId", run_id)
+            .eq("sourceName", source.name)
+            .limit(1)
+            .execute()
+        )
+        if res.data:
+            watermarks[source.name] = res.data[0]["watermark"]
+
+    # Workers never drop indexes, but make sure they exist before dashboards query
+    if physical_design_enabled():
+        create_fact_indexes()
+        analyze_tables(get_run_rows(run_id))
+
+    for source_name, watermark in watermarks.items():
+        load_time = datetime.fromisoformat(watermark)
+        for table_name in ["DimDate", *PARTITION_TABLES]:
+            update_last_load_time(table_name, load_time, source_name)
+        logger.info(f"Run {run_id}: watermark of {source_name} → {load_time}")
+
+    return True
+
+
+def run_worker(worker_id: str | None = None, max_partitions: int | None = None) -> int:
+    """
+    Claim and process partitions until no run has unfinished partitions left,
+    then finalize the runs this worker took part in. Returns the partitions processed.
+    """
+    worker_id = worker_id or default_worker_id()
+    run_ids: set[str] = set()
+    processed = 0
+    logger.info(f"Worker {worker_id} started")
+
+    while max_partitions is None or processed < max_partitions:
+        partition = claim_partition(worker_id)
+        if partition is None:
+            # Claimed partitions may still come back if their worker crashes
+            if get_outstanding_partitions():
+                time.sleep(DISTRIBUTED_SETTINGS.poll_seconds)
+                continue
+            break
+
+        run_ids.add(partition["runId"])
+        label = f"{partition['tableName']} ({partition['sourceName']}) [{partition['low']}, {partition['high']})"
+        logger.info(f"Claimed partition {partition['id']}: {label}")
+        try:
+            rows = run_partition(partition, worker_id)
+        except Exception as e:
+            logger.exception(f"Partition {partition['id']} failed")
+            fail_partition(partition, worker_id, e)
+            continue
+
+        complete_partition(partition, worker_id, rows)
+        processed += 1
+        logger.info(f"Loaded {rows} rows for {label}")
+
+    for run_id in sorted(run_ids):
+        if finalize_run(run_id):
+            logger.info(f"Run {run_id} complete")
+
+    logger.info(f"Worker {worker_id} processed {processed} partitions")
+    return processed
@@ -1,92 +1,147 @@
+import logging
 import pandas as pd
-from sqlalchemy import select, text
+from sqlalchemy import TextClause, func, select, text
+from collections.abc import Iterator
 from typing import Dict
 from datetime import datetime
 from .db import get_source_engine
 from .source_models import User, Product, Order, OrderItem, Rider, Courier
 
+logger = logging.getLogger(__name__)
+
+# Map source tables to their models and one of their destination warehouse tables
+EXTRACT_TABLES = {
+    "users": (User, "DimUsers"),
+    "riders": (Rider, "DimRiders"),
+    "couriers": (Courier, "DimRiders"),
+    "products": (Product, "DimProducts"),
+    "orders": (Order, "FactSales"),
+    "order_items": (OrderItem, "FactSales"),
+}
+
 
 def extract_all_tables(
     last_load_times: Dict[str, datetime | None] = {},
     limit: int | None = None,
+    source: str | None = None,
 ) -> Dict[str, pd.DataFrame]:
     """
     Extract source tables into DataFrames.
     Incremental extraction depends on the last load times of the corresponding warehouse tables.
     """
-    engine = get_source_engine()
-
-    # Map source tables to one of their destination warehouse tables (if any)
-    dependency_mapping = {
-        "users": ("Users", "DimUsers"),
-        "riders": ("Riders", "DimRiders"),
-        "couriers": ("Couriers", "DimRiders"),
-        "products": ("Products", "DimProducts"),
-        "orders": ("Orders", "FactSales"),
-        "order_items": ("OrderItems", "FactSales"),
-    }
+    engine = get_source_engine(source)
 
     results = {}
-    for key, (_, warehouse_table) in dependency_mapping.items():
+    for key, (model, warehouse_table) in EXTRACT_TABLES.items():
         last_time = last_load_times.get(warehouse_table)
-        print(
-            f"{'\tIncremental' if last_time else 'Full'} load for {key} (→ {warehouse_table})"
+        logger.info(
+            f"{'Incremental' if last_time else 'Full'} load for {key} (→ {warehouse_table})"
         )
 
-        model = {
-            "users": User,
-            "products": Product,
-            "orders": Order,
-            "order_items": OrderItem,
-            "riders": Rider,
-            "couriers": Courier,
-        }[key]
-
         df = extract_table(engine, model, last_time, limit=limit)
-        print(f"\tExtracted {len(df)} rows from {key}")
+        logger.info(f"Extracted {len(df)} rows from {key}")
         results[key] = df
 
     return results
 
 
+def build_table_query(
+    model_class,
+    last_load_time=None,
+    limit: int | None = None,
+    id_range: tuple[int, int] | None = None,
+    query=None,
+    until: datetime | None = None,
+):
+    """
+    Build the extract query for a single table with optional incremental filter and limit.
+    `id_range` restricts the extract to primary keys in [low, high).
+    `query` replaces the default SELECT of the whole row (e.g. a projection).
+    `until` leaves out rows updated after it (a watermark), for the next run.
+    """
+    if query is None:
+        query = select(model_class)
+    if id_range is not None:
+        query = query.where(model_class.id >= id_range[0], model_class.id < id_range[1])
+    if until is not None:
+        query = query.where(model_class.updatedAt <= until)
+
+    if last_load_time:
+        # Convert string to datetime if needed
+        if isinstance(last_load_time, str):
+            try:
+                last_load_time = datetime.fromisoformat(last_load_time)
+            except ValueError as e:
+                logger.warning(
+                    f"Invalid timestamp format for {model_class.__tablename__}: "
+                    f"{last_load_time} ({e}). Falling back to full extract."
+                )
+                return query
+
+        query = query.where(model_class.updatedAt > last_load_time)
+
+    # Apply limit if specified
+    if limit is not None and limit > 0:
+        query = query.limit(limit)
+
+    return query
+
+
 def extract_table(
-    engine, model_class, last_load_time=None, limit: int | None = None
+    engine,
+    model_class,
+    last_load_time=None,
+    limit: int | None = None,
+    id_range: tuple[int, int] | None = None,
+    until: datetime | None = None,
 ) -> pd.DataFrame:
     """Extract a single table with optional incremental filter and limit for testing."""
     try:
-        query = select(model_class)
-        if last_load_time:
-            # Convert string to datetime if needed
-            if isinstance(last_load_time, str):
-                try:
-                    last_load_time = datetime.fromisoformat(last_load_time)
-                except ValueError as e:
-                    print(
-                        f"Invalid timestamp format for {model_class.__tablename__}: {last_load_time}"
-                    )
-                    print(f"Error: {e}. Falling back to full extract.")
-                    return pd.read_sql(query, engine)
-
-            query = query.where(model_class.updatedAt > last_load_time)
-
-        # Apply limit if specified
-        if limit is not None and limit > 0:
-            query = query.limit(limit)
-
+        query = build_table_query(
+            model_class, last_load_time, limit, id_range, until=until
+        )
         df = pd.read_sql(query, engine)
         if df.empty:
-            print(f"No data found for {model_class.__tablename__}")
+            logger.debug(f"No data found for {model_class.__tablename__}")
         return df
 
     except Exception as e:
-        print(f"Error extracting {model_class.__tablename__}: {e}")
+        logger.error(f"Error extracting {model_class.__tablename__}: {e}")
         raise
 
 
-def extract_joined_data(last_load_time=None, limit: int | None = None) -> pd.DataFrame:
-    """Extract order data with related info, optionally incremental"""
-    engine = get_source_engine()
+def extract_table_chunks(
+    engine,
+    model_class,
+    chunksize: int,
+    last_load_time=None,
+    limit: int | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Extract a single table as DataFrames of at most `chunksize` rows, streamed
+    from an unbuffered cursor so only one chunk is held in memory.
+    """
+    query = build_table_query(model_class, last_load_time, limit).execution_options(
+        stream_results=True
+    )
+    try:
+        yield from pd.read_sql(query, engine, chunksize=chunksize)
+    except Exception as e:
+        logger.error(f"Error extracting {model_class.__tablename__}: {e}")
+        raise
 
+
+def build_joined_query(
+    last_load_time=None,
+    limit: int | None = None,
+    id_range: tuple[int, int] | None = None,
+    until: datetime | None = None,
+) -> tuple[TextClause, dict]:
+    """
+    Build the order data query with related info, optionally incremental.
+    `id_range` restricts the extract to order ids in [low, high), and `until`
+    to orders and items not updated after it.
+    """
     query = """
     SELECT
         o.id AS order_id,
@@ -155,12 +210,24 @@ def extract_joined_data(last_load_time=None, limit: int | None = None) -> pd.Dat
             try:
                 last_load_time = datetime.fromisoformat(last_load_time)
             except ValueError as e:
-                print(f"Invalid timestamp format for joined data: {last_load_time}")
-                print(f"Error: {e}. Proceeding with full extract.")
+                logger.warning(
+                    f"Invalid timestamp format for joined data: {last_load_time} "
+                    f"({e}). Proceeding with full extract."
+                )
                 last_load_time = None
 
         if last_load_time:
-            query += f" AND (o.updatedAt > '{last_load_time}' OR oi.updatedAt > '{last_load_time}')"
+            query += (
+                " AND (o.updatedAt > :last_load_time OR oi.updatedAt > :last_load_time)"
+            )
+            params["last_load_time"] = last_load_time
+
+    if id_range is not None:
+        query += " AND o.id >= :id_low AND o.id < :id_high"
+        params.update({"id_low": id_range[0], "id_high": id_range[1]})
+    if until is not None:
+        query += " AND o.updatedAt <= :until AND oi.updatedAt <= :until"
+        params["until"] = until
 
     query += " ORDER BY order_id, product_id_ref"
 
@@ -168,21 +235,63 @@ def extract_joined_data(last_load_time=None, limit: int | None = None) -> pd.Dat
     if limit is not None and limit > 0:
         query += f" LIMIT {limit}"
 
+    return text(query), params
+
+
+def extract_joined_data(
+    last_load_time=None,
+    limit: int | None = None,
+    id_range: tuple[int, int] | None = None,
+    source: str | None = None,
+    engine=None,
+    until: datetime | None = None,
+) -> pd.DataFrame:
+    """
+    Extract order data with related info, optionally incremental.
+    `engine` overrides the source's engine (e.g. a snapshot connection).
+    """
+    if engine is None:
+        engine = get_source_engine(source)
+    query, params = build_joined_query(last_load_time, limit, id_range, until)
+
     try:
         df = pd.read_sql(query, engine, params=params)
         if df.empty:
-            print("No joined order data found")
+            logger.debug("No joined order data found")
         else:
-            print(f"Extracted {len(df)} joined order records")
+            logger.info(f"Extracted {len(df)} joined order records")
         return df
     except Exception as e:
-        print(f"Error extracting joined data: {e}")
+        logger.error(f"Error extracting joined data: {e}")
+        raise
+
+
+def extract_joined_chunks(
+    chunksize: int,
+    last_load_time=None,
+    limit: int | None = None,
+    source: str | None = None,
+    engine=None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Extract order data with related info as DataFrames of at most `chunksize`
+    rows, streamed from an unbuffered cursor.
+    """
+    if engine is None:
+        engine = get_source_engine(source)
+    query, params = build_joined_query(last_load_time, limit)
+    query = query.execution_options(stream_results=True)
+
+    try:
+        yield from pd.read_sql(query, engine, params=params, chunksize=chunksize)
+    except Exception as e:
+        logger.error(f"Error extracting joined data: {e}")
         raise
 
 
-def get_table_counts() -> Dict[str, int]:
+def get_table_counts(source: str | None = None) -> Dict[str, int]:
     """Get row counts for all source tables"""
-    engine = get_source_engine()
+    engine = get_source_engine(source)
     tables = ["Users", "Products", "Orders", "OrderItems", "Riders", "Couriers"]
     counts = {}
 
@@ -192,9 +301,45 @@ def get_table_counts() -> Dict[str, int]:
                 result = conn.execute(text(f"SELECT COUNT(*) FROM {table}"))
                 count = result.scalar_one()
                 counts[table] = count
-                print(f"{table}: {count:,} rows")
+                logger.info(f"{table}: {count:,} rows")
     except Exception as e:
-        print(f"Error getting table counts: {e}")
+        logger.error(f"Error getting table counts: {e}")
         raise
 
     return counts
+
+
+def get_key_bounds(model_class, source: str | None = None) -> tuple[int, int]:
+    """Get the [low, high) primary key range of a source table, (0, 0) if empty"""
+    engine = get_source_engine(source)
+    query = select(func.min(model_class.id), func.max(model_class.id))
+
+    try:
+        with engine.connect() as conn:
+            low, high = conn.execute(query).one()
+    except Exception as e:
+        logger.error(f"Error getting key bounds of {model_class.__tablename__}: {e}")
+        raise
+
+    if low is None:
+        return 0, 0
+    return int(low), int(high) + 1
+
+
+def get_avg_row_lengths(source: str | None = None) -> dict[str, int]:
+    """Get the average on-disk row length (bytes) of each source table"""
+    engine = get_source_engine(source)
+    query = text(
+        """
+        SELECT  TABLE_NAME, AVG_ROW_LENGTH
+        FROM    information_schema.TABLES
+        WHERE   TABLE_SCHEMA = DATABASE()
+        """
+    )
+
+    try:
+        with engine.connect() as conn:
+            return {row[0]: int(row[1] or 0) for row in conn.execute(query)}
+    except Exception as e:
+        logger.error(f"Error getting average row lengths: {e}")
+        raise
@@ -2,20 +2,33 @@ import time
 import numpy as np
 import pandas as pd
 from datetime import datetime
-from src.db import get_supabase_client
+from src.config import DEFAULT_SOURCE_NAME, MySQLSettings
+from src.db import get_source_settings, get_supabase_client
+from src.warehouse import ensure_fact_partitions, physical_design_enabled
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Dimension rows are identified by source system and source primary key, and
+# each version of one (see scd.py) by when it became valid
+DIMENSION_NATURAL_KEY = ["sourceSystem", "sourceId"]
+DIMENSION_VERSION_KEY = [*DIMENSION_NATURAL_KEY, "validFrom"]
+# FactSales rows are identified by source system, order and product. The delivery
+# date is the partition key, which Postgres requires in every unique key.
+FACT_SALES_NATURAL_KEY = ["sourceSystem", "sourceId", "productId", "deliveryDate"]
 
-def get_last_load_time(table_name: str) -> datetime | None:
-    """Fetch the last load time for a given table from ETLControl."""
+
+def get_last_load_time(
+    table_name: str, source_name: str = DEFAULT_SOURCE_NAME
+) -> datetime | None:
+    """Fetch the last load time for a given table and source from ETLControl."""
     supabase = get_supabase_client()
     try:
         res = (
             supabase.table("ETLControl")
             .select("lastLoadTime")
             .eq("tableName", table_name)
+            .eq("sourceName", source_name)
             .limit(1)
             .execute()
         )
@@ -39,10 +52,41 @@ def get_last_load_time(table_name: str) -> datetime | None:
         raise RuntimeError(f"Failed to get last load time for {table_name}: {e}")
 
 
-def get_last_load_times() -> dict[str, datetime | None]:
-    """Fetch last load times for all data warehouse tables."""
+def get_last_load_times(
+    source_name: str = DEFAULT_SOURCE_NAME,
+) -> dict[str, datetime | None]:
+    """
+    Fetch last load times for all data warehouse tables, for one source. A
+    source in ETL_SOURCES with the tag of the single-source setup
+    (MYSQL_SOURCE_SYSTEM) continues its watermarks until it has its own.
+    """
     tables = ["DimUsers", "DimDate", "DimRiders", "DimProducts", "FactSales"]
-    return {t: get_last_load_time(t) for t in tables}
+    times = {t: get_last_load_time(t, source_name) for t in tables}
+    if (
+        source_name != DEFAULT_SOURCE_NAME
+        and get_source_settings(source_name).source_system
+        == MySQLSettings().source_system
+    ):
+        for t in tables:
+            if times[t] is None:
+                times[t] = get_last_load_time(t, DEFAULT_SOURCE_NAME)
+    return times
+
+
+def to_records(df: pd.DataFrame) -> list[dict]:
+    """Rows as JSON-serializable dicts (pandas/numpy types converted, nulls as None)."""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype(str)
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].apply(
+                lambda x: (
+                    None if pd.isna(x) else x.item() if isinstance(x, np.generic) else x
+                )
+            )
+    df = df.where(pd.notnull(df), None)
+    return df.to_dict(orient="records")
 
 
 def upsert(
@@ -54,24 +98,20 @@ def upsert(
 ) -> None:
     """
     Bulk upsert (insert/update) records in Supabase table in batches.
+    `conflict` is a comma-separated list of the unique key columns.
     Handles pandas/numpy datatypes so data is JSON serializable.
     """
     supabase = get_supabase_client()
 
-    # Clean and convert to JSON-safe types
-    df = df.copy()
-    for col in df.columns:
-        if pd.api.types.is_datetime64_any_dtype(df[col]):
-            df[col] = df[col].astype(str)
-        elif pd.api.types.is_numeric_dtype(df[col]):
-            df[col] = df[col].apply(
-                lambda x: (
-                    None if pd.isna(x) else x.item() if isinstance(x, np.generic) else x
-                )
-            )
-    df = df.where(pd.notnull(df), None)
+    # Postgres rejects an upsert that touches the same row twice, so keep only
+    # the last occurrence of each conflict key
+    conflict_cols = [c.strip() for c in conflict.split(",")]
+    before = len(df)
+    df = df.drop_duplicates(subset=conflict_cols, keep="last")
+    if len(df) < before:
+        logger.info(f"Dropped {before - len(df)} duplicate rows for {table_name}")
 
-    records = df.to_dict(orient="records")
+    records = to_records(df)
 
     # Upsert records by batch
     for i in range(0, len(records), batch_size):
@@ -87,11 +127,64 @@ def upsert(
         time.sleep(wait_seconds)
 
 
-def update_last_load_time(table_name: str, load_time: datetime) -> None:
-    """Insert or update the last load time for a given table."""
+def delete_moved_facts(df: pd.DataFrame) -> int:
+    """
+    Delete FactSales rows of these orders that are stored under another delivery
+    date (and so another partition and natural key). Returns the rows deleted.
+    """
+    keys = df[["sourceSystem", "sourceId", "deliveryDate"]].drop_duplicates()
+    keys = keys.assign(
+        sourceId=keys["sourceId"].astype(int),
+        deliveryDate=pd.to_datetime(keys["deliveryDate"]).dt.strftime("%Y-%m-%d"),
+    )
+    try:
+        res = (
+            get_supabase_client()
+            .rpc("delete_moved_facts", {"facts": keys.to_dict(orient="records")})
+            .execute()
+        )
+    except Exception as e:
+        raise RuntimeError(f"Failed to delete moved FactSales rows: {e}") from e
+
+    deleted = res.data or 0
+    if deleted:
+        logger.info(f"Deleted {deleted} FactSales rows whose delivery date changed")
+    return deleted
+
+
+def upsert_fact_sales(
+    df: pd.DataFrame, batch_size: int = 20000, wait_seconds: float = 2.0
+) -> None:
+    """Upsert FactSales on its natural key, into existing month partitions."""
+    if physical_design_enabled():
+        ensure_fact_partitions(df["deliveryDate"])
+
+    for i in range(0, len(df), batch_size):
+        delete_moved_facts(df.iloc[i : i + batch_size])
+    upsert(
+        "FactSales",
+        df,
+        conflict=",".join(FACT_SALES_NATURAL_KEY),
+        batch_size=batch_size,
+        wait_seconds=wait_seconds,
+    )
+
+
+def update_last_load_time(
+    table_name: str, load_time: datetime, source_name: str = DEFAULT_SOURCE_NAME
+) -> None:
+    """Insert or update the last load time for a given table and source."""
     supabase = get_supabase_client()
     try:
-        payload = [{"tableName": table_name, "lastLoadTime": load_time.isoformat()}]
-        supabase.table("ETLControl").upsert(payload).execute()
+        payload = [
+            {
+                "tableName": table_name,
+                "sourceName": source_name,
+                "lastLoadTime": load_time.isoformat(),
+            }
+        ]
+        supabase.table("ETLControl").upsert(
+            payload, on_conflict="tableName,sourceName"
+        ).execute()
     except Exception as e:
         raise RuntimeError(f"Failed to update ETLControl for {table_name}: {e}")
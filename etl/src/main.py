@@ -1,153 +1,315 @@
+import time
+
+_CLI_START = time.perf_counter()
+
+import argparse
 import logging
-from datetime import datetime
-import pandas as pd
-from .db import get_source_engine, ping_source, get_supabase_client, ping_warehouse
-from .extract import extract_all_tables, extract_joined_data
-from .transform import (
-    transform_dim_users,
-    transform_dim_products,
-    transform_dim_riders,
-    transform_fact_sales,
-    generate_dim_date,
-)
-from .load import get_last_load_times, upsert, update_last_load_time
-
-logging.basicConfig(level=logging.INFO)
+import sys
+from pathlib import Path
+
+from .config import CLI_SETTINGS, DISTRIBUTED_SETTINGS, SOURCES
+
+# Heavy modules (pandas, SQLAlchemy, mysql-connector, supabase) are imported
+# inside the command handlers so that each subcommand only pays for what it uses
+
 logger = logging.getLogger(__name__)
 
-EXTRACT_LIMIT = None
-UPSERT_BATCH_SIZE = 20000
-UPSERT_WAIT_SEC = 1.0
 
+def _resolve_run_dir(run: str | None) -> Path:
+    from .staging import get_staging_root, latest_run_dir
 
-def run_etl():
-    logger.info("Starting ETL pipeline...")
-    start_time = datetime.now()
+    if run:
+        run_dir = get_staging_root() / run
+        if not run_dir.exists():
+            raise SystemExit(f"Staging run not found: {run_dir}")
+        return run_dir
 
-    # Test source connection
-    get_source_engine()
-    ping_source()
-    logger.info("Source engine connected!")
+    latest = latest_run_dir()
+    if latest is None:
+        raise SystemExit("No staging runs found. Run `extract` first.")
+    return latest
 
-    # Test warehouse connection
-    supabase_client = get_supabase_client()
+
+def cmd_ping(args: argparse.Namespace) -> None:
+    from .db import ping_source, ping_warehouse
+
+    for source in SOURCES:
+        ping_source(source.name)
+        logger.info(f"Source engine connected! ({source.name})")
     ping_warehouse()
     logger.info("Supabase client connected!")
 
-    # ETL pipeline
-    try:
-        # 1. Get last load times (for incremental loading)
-        last_load_times = get_last_load_times()
-        logger.info(f"Last load times: {last_load_times}")
-
-        # 2. Extract data
-        extracted = extract_all_tables(last_load_times, limit=EXTRACT_LIMIT)
-        facts_df = extract_joined_data(
-            last_load_times.get("FactSales"), limit=EXTRACT_LIMIT
-        )
 
-        # 3. Transform dimensions
-        logger.info("Transforming dimension data...")
-        dim_users_df = transform_dim_users(extracted["users"])
-        dim_products_df = transform_dim_products(extracted["products"])
-        dim_riders_df = transform_dim_riders(extracted["riders"], extracted["couriers"])
+def cmd_extract(args: argparse.Namespace) -> None:
+    from .pipeline import run_extract
+    from .staging import new_run_dir
 
-        logger.info(
-            f"Transformed {len(dim_users_df)} users, {len(dim_products_df)} products, {len(dim_riders_df)} riders"
-        )
+    run_dir = new_run_dir()
+    run_extract(run_dir, limit=args.limit)
+    print(run_dir)
+
+
+def cmd_transform(args: argparse.Namespace) -> None:
+    from .pipeline import run_transform
+
+    run_transform(_resolve_run_dir(args.run))
+
+
+def cmd_validate(args: argparse.Namespace) -> None:
+    from .pipeline import run_validate
+
+    run_validate(_resolve_run_dir(args.run))
+
+
+def cmd_bench_validate(args: argparse.Namespace) -> None:
+    from .validate import benchmark
+
+    for key, value in benchmark(rows=args.rows).items():
+        print(f"\t{key}: {value}")
+
+
+def cmd_transform_parity(args: argparse.Namespace) -> None:
+    from .transform_engines import check_parity
+
+    rows = check_parity(_resolve_run_dir(args.run), engine=args.engine)
+    for table_name, count in rows.items():
+        print(f"\t{table_name}: {count} rows identical ({args.engine} vs pandas)")
+
+
+def cmd_pushdown_parity(args: argparse.Namespace) -> None:
+    from .pushdown import check_parity
+
+    rows = check_parity(rows=args.rows)
+    for table_name, count in rows.items():
+        print(f"\t{table_name}: {count} rows identical (pushdown vs pandas)")
+
+
+def cmd_load(args: argparse.Namespace) -> None:
+    from .pipeline import run_load
+
+    run_load(_resolve_run_dir(args.run), tables=args.table)
+
+
+def cmd_run(args: argparse.Namespace) -> None:
+    from .pipeline import run_etl
+
+    run_etl(limit=args.limit)
+
+
+def cmd_status(args: argparse.Namespace) -> None:
+    from .staging import list_run_dirs, read_manifest
+
+    runs = list_run_dirs()
+    if not runs:
+        print("No staging runs.")
+    for run_dir in runs:
+        stages = read_manifest(run_dir).get("stages", {})
+        print(f"{run_dir.name}: {', '.join(stages) or 'no completed stages'}")
+
+    if args.local:
+        return
+
+    from .load import get_last_load_times
 
-        # 4. Load to Supabase
-        logger.info("Loading dimension data to Supabase...")
-        if not dim_users_df.empty:
-            print(dim_users_df.head(20))
-            print(dim_users_df.dtypes)
-            logger.info(f"Upserting {len(dim_users_df)} → DimUsers")
-            assert isinstance(dim_users_df, pd.DataFrame)
-            upsert(
-                "DimUsers",
-                dim_users_df,
-                conflict="sourceId",
-                batch_size=UPSERT_BATCH_SIZE,
-                wait_seconds=UPSERT_WAIT_SEC,
-            )
-
-        if not dim_products_df.empty:
-            print(dim_products_df.head(20))
-            print(dim_products_df.dtypes)
-            logger.info(f"Upserting {len(dim_products_df)} → DimProducts")
-            assert isinstance(dim_products_df, pd.DataFrame)
-            upsert(
-                "DimProducts",
-                dim_products_df,
-                conflict="sourceId",
-                batch_size=UPSERT_BATCH_SIZE,
-                wait_seconds=UPSERT_WAIT_SEC,
-            )
-
-        if not dim_riders_df.empty:
-            print(dim_riders_df.head(20))
-            print(dim_riders_df.dtypes)
-            logger.info(f"Upserting {len(dim_riders_df)} → DimRiders")
-            assert isinstance(dim_riders_df, pd.DataFrame)
-            upsert(
-                "DimRiders",
-                dim_riders_df,
-                conflict="sourceId",
-                batch_size=UPSERT_BATCH_SIZE,
-                wait_seconds=UPSERT_WAIT_SEC,
-            )
-
-        # Create DimDate as needed
-        dim_date_df = None
-        try:
-            existing_dim_date = (
-                supabase_client.table("DimDate")
-                .select("fullDate", count="exact")
-                .limit(1)
-                .execute()
-            )
-            print(
-                f"Existing DimDate table: data={existing_dim_date.data}, count={existing_dim_date.count}"
-            )
-
-            if not existing_dim_date.data:
-                logger.info("No DimDate records found — generating date dimension...")
-                dim_date_df = generate_dim_date()
-                upsert("DimDate", dim_date_df, conflict="fullDate")
-                logger.info(f"Created DimDate with {len(dim_date_df)} records")
-            else:
-                dim_date_df = existing_dim_date
-                logger.info("DimDate already exists — skipping generation.")
-
-        except Exception as e:
-            logger.error(f"Failed to check or generate DimDate: {e}")
-            raise
-
-        # 5. Transform + load facts
-        if not facts_df.empty:
-            fact_sales_df = transform_fact_sales(facts_df)
-            logger.info(f"Upserting {len(fact_sales_df)} → FactSales")
-            upsert("FactSales", fact_sales_df, conflict="id")
-
-        # 6. Update ETLControl
-        logger.info("Updating ETL metadata...")
-        for table_name in [
-            "DimUsers",
-            "DimDate",
-            "DimRiders",
-            "DimProducts",
-            "FactSales",
-        ]:
-            update_last_load_time(table_name, start_time)
-            logger.info(f"Updated {table_name} lastLoadTime → {start_time}")
-
-        duration = (datetime.now() - start_time).total_seconds()
-        logger.info(f"ETL pipeline completed in {duration:.2f} seconds")
+    for source in SOURCES:
+        for table_name, last_load_time in get_last_load_times(source.name).items():
+            print(f"\t{table_name} lastLoadTime → {last_load_time} ({source.name})")
 
+
+def cmd_sync_deletes(args: argparse.Namespace) -> None:
+    from .delete_sync import sync_deletes
+
+    for table_name, count in sync_deletes(args.table, dry_run=args.dry_run).items():
+        print(f"\t{table_name}: {count} orphaned sourceIds")
+
+
+def cmd_reconcile(args: argparse.Namespace) -> None:
+    from .reconcile import reconcile
+
+    results = reconcile(args.table, repair=not args.check_only)
+    for table_name, ranges in results.items():
+        print(f"\t{table_name}: {len(ranges)} mismatching partitions {ranges}")
+
+
+def cmd_plan(args: argparse.Namespace) -> None:
+    from .distributed import plan_run
+
+    print(plan_run(partition_size=args.partition_size))
+
+
+def cmd_worker(args: argparse.Namespace) -> None:
+    from .distributed import run_worker
+
+    run_worker(worker_id=args.worker_id, max_partitions=args.max_partitions)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main", description="E-commerce data warehouse ETL"
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        "-v", "--verbose", action="store_true", help="Log at DEBUG level"
+    )
+    verbosity.add_argument(
+        "-q", "--quiet", action="store_true", help="Only log warnings and errors"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser(
+        "ping", help="Check source and warehouse connectivity"
+    ).set_defaults(func=cmd_ping)
+
+    extract = subparsers.add_parser(
+        "extract", help="Extract source tables into a new staging run"
+    )
+    extract.add_argument("--limit", type=int, default=None)
+    extract.set_defaults(func=cmd_extract)
+
+    transform = subparsers.add_parser(
+        "transform", help="Transform a staged extract (latest run by default)"
+    )
+    transform.add_argument("--run", help="Staging run id")
+    transform.set_defaults(func=cmd_transform)
+
+    validate = subparsers.add_parser(
+        "validate",
+        help="Validate a staged transform and set failing rows aside (latest run by default)",
+    )
+    validate.add_argument("--run", help="Staging run id")
+    validate.set_defaults(func=cmd_validate)
+
+    bench_validate = subparsers.add_parser(
+        "bench-validate", help="Time validation of a synthetic FactSales batch"
+    )
+    bench_validate.add_argument("--rows", type=int, default=10_000_000)
+    bench_validate.set_defaults(func=cmd_bench_validate)
+
+    transform_parity = subparsers.add_parser(
+        "transform-parity",
+        help="Check a transform engine's output matches pandas on a staged extract",
+    )
+    transform_parity.add_argument("--run", help="Staging run id")
+    transform_parity.add_argument(
+        "--engine", default="polars", help="Engine to compare with pandas"
+    )
+    transform_parity.set_defaults(func=cmd_transform_parity)
+
+    pushdown_parity = subparsers.add_parser(
+        "pushdown-parity",
+        help="Check the pushdown dimension queries match the pandas transforms on the sources",
+    )
+    pushdown_parity.add_argument(
+        "--rows",
+        type=int,
+        default=None,
+        help="Compare only the first ids of each table",
+    )
+    pushdown_parity.set_defaults(func=cmd_pushdown_parity)
+
+    load = subparsers.add_parser(
+        "load", help="Load a staged, validated transform (latest run by default)"
+    )
+    load.add_argument("--run", help="Staging run id")
+    load.add_argument(
+        "--table",
+        action="append",
+        help="Warehouse table to load; repeat for several (default: all)",
+    )
+    load.set_defaults(func=cmd_load)
+
+    run = subparsers.add_parser("run", help="Run extract, transform and load")
+    run.add_argument("--limit", type=int, default=None)
+    run.set_defaults(func=cmd_run)
+
+    status = subparsers.add_parser(
+        "status", help="Show staging runs and warehouse load times"
+    )
+    status.add_argument(
+        "--local", action="store_true", help="Skip querying the warehouse"
+    )
+    status.set_defaults(func=cmd_status)
+
+    sync_deletes = subparsers.add_parser(
+        "sync-deletes",
+        help="Delete warehouse rows whose source rows were hard-deleted",
+    )
+    sync_deletes.add_argument(
+        "--table",
+        action="append",
+        help="Warehouse table to sync; repeat for several (default: all)",
+    )
+    sync_deletes.add_argument(
+        "--dry-run", action="store_true", help="Only count orphaned rows"
+    )
+    sync_deletes.set_defaults(func=cmd_sync_deletes)
+
+    reconcile = subparsers.add_parser(
+        "reconcile",
+        help="Compare partition checksums with the source and repair mismatches",
+    )
+    reconcile.add_argument(
+        "--table",
+        action="append",
+        help="Warehouse table to reconcile; repeat for several (default: all)",
+    )
+    reconcile.add_argument(
+        "--check-only",
+        action="store_true",
+        help="Report mismatching partitions without re-extracting them",
+    )
+    reconcile.set_defaults(func=cmd_reconcile)
+
+    plan = subparsers.add_parser(
+        "plan", help="Split a new run into partitions for distributed workers"
+    )
+    plan.add_argument(
+        "--partition-size",
+        type=int,
+        default=DISTRIBUTED_SETTINGS.partition_size,
+        help="Source primary keys per partition",
+    )
+    plan.set_defaults(func=cmd_plan)
+
+    worker = subparsers.add_parser(
+        "worker", help="Claim and process partitions until every run is finished"
+    )
+    worker.add_argument("--worker-id", help="Lease owner name (default: host:pid)")
+    worker.add_argument(
+        "--max-partitions",
+        type=int,
+        default=None,
+        help="Exit after processing this many partitions",
+    )
+    worker.set_defaults(func=cmd_worker)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+
+    if args.verbose:
+        level = "DEBUG"
+    elif args.quiet:
+        level = "WARNING"
+    else:
+        level = CLI_SETTINGS.log_level
+    logging.basicConfig(level=level)
+
+    startup_ms = (time.perf_counter() - _CLI_START) * 1000
+    logger.debug(f"CLI started in {startup_ms:.1f} ms")
+    if startup_ms > CLI_SETTINGS.startup_budget_ms:
+        logger.warning(
+            f"CLI startup took {startup_ms:.1f} ms (budget: {CLI_SETTINGS.startup_budget_ms} ms)"
+        )
+
+    try:
+        args.func(args)
     except Exception as e:
-        logger.error(f"ETL pipeline failed: {e}")
-        raise
+        logger.error(f"`{args.command}` failed: {e}", exc_info=args.verbose)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    run_etl()
+    main()
@@ -0,0 +1,226 @@
+import logging
+import os
+import resource
+import sys
+import threading
+import weakref
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import pandas as pd
+from typing_extensions import Self
+
+from .config import MEMORY_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Share of the budget one table may use; the rest is headroom for transform copies
+TABLE_BUDGET_SHARE = 0.5
+MB = 1024 * 1024
+
+# Source tables behind the joined FactSales extract
+JOINED_SOURCE_TABLES = [
+    "Orders",
+    "OrderItems",
+    "Users",
+    "Products",
+    "Riders",
+    "Couriers",
+]
+
+
+def get_process_peak_rss_mb() -> float:
+    """Peak resident set size of this process since it started (all stages)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+def get_rss_mb() -> float | None:
+    """Current resident set size of this process, None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / MB
+
+
+class RSSSampler:
+    """Samples the process RSS from a background thread and keeps the highest."""
+
+    def __init__(self, interval: float = MEMORY_SETTINGS.rss_sample_seconds):
+        self.interval = interval
+        self.peak_mb = get_rss_mb()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        rss = get_rss_mb()
+        if rss is not None:
+            self.peak_mb = max(self.peak_mb or 0.0, rss)
+
+    def __enter__(self) -> Self:
+        if self.peak_mb is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._thread.is_alive():
+            self._stopped.set()
+            self._thread.join()
+            self._sample()
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def downcast_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrink integer columns to the smallest dtype that holds their values.
+    Floats and strings are left alone so transforms see the same values.
+    """
+    for col in df.columns:
+        if pd.api.types.is_integer_dtype(df[col]) and not pd.api.types.is_bool_dtype(
+            df[col]
+        ):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+class MemoryGovernor:
+    """
+    Plans chunked extracts against a memory budget and tracks the memory of the
+    DataFrames each stage holds.
+    """
+
+    def __init__(self, budget_mb: int = MEMORY_SETTINGS.budget_mb):
+        self.budget_bytes = budget_mb * MB
+        self.peaks: dict[str, dict[str, float | None]] = {}
+        self._stage: str | None = None
+        self._live: dict[int, tuple[weakref.ref, int]] = {}
+        # Reentrant: a frame's weakref callback may run (on garbage collection)
+        # while this thread already holds the lock
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    def estimate_bytes(self, rows: int, avg_row_length: int) -> int:
+        """Estimated in-memory size of `rows` source rows once loaded into pandas."""
+        return int(rows * max(avg_row_length, 1) * MEMORY_SETTINGS.overhead_factor)
+
+    def plan_chunk_size(
+        self, name: str, rows: int, avg_row_length: int, concurrency: int = 1
+    ) -> int | None:
+        """
+        Rows per chunk for an extract, or None if it fits the budget in one piece.
+        `concurrency` is the number of extracts sharing the budget at once.
+        """
+        if not self.enabled:
+            return None
+
+        estimate = self.estimate_bytes(rows, avg_row_length)
+        table_budget = self.budget_bytes * TABLE_BUDGET_SHARE / max(concurrency, 1)
+        if estimate <= table_budget:
+            return None
+
+        chunk_rows = int(
+            table_budget / (max(avg_row_length, 1) * MEMORY_SETTINGS.overhead_factor)
+        )
+        chunk_rows = max(chunk_rows, MEMORY_SETTINGS.min_chunk_rows)
+        logger.info(
+            f"{name}: ~{estimate / MB:.0f} MB for {rows:,} rows exceeds the memory budget, extracting in chunks of {chunk_rows:,} rows"
+        )
+        return chunk_rows
+
+    def plan_extract(
+        self,
+        tables: dict[str, str],
+        counts: dict[str, int],
+        avg_row_lengths: dict[str, int],
+        concurrency: int = 1,
+    ) -> dict[str, int | None]:
+        """
+        Plan chunk sizes for each extract key, given its source table name.
+        Row counts are full-table counts, so incremental extracts are overestimated.
+        """
+        plan = {}
+        for key, table_name in tables.items():
+            plan[key] = self.plan_chunk_size(
+                key,
+                counts.get(table_name, 0),
+                avg_row_lengths.get(table_name, 0),
+                concurrency,
+            )
+
+        # The joined fact extract has one row per order item, as wide as all its tables
+        plan["facts"] = self.plan_chunk_size(
+            "facts",
+            counts.get("OrderItems", 0),
+            sum(avg_row_lengths.get(t, 0) for t in JOINED_SOURCE_TABLES),
+            concurrency,
+        )
+        return plan
+
+    def track(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Count a DataFrame towards live memory until it is garbage-collected."""
+        key = id(df)
+        size = frame_bytes(df)
+        with self._lock:
+            self._live[key] = (weakref.ref(df, lambda _: self._untrack(key)), size)
+            live = self.live_bytes()
+            if self._stage is not None:
+                peaks = self.peaks[self._stage]
+                peaks["frames_mb"] = max(peaks["frames_mb"] or 0.0, live / MB)
+        if self.enabled and live > self.budget_bytes:
+            logger.warning(
+                f"Live DataFrames use {live / MB:.0f} MB, over the {self.budget_bytes / MB:.0f} MB budget"
+            )
+        return df
+
+    def _untrack(self, key: int) -> None:
+        with self._lock:
+            self._live.pop(key, None)
+
+    def live_bytes(self) -> int:
+        with self._lock:
+            return sum(size for _, size in self._live.values())
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Record peak DataFrame memory and peak RSS (sampled, where /proc is
+        available) while a stage runs, plus the process peak RSS so far.
+        """
+        sampler = RSSSampler()
+        self._stage = name
+        self.peaks[name] = {"frames_mb": 0.0, "rss_mb": None, "process_rss_mb": 0.0}
+        try:
+            with sampler:
+                yield
+        finally:
+            peaks = self.peaks[name]
+            peaks["rss_mb"] = sampler.peak_mb
+            peaks["process_rss_mb"] = get_process_peak_rss_mb()
+            self._stage = None
+            rss = "n/a" if peaks["rss_mb"] is None else f"{peaks['rss_mb']:.1f} MB"
+            logger.info(
+                f"Peak memory during {name}: {peaks['frames_mb']:.1f} MB in DataFrames, {rss} RSS (process peak {peaks['process_rss_mb']:.1f} MB)"
+            )
+
+
+_governor: MemoryGovernor | None = None
+
+
+def get_memory_governor() -> MemoryGovernor:
+    global _governor
+    if _governor is None:
+        _governor = MemoryGovernor()
+    return _governor
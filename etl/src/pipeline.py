@@ -0,0 +1,581 @@
+import logging
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import EXTRACT_SETTINGS, SOURCES, TRANSFORM_SETTINGS, MySQLSettings
+from .db import get_supabase_client, ping_source, ping_warehouse
+from .extract import (
+    EXTRACT_TABLES,
+    extract_joined_chunks,
+    extract_joined_data,
+    extract_table,
+    extract_table_chunks,
+    get_avg_row_lengths,
+    get_table_counts,
+)
+from .load import (
+    get_last_load_times,
+    update_last_load_time,
+    upsert,
+)
+from .memory import MemoryGovernor, downcast_frame, get_memory_governor
+from .pushdown import PUSHDOWN_TABLES, extract_dimension, extract_dimension_chunks
+from .scd import load_dimension, load_fact_sales
+from .snapshot import SourceSnapshot
+from .staging import (
+    cleanup_old_runs,
+    has_frame,
+    is_stage_complete,
+    iter_frame_parts,
+    mark_stage_complete,
+    new_run_dir,
+    read_frame,
+    read_manifest,
+    write_frame_parts,
+    write_manifest,
+)
+from .transform import load_dim_date
+from .transform_engines import get_transform_engine
+from .validate import (
+    clear_quarantine,
+    get_dimension_keys,
+    insert_quarantine,
+    resolve_quarantine,
+    validate_frame,
+)
+from .warehouse import (
+    analyze_tables,
+    create_fact_indexes,
+    drop_fact_indexes,
+    ensure_source_systems,
+    filled_fact_months,
+    physical_design_enabled,
+)
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_LIMIT = None
+UPSERT_BATCH_SIZE = 20000
+UPSERT_WAIT_SEC = 1.0
+
+WAREHOUSE_TABLES = ["DimUsers", "DimDate", "DimRiders", "DimProducts", "FactSales"]
+DIMENSION_TABLES = ["DimUsers", "DimProducts", "DimRiders"]
+VALIDATED_TABLES = [*DIMENSION_TABLES, "FactSales"]
+
+
+def _tracked(frames: Iterable[pd.DataFrame], governor: MemoryGovernor):
+    for df in frames:
+        yield governor.track(df)
+
+
+def _extract_source(
+    run_dir: Path,
+    source: MySQLSettings,
+    limit: int | None,
+    governor: MemoryGovernor,
+) -> tuple[dict[str, int], datetime]:
+    """
+    Extract every table of one source into extract/<source>/ in the run
+    directory, all from one consistent snapshot. With pushdown, the dimension
+    tables are staged already cleansed. Returns the rows per table and the
+    snapshot's watermark.
+    """
+    # Test source connection
+    ping_source(source.name, replica=bool(source.replica_host))
+    logger.info(f"Source engine connected! ({source.name})")
+
+    # 1. Get last load times (for incremental loading)
+    last_load_times = get_last_load_times(source.name)
+    logger.info(f"Last load times for {source.name}: {last_load_times}")
+
+    # 2. Extract data, up to one table per snapshot connection in memory at a time
+    chunk_plan = {}
+    if governor.enabled:
+        chunk_plan = governor.plan_extract(
+            {key: model.__tablename__ for key, (model, _) in EXTRACT_TABLES.items()},
+            get_table_counts(source.name),
+            get_avg_row_lengths(source.name),
+            concurrency=len(SOURCES) * max(EXTRACT_SETTINGS.snapshot_workers, 1),
+        )
+
+    def extract_one(key: str, snapshot: SourceSnapshot) -> int:
+        chunk_size = chunk_plan.get(key)
+        with snapshot.connection() as conn:
+            if key == "facts":
+                last_time = last_load_times.get("FactSales")
+                if chunk_size:
+                    frames = extract_joined_chunks(
+                        chunk_size, last_time, limit, source=source.name, engine=conn
+                    )
+                else:
+                    frames = iter(
+                        [
+                            extract_joined_data(
+                                last_time, limit=limit, source=source.name, engine=conn
+                            )
+                        ]
+                    )
+            else:
+                model, warehouse_table = EXTRACT_TABLES[key]
+                last_time = last_load_times.get(warehouse_table)
+                logger.info(
+                    f"{'Incremental' if last_time else 'Full'} load for {source.name}/{key} (→ {warehouse_table})"
+                )
+                if TRANSFORM_SETTINGS.pushdown and key in PUSHDOWN_TABLES:
+                    tag = source.source_system
+                    if chunk_size:
+                        frames = extract_dimension_chunks(
+                            conn, key, tag, chunk_size, last_time, limit
+                        )
+                    else:
+                        frames = iter(
+                            [extract_dimension(conn, key, tag, last_time, limit=limit)]
+                        )
+                elif chunk_size:
+                    frames = extract_table_chunks(
+                        conn, model, chunk_size, last_time, limit
+                    )
+                else:
+                    frames = iter([extract_table(conn, model, last_time, limit=limit)])
+
+            rows = write_frame_parts(
+                run_dir,
+                "extract",
+                f"{source.name}/{key}",
+                _tracked(map(downcast_frame, frames), governor),
+            )
+        logger.info(f"Extracted {rows} rows from {source.name}/{key}")
+        return rows
+
+    with (
+        SourceSnapshot(source) as snapshot,
+        ThreadPoolExecutor(max_workers=snapshot.size) as executor,
+    ):
+        futures = {
+            key: executor.submit(extract_one, key, snapshot)
+            for key in [*EXTRACT_TABLES, "facts"]
+        }
+        rows = {key: future.result() for key, future in futures.items()}
+
+    assert snapshot.watermark is not None
+    return rows, snapshot.watermark
+
+
+def run_extract(run_dir: Path, limit: int | None = EXTRACT_LIMIT) -> None:
+    """
+    Extract every configured source once, concurrently, and stage the tables as
+    Parquet under the run directory. Tables estimated to exceed the memory
+    budget are extracted in chunks.
+    """
+    start_time = datetime.now()
+
+    governor = get_memory_governor()
+    with governor.stage("extract"):
+        workers = min(len(SOURCES), EXTRACT_SETTINGS.max_source_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                source.name: executor.submit(
+                    _extract_source, run_dir, source, limit, governor
+                )
+                for source in SOURCES
+            }
+            results = {name: future.result() for name, future in futures.items()}
+    rows = {name: source_rows for name, (source_rows, _) in results.items()}
+
+    # Each source's watermark is the instant of its snapshot, not when the load finishes
+    manifest = read_manifest(run_dir)
+    manifest["startTime"] = start_time.isoformat()
+    manifest["watermarks"] = {
+        name: watermark.isoformat() for name, (_, watermark) in results.items()
+    }
+    write_manifest(run_dir, manifest)
+    mark_stage_complete(
+        run_dir,
+        "extract",
+        rows=rows,
+        pushdown=TRANSFORM_SETTINGS.pushdown,
+        peakMemoryMB=governor.peaks["extract"],
+    )
+
+
+def run_transform(run_dir: Path) -> None:
+    """
+    Transform the staged extract of every source part by part into staged
+    warehouse-ready tables under transform/<source>/. Dimensions extracted with
+    pushdown are already transformed and only copied.
+    """
+    if not is_stage_complete(run_dir, "extract"):
+        raise RuntimeError(f"Extract stage has not completed for {run_dir}")
+
+    extract_stage = read_manifest(run_dir)["stages"]["extract"]
+    extracted_rows = extract_stage["rows"]
+    pushdown = extract_stage.get("pushdown", False)
+    governor = get_memory_governor()
+    transforms = get_transform_engine()
+
+    def transform_parts(source: str, target: str, transform_fn) -> int:
+        # No transform_fn: the part is already transformed (pushdown)
+        frames = (
+            transform_fn(governor.track(df)) if transform_fn else governor.track(df)
+            for df in iter_frame_parts(run_dir, "extract", source)
+        )
+        return write_frame_parts(
+            run_dir, "transform", target, _tracked(frames, governor)
+        )
+
+    rows = {}
+    with governor.stage("transform"):
+        dim_date_df = None
+        for source in SOURCES:
+            name, tag = source.name, source.source_system
+
+            # 3. Transform dimensions
+            logger.info(f"Transforming dimension data from {name}...")
+            if pushdown:
+                rows[name] = {
+                    "DimUsers": transform_parts(
+                        f"{name}/users", f"{name}/DimUsers", None
+                    ),
+                    "DimProducts": transform_parts(
+                        f"{name}/products", f"{name}/DimProducts", None
+                    ),
+                    "DimRiders": transform_parts(
+                        f"{name}/riders", f"{name}/DimRiders", None
+                    ),
+                }
+            else:
+                couriers_df = governor.track(
+                    read_frame(run_dir, "extract", f"{name}/couriers")
+                )
+                rows[name] = {
+                    "DimUsers": transform_parts(
+                        f"{name}/users",
+                        f"{name}/DimUsers",
+                        lambda df, tag=tag: transforms.transform_dim_users(df, tag),
+                    ),
+                    "DimProducts": transform_parts(
+                        f"{name}/products",
+                        f"{name}/DimProducts",
+                        lambda df, tag=tag: transforms.transform_dim_products(df, tag),
+                    ),
+                    "DimRiders": transform_parts(
+                        f"{name}/riders",
+                        f"{name}/DimRiders",
+                        lambda df, tag=tag, couriers_df=couriers_df: (
+                            transforms.transform_dim_riders(df, couriers_df, tag)
+                        ),
+                    ),
+                }
+
+            logger.info(
+                f"Transformed {rows[name]['DimUsers']} users, {rows[name]['DimProducts']} products, {rows[name]['DimRiders']} riders from {name}"
+            )
+
+            # Transform facts
+            if extracted_rows[name]["facts"]:
+                if dim_date_df is None:
+                    dim_date_df = load_dim_date()
+                rows[name]["FactSales"] = transform_parts(
+                    f"{name}/facts",
+                    f"{name}/FactSales",
+                    lambda df, tag=tag, dim_date_df=dim_date_df: (
+                        transforms.transform_fact_sales(df, dim_date_df, tag)
+                    ),
+                )
+
+    mark_stage_complete(
+        run_dir, "transform", rows=rows, peakMemoryMB=governor.peaks["transform"]
+    )
+
+
+def _validated_parts(
+    frames: Iterable[pd.DataFrame],
+    table_name: str,
+    keys: dict[str, np.ndarray] | None,
+    governor: MemoryGovernor,
+    failures: dict[str, int],
+    quarantined: list[pd.DataFrame],
+    valid_ids: list[np.ndarray],
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the rows of each frame that pass validation. The failing rows go to
+    `quarantined`, the rule failure counts to `failures` and the passing
+    sourceIds to `valid_ids`.
+    """
+    for df in frames:
+        valid, bad, counts = validate_frame(table_name, governor.track(df), keys)
+        for rule, count in counts.items():
+            failures[rule] = failures.get(rule, 0) + count
+        if not bad.empty:
+            quarantined.append(bad)
+        valid_ids.append(valid["sourceId"].to_numpy())
+        yield valid
+
+
+def run_validate(run_dir: Path) -> None:
+    """
+    Check the staged transform output against the validation rules. Passing rows
+    are staged under validate/<source>/ for the load, failing rows under
+    quarantine/<source>/ with the rules they failed.
+    """
+    if not is_stage_complete(run_dir, "transform"):
+        raise RuntimeError(f"Transform stage has not completed for {run_dir}")
+
+    governor = get_memory_governor()
+    rows: dict[str, dict[str, int]] = {}
+    failures: dict[str, dict[str, dict[str, int]]] = {}
+    with governor.stage("validate"):
+        for source in SOURCES:
+            name, tag = source.name, source.source_system
+            rows[name], failures[name] = {}, {}
+            # Facts may reference dimension rows validated in this run but not loaded yet
+            staged_keys: dict[str, np.ndarray] = {}
+
+            for table_name in VALIDATED_TABLES:
+                frame = f"{name}/{table_name}"
+                if not has_frame(run_dir, "transform", frame):
+                    continue
+
+                keys = None
+                if table_name == "FactSales":
+                    keys = get_dimension_keys(tag, staged_keys)
+                quarantined: list[pd.DataFrame] = []
+                valid_ids: list[np.ndarray] = []
+                table_failures: dict[str, int] = {}
+                valid_parts = _validated_parts(
+                    iter_frame_parts(run_dir, "transform", frame),
+                    table_name,
+                    keys,
+                    governor,
+                    table_failures,
+                    quarantined,
+                    valid_ids,
+                )
+
+                rows[name][table_name] = write_frame_parts(
+                    run_dir, "validate", frame, _tracked(valid_parts, governor)
+                )
+                write_frame_parts(run_dir, "quarantine", frame, iter(quarantined))
+                if table_name in DIMENSION_TABLES and valid_ids:
+                    staged_keys[table_name] = np.concatenate(valid_ids)
+
+                failures[name][table_name] = table_failures
+                bad_rows = sum(len(df) for df in quarantined)
+                if bad_rows:
+                    logger.warning(
+                        f"Quarantined {bad_rows} {table_name} rows from {name}: {table_failures}"
+                    )
+
+    mark_stage_complete(
+        run_dir,
+        "validate",
+        rows=rows,
+        failures=failures,
+        peakMemoryMB=governor.peaks["validate"],
+    )
+
+
+def _load_quarantine(run_dir: Path, tables: list[str]) -> None:
+    """Insert the run's quarantined rows into ETLQuarantine, replacing earlier attempts."""
+    tables = [t for t in tables if t in VALIDATED_TABLES]
+    if not tables:
+        return
+
+    clear_quarantine(run_dir.name, tables)
+    for source in SOURCES:
+        for table_name in tables:
+            name = f"{source.name}/{table_name}"
+            if not has_frame(run_dir, "quarantine", name):
+                continue
+            for df in iter_frame_parts(run_dir, "quarantine", name):
+                insert_quarantine(run_dir.name, table_name, df)
+
+
+def _staged_fact_months(run_dir: Path) -> set[date]:
+    """Months of the delivery dates of the validated FactSales of every source."""
+    months: set[date] = set()
+    for source in SOURCES:
+        name = f"{source.name}/FactSales"
+        if not has_frame(run_dir, "validate", name):
+            continue
+        for df in iter_frame_parts(run_dir, "validate", name, columns=["deliveryDate"]):
+            dates = pd.to_datetime(df["deliveryDate"]).dropna()
+            months.update(ts.date() for ts in dates.dt.to_period("M").dt.start_time)
+    return months
+
+
+def _load_tables(run_dir: Path, tables: list[str], governor: MemoryGovernor) -> None:
+    """Upsert the staged tables of every source one part file at a time."""
+    supabase_client = get_supabase_client()
+
+    # 4. Load to Supabase
+    logger.info("Loading dimension data to Supabase...")
+    for source in SOURCES:
+        for table_name in DIMENSION_TABLES:
+            if table_name not in tables:
+                continue
+
+            for dim_df in _tracked(
+                iter_frame_parts(run_dir, "validate", f"{source.name}/{table_name}"),
+                governor,
+            ):
+                if dim_df.empty:
+                    continue
+
+                logger.debug(f"{table_name} preview:\n{dim_df.head(20)}")
+                logger.debug(f"{table_name} dtypes:\n{dim_df.dtypes}")
+                logger.info(f"Upserting {len(dim_df)} → {table_name} ({source.name})")
+                load_dimension(
+                    table_name,
+                    dim_df,
+                    batch_size=UPSERT_BATCH_SIZE,
+                    wait_seconds=UPSERT_WAIT_SEC,
+                )
+                resolve_quarantine(run_dir.name, table_name, dim_df)
+
+    # Create DimDate as needed
+    if "DimDate" in tables:
+        try:
+            existing_dim_date = (
+                supabase_client.table("DimDate")
+                .select("fullDate", count="exact")
+                .limit(1)
+                .execute()
+            )
+            logger.debug(
+                f"Existing DimDate table: data={existing_dim_date.data}, count={existing_dim_date.count}"
+            )
+
+            if not existing_dim_date.data:
+                logger.info("No DimDate records found — generating date dimension...")
+                dim_date_df = get_transform_engine().generate_dim_date()
+                upsert("DimDate", dim_date_df, conflict="fullDate")
+                logger.info(f"Created DimDate with {len(dim_date_df)} records")
+            else:
+                logger.info("DimDate already exists — skipping generation.")
+
+        except Exception as e:
+            logger.error(f"Failed to check or generate DimDate: {e}")
+            raise
+
+    # 5. Load facts
+    if "FactSales" not in tables:
+        return
+
+    # Loading into empty partitions is faster without the foreign key indexes;
+    # they are rebuilt once after. Rebuilding them over partitions that already
+    # hold rows would cost more than it saves.
+    bulk_load = False
+    if physical_design_enabled():
+        months = _staged_fact_months(run_dir)
+        bulk_load = bool(months) and not filled_fact_months(months)
+    if bulk_load:
+        drop_fact_indexes()
+
+    try:
+        for source in SOURCES:
+            name = f"{source.name}/FactSales"
+            if not has_frame(run_dir, "validate", name):
+                continue
+
+            for fact_sales_df in _tracked(
+                iter_frame_parts(run_dir, "validate", name), governor
+            ):
+                logger.info(
+                    f"Upserting {len(fact_sales_df)} → FactSales ({source.name})"
+                )
+                load_fact_sales(
+                    fact_sales_df,
+                    batch_size=UPSERT_BATCH_SIZE,
+                    wait_seconds=UPSERT_WAIT_SEC,
+                )
+                resolve_quarantine(run_dir.name, "FactSales", fact_sales_df)
+    finally:
+        if bulk_load:
+            create_fact_indexes()
+
+
+def run_load(run_dir: Path, tables: list[str] | None = None) -> None:
+    """
+    Load the staged validated output into Supabase, and the rows that failed
+    validation into ETLQuarantine. Safe to retry on its own.
+    Pass `tables` to (re)load only some warehouse tables.
+    """
+    if not is_stage_complete(run_dir, "validate"):
+        raise RuntimeError(f"Validate stage has not completed for {run_dir}")
+
+    tables = tables or WAREHOUSE_TABLES
+    unknown = set(tables) - set(WAREHOUSE_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown warehouse tables: {sorted(unknown)}")
+
+    manifest = read_manifest(run_dir)
+    watermarks = manifest["watermarks"]
+
+    # Test warehouse connection
+    get_supabase_client()
+    ping_warehouse()
+    logger.info("Supabase client connected!")
+
+    # Sources added to ETL_SOURCES since the migrations ran need their tags
+    if physical_design_enabled():
+        ensure_source_systems(source.source_system for source in SOURCES)
+
+    governor = get_memory_governor()
+    with governor.stage("load"):
+        _load_tables(run_dir, tables, governor)
+    _load_quarantine(run_dir, tables)
+
+    # Refresh planner statistics after large loads
+    if physical_design_enabled():
+        validated = manifest["stages"]["validate"]["rows"]
+        analyze_tables(
+            {
+                table_name: sum(rows.get(table_name, 0) for rows in validated.values())
+                for table_name in tables
+            }
+        )
+
+    # 6. Update ETLControl, one watermark per source
+    logger.info("Updating ETL metadata...")
+    for source in SOURCES:
+        load_time = datetime.fromisoformat(watermarks[source.name])
+        for table_name in tables:
+            update_last_load_time(table_name, load_time, source.name)
+            logger.info(
+                f"Updated {table_name} lastLoadTime → {load_time} ({source.name})"
+            )
+
+    if set(tables) == set(WAREHOUSE_TABLES):
+        mark_stage_complete(run_dir, "load")
+
+
+def run_etl(limit: int | None = EXTRACT_LIMIT) -> Path:
+    logger.info("Starting ETL pipeline...")
+    start_time = datetime.now()
+
+    # ETL pipeline
+    try:
+        run_dir = new_run_dir()
+        logger.info(f"Staging run in {run_dir}")
+
+        run_extract(run_dir, limit=limit)
+        run_transform(run_dir)
+        run_validate(run_dir)
+        run_load(run_dir)
+
+        for stale in cleanup_old_runs():
+            logger.info(f"Removed old staging run {stale}")
+
+        duration = (datetime.now() - start_time).total_seconds()
+        logger.info(f"ETL pipeline completed in {duration:.2f} seconds")
+        return run_dir
+
+    except Exception as e:
+        logger.error(f"ETL pipeline failed: {e}")
+        raise
@@ -0,0 +1,437 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from .config import SOURCE_SETTINGS, SOURCES, MySQLSettings
+from .db import get_source_engine, get_supabase_client
+from .delete_sync import delete_fact_rows, delete_keys, find_deleted_fact_rows
+from .extract import extract_joined_data, extract_table
+from .scd import load_dimension, load_fact_sales, scd2_enabled
+from .source_models import Courier, Product, Rider, User
+from .transform import (
+    load_dim_date,
+    transform_dim_products,
+    transform_dim_riders,
+    transform_dim_users,
+    transform_fact_sales,
+)
+from .validate import (
+    clear_quarantine,
+    fetch_quarantined_keys,
+    get_dimension_keys,
+    insert_quarantine,
+    resolve_quarantine,
+    validate_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+# Partitions are sourceId ranges. Both sides are checksummed once per top
+# partition at LEAF_PARTITION_WIDTH; mismatching partitions are then split FANOUT
+# ways, comparing sums of those leaf checksums, and only leaves are re-extracted.
+TOP_PARTITION_WIDTH = 1_000_000
+LEAF_PARTITION_WIDTH = 1_000
+FANOUT = 10  # keeps every width a multiple of the leaf width
+WAREHOUSE_PAGE_SIZE = 1000  # PostgREST max_rows
+
+# ETLQuarantine runId of rows reconcile failed to repair. Keys in ETLQuarantine
+# are left out of both sides' checksums, since they are never loaded as is.
+RECONCILE_RUN_ID = "reconcile"
+
+# Row hash: (key * P1 + a * P2 + b) mod M, summed per partition. It only uses
+# integer arithmetic so MySQL and Postgres (partition_checksums, migration 0007)
+# produce the same value, and summing makes the checksum independent of row order.
+HASH_P1 = 1_000_003
+HASH_P2 = 10_007
+HASH_MOD = 2_147_483_647
+
+# Per warehouse table: source FROM clause, key and two hashed integer values.
+# Only columns the transforms pass through unchanged are hashed, which is enough
+# to catch missing, extra and stale rows. partition_checksums hashes the same
+# values: updatedAt for dimensions, and for facts the product's sourceId (through
+# DimProducts) and the quantity.
+_UPDATED_AT_SECONDS = "TIMESTAMPDIFF(SECOND, '1970-01-01', t.updatedAt)"
+SOURCE_FINGERPRINTS = {
+    "DimUsers": ("Users t", "t.id", _UPDATED_AT_SECONDS, "0"),
+    "DimProducts": ("Products t", "t.id", _UPDATED_AT_SECONDS, "0"),
+    "DimRiders": ("Riders t", "t.id", _UPDATED_AT_SECONDS, "0"),
+    "FactSales": (
+        # Same inner joins as extract_joined_data
+        (
+            "Orders o JOIN OrderItems oi ON o.id = oi.OrderId "
+            "JOIN Users u ON o.userId = u.id JOIN Products p ON oi.ProductId = p.id"
+        ),
+        "o.id",
+        "oi.ProductId",
+        "COALESCE(oi.quantity, 0)",
+    ),
+}
+
+PartitionChecksums = dict[int, tuple[int, int]]
+
+
+def source_fingerprint(table_name: str, scd2: bool) -> tuple[str, str, str, str]:
+    """
+    The SOURCE_FINGERPRINTS entry of a table. Under SCD2 a current version
+    keeps its updatedAt when a source update changes no tracked column, so only
+    row presence is compared for dimensions.
+    """
+    from_clause, key, a, b = SOURCE_FINGERPRINTS[table_name]
+    if scd2 and table_name != "FactSales":
+        return from_clause, key, "0", b
+    return from_clause, key, a, b
+
+
+def source_checksums(
+    table_name: str,
+    low: int,
+    high: int,
+    width: int,
+    source: MySQLSettings = SOURCE_SETTINGS,
+    scd2: bool = False,
+    excluded: np.ndarray | None = None,
+) -> PartitionChecksums:
+    """
+    Per-partition row counts and checksums for source keys in [low, high), computed in MySQL.
+    `excluded` keys are left out.
+    """
+    from_clause, key, a, b = source_fingerprint(table_name, scd2)
+    query = text(
+        f"""
+        SELECT  {key} DIV :width AS bucket,
+                COUNT(*) AS row_count,
+                SUM(MOD({key} * {HASH_P1} + ({a}) * {HASH_P2} + ({b}), {HASH_MOD})) AS checksum
+        FROM    {from_clause}
+        WHERE   {key} >= :low AND {key} < :high
+        AND     {key} NOT IN :excluded
+        GROUP BY bucket
+        """
+    ).bindparams(bindparam("excluded", expanding=True))
+    params = {
+        "width": width,
+        "low": low,
+        "high": high,
+        "excluded": _keys_in_range(excluded, low, high),
+    }
+    with get_source_engine(source.name).connect() as conn:
+        rows = conn.execute(query, params)
+        return {int(r.bucket): (int(r.row_count), int(r.checksum or 0)) for r in rows}
+
+
+def warehouse_checksums(
+    table_name: str,
+    low: int,
+    high: int,
+    width: int,
+    source_system: str = SOURCE_SETTINGS.source_system,
+    scd2: bool = False,
+    excluded: np.ndarray | None = None,
+) -> PartitionChecksums:
+    """
+    Per-partition row counts and checksums for warehouse keys in [low, high), computed in Postgres.
+    `excluded` keys are left out.
+    """
+    try:
+        res = (
+            get_supabase_client()
+            .rpc(
+                "partition_checksums",
+                {
+                    "table_name": table_name,
+                    "source_system": source_system,
+                    "low": low,
+                    "high": high,
+                    "width": width,
+                    "hash_updated_at": not scd2,
+                    "excluded": _keys_in_range(excluded, low, high),
+                },
+            )
+            .execute()
+        )
+    except Exception as e:
+        raise RuntimeError(
+            f"Failed to checksum {table_name} [{low}, {high}): {e}"
+        ) from e
+    return {
+        int(bucket): (int(row_count), int(checksum or 0))
+        for bucket, row_count, checksum in res.data or []
+    }
+
+
+def _keys_in_range(keys: np.ndarray | None, low: int, high: int) -> list[int]:
+    if keys is None:
+        return []
+    return keys[(keys >= low) & (keys < high)].tolist()
+
+
+def roll_up(
+    leaves: PartitionChecksums, low: int, high: int, width: int
+) -> PartitionChecksums:
+    """Checksums of the `width` partitions of [low, high), summed from leaf checksums."""
+    partitions: PartitionChecksums = {}
+    for leaf, (row_count, checksum) in leaves.items():
+        key = leaf * LEAF_PARTITION_WIDTH
+        if low <= key < high:
+            bucket = key // width
+            count_sum, checksum_sum = partitions.get(bucket, (0, 0))
+            partitions[bucket] = (count_sum + row_count, checksum_sum + checksum)
+    return partitions
+
+
+def fetch_warehouse_rows(
+    table_name: str,
+    low: int,
+    high: int,
+    columns: list[str],
+    source_system: str = SOURCE_SETTINGS.source_system,
+) -> pd.DataFrame:
+    """Page `columns` (which must include id) of warehouse rows with sourceId in [low, high)."""
+    supabase = get_supabase_client()
+    last_id = -1
+    pages = []
+
+    while True:
+        query = (
+            supabase.table(table_name)
+            .select(",".join(columns))
+            .eq("sourceSystem", source_system)
+            .gte("sourceId", low)
+            .lt("sourceId", high)
+        )
+        if table_name != "FactSales":
+            # Closed dimension versions are history, not rows of the source
+            query = query.eq("isCurrent", True)
+        res = query.gt("id", last_id).order("id").limit(WAREHOUSE_PAGE_SIZE).execute()
+        page = res.data or []
+        if page:
+            pages.append(pd.DataFrame(page, columns=columns))
+        if len(page) < WAREHOUSE_PAGE_SIZE:
+            break
+        last_id = page[-1]["id"]
+
+    if not pages:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(pages, ignore_index=True)
+
+
+def get_key_upper_bound(
+    table_name: str, source: MySQLSettings = SOURCE_SETTINGS
+) -> int:
+    """One past the largest key on either side."""
+    from_clause, key, _, _ = SOURCE_FINGERPRINTS[table_name]
+    with get_source_engine(source.name).connect() as conn:
+        source_max = conn.execute(
+            text(f"SELECT MAX({key}) FROM {from_clause}")
+        ).scalar()
+
+    res = (
+        get_supabase_client()
+        .table(table_name)
+        .select("sourceId")
+        .eq("sourceSystem", source.source_system)
+        .order("sourceId", desc=True)
+        .limit(1)
+        .execute()
+    )
+    warehouse_max = res.data[0]["sourceId"] if res.data else None
+
+    return max(source_max or 0, warehouse_max or 0) + 1
+
+
+def find_mismatched_ranges(
+    table_name: str,
+    low: int,
+    high: int,
+    width: int = TOP_PARTITION_WIDTH,
+    source: MySQLSettings = SOURCE_SETTINGS,
+    scd2: bool = False,
+    leaves: tuple[PartitionChecksums, PartitionChecksums] | None = None,
+    excluded: np.ndarray | None = None,
+) -> list[tuple[int, int]]:
+    """
+    Compare partitions of [low, high) and drill into the mismatching ones, Merkle-style.
+    `leaves` are the (source, warehouse) leaf checksums of the range, fetched
+    once here (without the `excluded` keys) when not given.
+    Returns the mismatching leaf ranges as [low, high) pairs.
+    """
+    if leaves is None:
+        leaves = (
+            source_checksums(
+                table_name, low, high, LEAF_PARTITION_WIDTH, source, scd2, excluded
+            ),
+            warehouse_checksums(
+                table_name,
+                low,
+                high,
+                LEAF_PARTITION_WIDTH,
+                source.source_system,
+                scd2,
+                excluded,
+            ),
+        )
+    expected, warehouse = (roll_up(c, low, high, width) for c in leaves)
+
+    mismatched = []
+    for bucket in sorted(expected.keys() | warehouse.keys()):
+        if expected.get(bucket) == warehouse.get(bucket):
+            continue
+
+        part_low = max(bucket * width, low)
+        part_high = min((bucket + 1) * width, high)
+        logger.debug(
+            f"{table_name} [{part_low}, {part_high}) mismatch: source={expected.get(bucket)}, warehouse={warehouse.get(bucket)}"
+        )
+
+        if width <= LEAF_PARTITION_WIDTH:
+            mismatched.append((part_low, part_high))
+        else:
+            sub_width = max(width // FANOUT, LEAF_PARTITION_WIDTH)
+            mismatched.extend(
+                find_mismatched_ranges(
+                    table_name, part_low, part_high, sub_width, source, scd2, leaves
+                )
+            )
+
+    return mismatched
+
+
+def repair_range(
+    table_name: str,
+    low: int,
+    high: int,
+    source: MySQLSettings = SOURCE_SETTINGS,
+    dim_date_df: pd.DataFrame | None = None,
+    fact_keys: dict[str, np.ndarray] | None = None,
+) -> int:
+    """
+    Re-extract, transform, validate and upsert one key range, quarantining rows
+    that fail validation as the pipeline does; delete warehouse rows gone from the source.
+    Pass `dim_date_df` (from load_dim_date) and, for FactSales, `fact_keys`
+    (from get_dimension_keys) to avoid refetching them per range.
+    """
+    engine = get_source_engine(source.name)
+    tag = source.source_system
+    id_range = (low, high)
+
+    if table_name == "DimUsers":
+        df = transform_dim_users(extract_table(engine, User, id_range=id_range), tag)
+    elif table_name == "DimProducts":
+        df = transform_dim_products(
+            extract_table(engine, Product, id_range=id_range), tag
+        )
+    elif table_name == "DimRiders":
+        df = transform_dim_riders(
+            extract_table(engine, Rider, id_range=id_range),
+            extract_table(engine, Courier),
+            tag,
+        )
+    else:
+        joined_df = extract_joined_data(id_range=id_range, source=source.name)
+        df = (
+            transform_fact_sales(joined_df, dim_date_df, tag)
+            if not joined_df.empty
+            else joined_df
+        )
+
+    # Rows failing validation stay in the source, so they aren't deleted below
+    source_keys = (
+        np.unique(df["sourceId"].to_numpy(dtype=np.int64))
+        if not df.empty
+        else np.array([], dtype=np.int64)
+    )
+
+    keys = None
+    if table_name == "FactSales":
+        keys = fact_keys if fact_keys is not None else get_dimension_keys(tag)
+    valid, quarantined, counts = validate_frame(table_name, df, keys)
+    clear_quarantine(RECONCILE_RUN_ID, [table_name], tag, id_range)
+    insert_quarantine(RECONCILE_RUN_ID, table_name, quarantined)
+    if counts:
+        logger.warning(
+            f"{table_name} [{low}, {high}) from {source.name} failed validation rules: {counts}"
+        )
+
+    if table_name == "FactSales" and not valid.empty:
+        load_fact_sales(valid)
+    elif not valid.empty:
+        load_dimension(table_name, valid)
+    resolve_quarantine(RECONCILE_RUN_ID, table_name, valid)
+
+    if table_name == "FactSales":
+        # Also catches items deleted from orders that still exist
+        deleted = find_deleted_fact_rows(low, high, source)
+        if deleted.size:
+            delete_fact_rows(deleted)
+        return len(valid) + len(deleted)
+
+    warehouse_keys = np.unique(
+        fetch_warehouse_rows(table_name, low, high, ["id", "sourceId"], tag)[
+            "sourceId"
+        ].to_numpy(dtype=np.int64)
+    )
+    deleted = np.setdiff1d(warehouse_keys, source_keys, assume_unique=True)
+    if deleted.size:
+        delete_keys(table_name, deleted, tag)
+
+    return len(valid) + len(deleted)
+
+
+def reconcile(
+    tables: list[str] | None = None, repair: bool = True, scd2: bool | None = None
+) -> dict[str, list[tuple[int, int]]]:
+    """
+    Reconcile warehouse tables against every source by partition checksums.
+    Returns the mismatching ranges per table (repaired unless `repair` is False).
+    `scd2` (WAREHOUSE_SCD2 by default) picks the columns compared.
+    """
+    scd2 = scd2_enabled() if scd2 is None else scd2
+    tables = tables or list(SOURCE_FINGERPRINTS)
+    unknown = set(tables) - set(SOURCE_FINGERPRINTS)
+    if unknown:
+        raise ValueError(f"Unknown warehouse tables: {sorted(unknown)}")
+    # Dimensions first, so repaired facts can reference repaired dimension rows
+    tables = [t for t in SOURCE_FINGERPRINTS if t in tables]
+
+    results: dict[str, list[tuple[int, int]]] = {}
+    dim_date_df = None
+    for table_name in tables:
+        results[table_name] = []
+        for source in SOURCES:
+            quarantined = fetch_quarantined_keys(table_name, source.source_system)
+            # Top-level partitions are compared one at a time to bound memory
+            mismatched = []
+            upper = get_key_upper_bound(table_name, source)
+            for low in range(0, upper, TOP_PARTITION_WIDTH):
+                mismatched.extend(
+                    find_mismatched_ranges(
+                        table_name,
+                        low,
+                        low + TOP_PARTITION_WIDTH,
+                        source=source,
+                        scd2=scd2,
+                        excluded=quarantined,
+                    )
+                )
+            logger.info(
+                f"{table_name} ({source.name}): {len(mismatched)} mismatching partitions"
+            )
+
+            if repair and mismatched:
+                fact_keys = None
+                if table_name == "FactSales":
+                    if dim_date_df is None:
+                        dim_date_df = load_dim_date()
+                    fact_keys = get_dimension_keys(source.source_system)
+                for low, high in mismatched:
+                    rows = repair_range(
+                        table_name, low, high, source, dim_date_df, fact_keys
+                    )
+                    logger.info(
+                        f"Repaired {table_name} [{low}, {high}) from {source.name} ({rows} rows)"
+                    )
+
+            results[table_name].extend(mismatched)
+
+    return results
@@ -0,0 +1,322 @@
+"""
+Slowly changing dimensions.
+
+Every dimension row is a version of a source row, valid from `validFrom` until
+`validTo` (NULL while `isCurrent`). By default a source row has a single version
+that is overwritten in place. With WAREHOUSE_SCD2 each change of a tracked
+column closes the current version and adds a new one (Type 2). Facts always
+reference dimension rows by their warehouse id: the version in effect when the
+fact was created, which without SCD2 is the only one.
+"""
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .config import WAREHOUSE_SETTINGS
+from .db import get_supabase_client, get_warehouse_engine
+from .load import (
+    DIMENSION_NATURAL_KEY,
+    DIMENSION_VERSION_KEY,
+    to_records,
+    upsert,
+    upsert_fact_sales,
+)
+from .warehouse import physical_design_enabled
+
+logger = logging.getLogger(__name__)
+
+# Columns whose changes start a new version. Timestamps are left out, so a
+# source update that changes none of them doesn't add history.
+TRACKED_COLUMNS = {
+    "DimUsers": ["firstName", "lastName", "city", "country", "dateOfBirth", "gender"],
+    "DimProducts": ["productCode", "category", "description", "name", "price"],
+    "DimRiders": [
+        "firstName",
+        "lastName",
+        "vehicleType",
+        "courierName",
+        "age",
+        "gender",
+    ],
+}
+DATE_COLUMNS = {"dateOfBirth"}
+NUMERIC_COLUMNS = {"price", "age"}
+
+# FactSales columns holding a dimension's source id, replaced on load by the id
+# of the version in effect at the fact's createdAt
+FACT_DIMENSION_COLUMNS = {
+    "userId": "DimUsers",
+    "productId": "DimProducts",
+    "deliveryRiderId": "DimRiders",
+}
+
+VERSION_CHUNK_SIZE = 200  # sourceIds per PostgREST request (they go in the URL)
+VERSION_PAGE_SIZE = 1000  # PostgREST max_rows
+
+
+def scd2_enabled() -> bool:
+    return WAREHOUSE_SETTINGS.scd2
+
+
+def row_hash(df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    """
+    Hash of the tracked columns of each row. Values are normalized first, so a
+    transformed frame and the same rows fetched back from the warehouse match.
+    """
+    normalized = {}
+    for column in columns:
+        values = df[column]
+        if column in DATE_COLUMNS:
+            values = pd.to_datetime(values).dt.strftime("%Y-%m-%d")
+        elif column in NUMERIC_COLUMNS:
+            values = pd.to_numeric(values).astype("float64")
+        normalized[column] = values.astype(object).where(values.notna(), "").astype(str)
+    return pd.util.hash_pandas_object(
+        pd.DataFrame(normalized, index=df.index), index=False
+    ).to_numpy()
+
+
+def fetch_versions(
+    table_name: str,
+    source_system: str,
+    source_ids,
+    columns: list[str],
+    current_only: bool = False,
+) -> pd.DataFrame:
+    """`columns` (which must include id) of the versions of the given source ids."""
+    source_ids = np.unique(np.asarray(source_ids, dtype=np.int64))
+    if physical_design_enabled():
+        query = f"""
+            SELECT  {", ".join(f'"{c}"' for c in columns)}
+            FROM    "{table_name}"
+            WHERE   "sourceSystem"::text = :tag
+            AND     "sourceId" = ANY(:ids)
+        """
+        if current_only:
+            query += ' AND "isCurrent"'
+        with get_warehouse_engine().connect() as conn:
+            return pd.read_sql(
+                text(query),
+                conn,
+                params={"tag": source_system, "ids": source_ids.tolist()},
+            )
+
+    supabase = get_supabase_client()
+    pages = []
+    for i in range(0, len(source_ids), VERSION_CHUNK_SIZE):
+        chunk = source_ids[i : i + VERSION_CHUNK_SIZE].tolist()
+        offset = 0
+        while True:
+            query = (
+                supabase.table(table_name)
+                .select(",".join(columns))
+                .eq("sourceSystem", source_system)
+                .in_("sourceId", chunk)
+            )
+            if current_only:
+                query = query.eq("isCurrent", True)
+            res = (
+                query.order("id")
+                .range(offset, offset + VERSION_PAGE_SIZE - 1)
+                .execute()
+            )
+            page = res.data or []
+            if page:
+                pages.append(pd.DataFrame(page, columns=columns))
+            if len(page) < VERSION_PAGE_SIZE:
+                break
+            offset += VERSION_PAGE_SIZE
+
+    if not pages:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(pages, ignore_index=True)
+
+
+def _timestamps(values) -> pd.Series:
+    # Postgres timestamps have microsecond precision
+    return pd.to_datetime(pd.Series(values)).astype("datetime64[us]")
+
+
+def diff_versions(
+    table_name: str, df: pd.DataFrame, current: pd.DataFrame
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compare incoming rows with the current versions of the same keys.
+    Returns (versions to close: id and validTo, new versions to insert).
+    Rows whose tracked columns are unchanged are in neither.
+    """
+    tracked = TRACKED_COLUMNS[table_name]
+    incoming = df.reset_index(drop=True)
+    incoming = incoming.assign(sourceId=incoming["sourceId"].astype("int64"))
+    current = pd.DataFrame(
+        {
+            "sourceId": current["sourceId"].astype("int64"),
+            "currentId": current["id"],
+            "currentValidFrom": _timestamps(current["validFrom"]),
+            # Nullable, so keys without a current version don't turn hashes into floats
+            "currentHash": pd.array(row_hash(current, tracked), dtype="UInt64"),
+        }
+    )
+    merged = incoming.merge(current, on="sourceId", how="left")
+
+    is_new = merged["currentId"].isna()
+    changed = ~is_new & (
+        merged["currentHash"] != pd.array(row_hash(merged, tracked), dtype="UInt64")
+    ).fillna(True)
+    merged = merged[is_new | changed]
+    is_new, changed = is_new[merged.index], changed[merged.index]
+
+    # A key's first version covers it from creation; later ones start at the
+    # source update, strictly after the version they replace
+    updated_at = _timestamps(merged["updatedAt"])
+    after_current = merged["currentValidFrom"] + pd.Timedelta(microseconds=1)
+    valid_from = _timestamps(merged["createdAt"]).where(
+        is_new, updated_at.where(updated_at >= after_current, after_current)
+    )
+
+    closed = pd.DataFrame(
+        {
+            "id": merged.loc[changed, "currentId"].astype("int64"),
+            "validTo": valid_from[changed],
+        }
+    )
+    inserted = merged[list(df.columns)].assign(
+        validFrom=valid_from, validTo=None, isCurrent=True
+    )
+    return closed, inserted
+
+
+def merge_dimension(
+    table_name: str,
+    df: pd.DataFrame,
+    batch_size: int = 20000,
+    wait_seconds: float = 2.0,
+) -> None:
+    """
+    Type 2 load in batches: per batch one bulk lookup of the current versions,
+    then one call closing the changed ones and inserting their successors (and
+    first versions of new keys) in a single transaction.
+    """
+    df = df.drop_duplicates(subset=DIMENSION_NATURAL_KEY, keep="last")
+    supabase = get_supabase_client()
+
+    for i in range(0, len(df), batch_size):
+        batch = df.iloc[i : i + batch_size]
+        for source_system, rows in batch.groupby("sourceSystem"):
+            current = fetch_versions(
+                table_name,
+                source_system,
+                rows["sourceId"],
+                ["id", "sourceId", "validFrom", *TRACKED_COLUMNS[table_name]],
+                current_only=True,
+            )
+            closed, inserted = diff_versions(table_name, rows, current)
+            if inserted.empty:
+                continue
+            try:
+                supabase.rpc(
+                    "merge_dimension_versions",
+                    {
+                        "dimension": table_name,
+                        "closed": to_records(closed),
+                        "inserted": to_records(inserted),
+                        "columns": list(inserted.columns),
+                    },
+                ).execute()
+            except Exception as e:
+                raise RuntimeError(
+                    f"\tMerge into {table_name} failed on batch {i}-{i + len(batch) - 1}: {e}"
+                ) from e
+            logger.debug(
+                f"Merged batch {i}-{i + len(batch) - 1} into {table_name}: {len(closed)} changed, {len(inserted) - len(closed)} new"
+            )
+
+        time.sleep(wait_seconds)
+
+
+def load_dimension(
+    table_name: str,
+    df: pd.DataFrame,
+    batch_size: int = 20000,
+    wait_seconds: float = 2.0,
+) -> None:
+    """Load transformed dimension rows, versioned under SCD2 or overwritten in place."""
+    if scd2_enabled():
+        merge_dimension(table_name, df, batch_size, wait_seconds)
+        return
+
+    # The single version of a row is valid from its creation
+    upsert(
+        table_name,
+        df.assign(validFrom=df["createdAt"], validTo=None, isCurrent=True),
+        conflict=",".join(DIMENSION_VERSION_KEY),
+        batch_size=batch_size,
+        wait_seconds=wait_seconds,
+    )
+
+
+def as_of_version_ids(source_ids, at, versions: pd.DataFrame) -> np.ndarray:
+    """
+    Id of the version of each source id in effect at the matching `at` instant
+    (NaN if the key has no version). Instants before a key's first version
+    resolve to that version.
+    """
+    facts = pd.DataFrame(
+        {
+            "sourceId": np.asarray(source_ids, dtype=np.int64),
+            "at": _timestamps(np.asarray(at)).to_numpy(),
+            "row": np.arange(len(source_ids)),
+        }
+    )
+    versions = pd.DataFrame(
+        {
+            "sourceId": versions["sourceId"].astype("int64"),
+            "validFrom": _timestamps(versions["validFrom"]),
+            "versionId": versions["id"].astype("int64"),
+        }
+    ).sort_values("validFrom")
+
+    matched = pd.merge_asof(
+        facts.sort_values("at"),
+        versions,
+        left_on="at",
+        right_on="validFrom",
+        by="sourceId",
+        direction="backward",
+    ).sort_values("row")
+    first = versions.drop_duplicates("sourceId").set_index("sourceId")["versionId"]
+    return matched["versionId"].fillna(matched["sourceId"].map(first)).to_numpy()
+
+
+def resolve_fact_versions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace the dimension source ids of facts with the ids of the versions in
+    effect, looked up on (sourceSystem, sourceId) so sources never mix.
+    """
+    df = df.copy()
+    for source_system, rows in df.groupby("sourceSystem"):
+        for column, table_name in FACT_DIMENSION_COLUMNS.items():
+            versions = fetch_versions(
+                table_name, source_system, rows[column], ["id", "sourceId", "validFrom"]
+            )
+            ids = as_of_version_ids(rows[column], rows["createdAt"], versions)
+            missing = np.isnan(ids)
+            if missing.any():
+                raise RuntimeError(
+                    f"{int(missing.sum())} FactSales rows reference {table_name} rows missing from the warehouse"
+                )
+            df.loc[rows.index, column] = ids.astype(np.int64)
+    return df
+
+
+def load_fact_sales(
+    df: pd.DataFrame, batch_size: int = 20000, wait_seconds: float = 2.0
+) -> None:
+    """Upsert FactSales, pointing them at the dimension rows of their own source."""
+    upsert_fact_sales(
+        resolve_fact_versions(df), batch_size=batch_size, wait_seconds=wait_seconds
+    )
@@ -0,0 +1,224 @@
+import logging
+import queue
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from typing_extensions import Self
+
+from .config import EXTRACT_SETTINGS, MySQLSettings
+from .db import get_source_engine
+
+logger = logging.getLogger(__name__)
+
+# InnoDB only honours WITH CONSISTENT SNAPSHOT under REPEATABLE READ
+SNAPSHOT_ISOLATION_LEVEL = "REPEATABLE READ"
+START_SNAPSHOT = "START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY"
+
+# (statement, lag column) in order of preference; the first is MySQL 8.0.22+
+REPLICA_STATUS_QUERIES = [
+    ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+    ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+]
+
+
+def get_oldest_write_start(conn: Connection) -> datetime | None:
+    """
+    Start time of the oldest open transaction that has written rows, None if
+    there is none. Needs the PROCESS privilege; without it returns None too.
+    """
+    try:
+        return conn.execute(
+            text(
+                """
+                SELECT  MIN(trx_started)
+                FROM    information_schema.INNODB_TRX
+                WHERE   trx_rows_modified > 0
+                """
+            )
+        ).scalar()
+    except DBAPIError as e:
+        logger.warning(f"Could not read open transactions, watermark ignores them: {e}")
+        return None
+
+
+def get_replica_lag(conn: Connection) -> int:
+    """Seconds the replica behind `conn` is behind its primary."""
+    for statement, column in REPLICA_STATUS_QUERIES:
+        try:
+            status = conn.execute(text(statement)).mappings().first()
+        except DBAPIError:
+            continue
+        if status is None:
+            raise RuntimeError(
+                "Configured read replica is not replicating from a primary"
+            )
+        if status[column] is None:
+            raise RuntimeError("Replication is stopped on the read replica")
+        return int(status[column])
+    raise RuntimeError("Could not read the replica status (needs REPLICATION CLIENT)")
+
+
+def read_watermark(
+    conn: Connection, source: MySQLSettings, replica: bool = False
+) -> datetime:
+    """
+    Source time up to which every committed change is visible to a snapshot
+    started right after this call.
+
+    That is the database clock, moved back to the start of any transaction that
+    has already written but not committed yet (its rows carry an older updatedAt
+    but only become visible later), and on a replica also by its lag.
+    Read it before starting the snapshot: rows the snapshot sees beyond the
+    watermark are simply extracted again by the next run.
+    """
+    watermark = conn.execute(text("SELECT NOW(6)")).scalar_one()
+    if replica:
+        watermark -= timedelta(seconds=get_replica_lag(conn))
+        # Uncommitted writes live on the primary
+        with get_source_engine(source.name).connect() as primary:
+            oldest_write = get_oldest_write_start(primary)
+    else:
+        oldest_write = get_oldest_write_start(conn)
+
+    if oldest_write is not None:
+        watermark = min(watermark, oldest_write)
+    return watermark - timedelta(seconds=EXTRACT_SETTINGS.watermark_lag_seconds)
+
+
+def get_source_watermark(source: MySQLSettings) -> datetime:
+    """Watermark of the source's primary as of now (see read_watermark)."""
+    with get_source_engine(source.name).connect() as conn:
+        return read_watermark(conn, source)
+
+
+@contextmanager
+def global_read_lock(engine: Engine, timeout: int):
+    """
+    Hold FLUSH TABLES WITH READ LOCK so no transaction commits while snapshots
+    are started. Yields whether the lock was taken (it needs RELOAD, and fails
+    after `timeout` seconds behind long-running statements).
+    """
+    with engine.connect() as conn:
+        try:
+            conn.exec_driver_sql(f"SET SESSION lock_wait_timeout = {int(timeout)}")
+            conn.exec_driver_sql("FLUSH TABLES WITH READ LOCK")
+        except DBAPIError as e:
+            logger.warning(f"Could not take the global read lock: {e}")
+            conn.exec_driver_sql("SET SESSION lock_wait_timeout = DEFAULT")
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            conn.exec_driver_sql("UNLOCK TABLES")
+            conn.exec_driver_sql("SET SESSION lock_wait_timeout = DEFAULT")
+
+
+class SourceSnapshot:
+    """
+    Connections to one source (its read replica when configured) that all read
+    the same consistent snapshot. Borrow one per thread with connection();
+    `watermark` is the instant the snapshot holds every change up to.
+
+    With snapshots disabled, connection() hands out ordinary pooled connections
+    and the watermark is taken when extraction starts.
+    """
+
+    def __init__(
+        self,
+        source: MySQLSettings,
+        workers: int = EXTRACT_SETTINGS.snapshot_workers,
+        enabled: bool = EXTRACT_SETTINGS.snapshot,
+    ):
+        self.source = source
+        self.workers = max(workers, 1)
+        self.enabled = enabled
+        self.replica = bool(source.replica_host)
+        self.engine = get_source_engine(source.name, self.replica)
+        self.watermark: datetime | None = None
+        self._connections: list[Connection] = []
+        self._idle: queue.Queue[Connection] = queue.Queue()
+
+    @property
+    def size(self) -> int:
+        """Connections that can be borrowed at once."""
+        return len(self._connections) if self.enabled else self.workers
+
+    def __enter__(self) -> Self:
+        if not self.enabled:
+            with self.engine.connect() as conn:
+                self.watermark = read_watermark(conn, self.source, self.replica)
+            return self
+
+        try:
+            self._start()
+        except BaseException:
+            self._close()
+            raise
+        for conn in self._connections:
+            self._idle.put(conn)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._close()
+
+    def _start(self) -> None:
+        self._connections = [
+            self.engine.connect().execution_options(
+                isolation_level=SNAPSHOT_ISOLATION_LEVEL
+            )
+            for _ in range(self.workers)
+        ]
+        # Snapshots started one after another only match if nothing commits in between
+        lock = (
+            global_read_lock(self.engine, EXTRACT_SETTINGS.snapshot_lock_timeout)
+            if self.workers > 1
+            else nullcontext(True)
+        )
+        with lock as locked:
+            if not locked:
+                logger.warning(
+                    f"Extracting {self.source.name} through one snapshot connection instead of {self.workers}"
+                )
+                for conn in self._connections[1:]:
+                    conn.close()
+                del self._connections[1:]
+
+            self.watermark = read_watermark(
+                self._connections[0], self.source, self.replica
+            )
+            for conn in self._connections:
+                conn.exec_driver_sql(START_SNAPSHOT)
+
+        logger.info(
+            f"Started {len(self._connections)} snapshot connection(s) to {self.source.name} at {self.watermark}"
+        )
+
+    def _close(self) -> None:
+        for conn in self._connections:
+            try:
+                conn.rollback()
+                conn.close()
+            except SQLAlchemyError as e:
+                logger.warning(
+                    f"Could not close a snapshot connection to {self.source.name}: {e}"
+                )
+        self._connections = []
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection reading the snapshot."""
+        if not self.enabled:
+            with self.engine.connect() as conn:
+                yield conn
+            return
+
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
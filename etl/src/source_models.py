@@ -1,82 +1,92 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
-from sqlalchemy.ext.declarative import declarative_base
+from datetime import datetime
 
-Base = declarative_base()
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+
+class Base(DeclarativeBase):
+    pass
 
 
 class User(Base):
     __tablename__ = "Users"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    username = Column(String(255))
-    firstName = Column(String(255))
-    lastName = Column(String(255))
-    address1 = Column(String(255))
-    address2 = Column(String(255))
-    city = Column(String(255))
-    country = Column(String(255))
-    zipCode = Column(String(255))
-    phoneNumber = Column(String(255))
-    dateOfBirth = Column(String(255))
-    gender = Column(String(255))
-    createdAt = Column(DateTime, nullable=False)
-    updatedAt = Column(DateTime, nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    username: Mapped[str | None] = mapped_column(String(255))
+    firstName: Mapped[str | None] = mapped_column(String(255))
+    lastName: Mapped[str | None] = mapped_column(String(255))
+    address1: Mapped[str | None] = mapped_column(String(255))
+    address2: Mapped[str | None] = mapped_column(String(255))
+    city: Mapped[str | None] = mapped_column(String(255))
+    country: Mapped[str | None] = mapped_column(String(255))
+    zipCode: Mapped[str | None] = mapped_column(String(255))
+    phoneNumber: Mapped[str | None] = mapped_column(String(255))
+    dateOfBirth: Mapped[str | None] = mapped_column(String(255))
+    gender: Mapped[str | None] = mapped_column(String(255))
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
 
 
 class Product(Base):
     __tablename__ = "Products"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    productCode = Column(String(255))
-    category = Column(String(255))
-    description = Column(String(255))
-    name = Column(String(255))
-    price = Column(Float)
-    createdAt = Column(DateTime, nullable=False)
-    updatedAt = Column(DateTime, nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    productCode: Mapped[str | None] = mapped_column(String(255))
+    category: Mapped[str | None] = mapped_column(String(255))
+    description: Mapped[str | None] = mapped_column(String(255))
+    name: Mapped[str | None] = mapped_column(String(255))
+    price: Mapped[float | None] = mapped_column(Float)
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
 
 
 class Courier(Base):
     __tablename__ = "Couriers"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String(255))
-    createdAt = Column(DateTime, nullable=False)
-    updatedAt = Column(DateTime, nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str | None] = mapped_column(String(255))
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
 
 
 class Rider(Base):
     __tablename__ = "Riders"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    firstName = Column(String(255))
-    lastName = Column(String(255))
-    vehicleType = Column(String(255))
-    courierId = Column(Integer, ForeignKey("Couriers.id"))
-    age = Column(Integer)
-    gender = Column(String(255))
-    createdAt = Column(DateTime, nullable=False)
-    updatedAt = Column(DateTime, nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    firstName: Mapped[str | None] = mapped_column(String(255))
+    lastName: Mapped[str | None] = mapped_column(String(255))
+    vehicleType: Mapped[str | None] = mapped_column(String(255))
+    courierId: Mapped[int | None] = mapped_column(Integer, ForeignKey("Couriers.id"))
+    age: Mapped[int | None] = mapped_column(Integer)
+    gender: Mapped[str | None] = mapped_column(String(255))
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
 
 
 class Order(Base):
     __tablename__ = "Orders"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    orderNumber = Column(String(255))
-    userId = Column(Integer, ForeignKey("Users.id"))
-    deliveryDate = Column(String(255))
-    deliveryRiderId = Column(Integer, ForeignKey("Riders.id"))
-    createdAt = Column(DateTime, nullable=False)
-    updatedAt = Column(DateTime, nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    orderNumber: Mapped[str | None] = mapped_column(String(255))
+    userId: Mapped[int | None] = mapped_column(Integer, ForeignKey("Users.id"))
+    deliveryDate: Mapped[str | None] = mapped_column(String(255))
+    deliveryRiderId: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("Riders.id")
+    )
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
 
 
 class OrderItem(Base):
     __tablename__ = "OrderItems"
 
-    OrderId = Column(Integer, ForeignKey("Orders.id"), primary_key=True)
-    ProductId = Column(Integer, ForeignKey("Products.id"), primary_key=True)
-    quantity = Column(Integer)
-    notes = Column(String(255))
-    createdAt = Column(DateTime, nullable=False)
-    updatedAt = Column(DateTime, nullable=False)
+    OrderId: Mapped[int] = mapped_column(
+        Integer, ForeignKey("Orders.id"), primary_key=True
+    )
+    ProductId: Mapped[int] = mapped_column(
+        Integer, ForeignKey("Products.id"), primary_key=True
+    )
+    quantity: Mapped[int | None] = mapped_column(Integer)
+    notes: Mapped[str | None] = mapped_column(String(255))
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
@@ -0,0 +1,191 @@
+import json
+import shutil
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .config import STAGING_SETTINGS
+
+# pandas/pyarrow are imported inside the frame helpers so that manifest-only
+# callers (e.g. `status`) stay fast to start
+if TYPE_CHECKING:
+    import pandas as pd
+
+MANIFEST_FILE = "manifest.json"
+# Microseconds, so runs started in the same second get distinct directories
+RUN_ID_FORMAT = "%Y%m%dT%H%M%S%f"
+
+
+def get_staging_root() -> Path:
+    return Path(STAGING_SETTINGS.root_dir)
+
+
+def new_run_dir(run_id: str | None = None) -> Path:
+    """Create a fresh run directory under the staging root."""
+    get_staging_root().mkdir(parents=True, exist_ok=True)
+    while True:
+        run_dir = get_staging_root() / (
+            run_id or datetime.now().strftime(RUN_ID_FORMAT)
+        )
+        try:
+            run_dir.mkdir()
+            break
+        except FileExistsError:
+            # A generated id taken by a concurrent run: try the next instant
+            if run_id:
+                raise
+    write_manifest(run_dir, {"runId": run_dir.name, "stages": {}})
+    return run_dir
+
+
+def list_run_dirs() -> list[Path]:
+    """List run directories, oldest first."""
+    root = get_staging_root()
+    if not root.exists():
+        return []
+    return sorted(
+        p for p in root.iterdir() if p.is_dir() and (p / MANIFEST_FILE).exists()
+    )
+
+
+def latest_run_dir() -> Path | None:
+    runs = list_run_dirs()
+    return runs[-1] if runs else None
+
+
+def read_manifest(run_dir: Path) -> dict[str, Any]:
+    with open(run_dir / MANIFEST_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(run_dir: Path, manifest: dict[str, Any]) -> None:
+    # Write to a temp file first so a crash never leaves a half-written manifest
+    tmp_path = run_dir / f"{MANIFEST_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    tmp_path.replace(run_dir / MANIFEST_FILE)
+
+
+def mark_stage_complete(run_dir: Path, stage: str, **details: Any) -> None:
+    """Record a finished stage (and any details, e.g. row counts) in the manifest."""
+    manifest = read_manifest(run_dir)
+    manifest["stages"][stage] = {
+        "completedAt": datetime.now().isoformat(),
+        **details,
+    }
+    write_manifest(run_dir, manifest)
+
+
+def is_stage_complete(run_dir: Path, stage: str) -> bool:
+    return stage in read_manifest(run_dir).get("stages", {})
+
+
+def _frame_dir(run_dir: Path, stage: str, name: str) -> Path:
+    return run_dir / stage / name
+
+
+def write_frame(
+    run_dir: Path,
+    stage: str,
+    name: str,
+    df: "pd.DataFrame",
+    rows_per_file: int | None = None,
+) -> Path:
+    """
+    Write a DataFrame as a directory of compressed Parquet part files.
+    An empty DataFrame still gets one (empty) part so its schema is kept.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows_per_file = rows_per_file or STAGING_SETTINGS.rows_per_file
+    frame_dir = _frame_dir(run_dir, stage, name)
+    if frame_dir.exists():
+        shutil.rmtree(frame_dir)
+    frame_dir.mkdir(parents=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    offsets = range(0, max(table.num_rows, 1), rows_per_file)
+    for part, offset in enumerate(offsets):
+        pq.write_table(
+            table.slice(offset, rows_per_file),
+            frame_dir / f"part-{part:05d}.parquet",
+            compression=STAGING_SETTINGS.compression,
+        )
+
+    return frame_dir
+
+
+def write_frame_parts(
+    run_dir: Path, stage: str, name: str, frames: Iterable["pd.DataFrame"]
+) -> int:
+    """
+    Write each DataFrame of an iterable (e.g. extract chunks) as its own part file,
+    so only one chunk is in memory at a time. Returns the total row count.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    frame_dir = _frame_dir(run_dir, stage, name)
+    if frame_dir.exists():
+        shutil.rmtree(frame_dir)
+    frame_dir.mkdir(parents=True)
+
+    rows = 0
+    for part, df in enumerate(frames):
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False),
+            frame_dir / f"part-{part:05d}.parquet",
+            compression=STAGING_SETTINGS.compression,
+        )
+        rows += len(df)
+
+    return rows
+
+
+def has_frame(run_dir: Path, stage: str, name: str) -> bool:
+    return any(_frame_dir(run_dir, stage, name).glob("part-*.parquet"))
+
+
+def _part_files(run_dir: Path, stage: str, name: str) -> list[Path]:
+    parts = sorted(_frame_dir(run_dir, stage, name).glob("part-*.parquet"))
+    if not parts:
+        raise FileNotFoundError(f"No staged data for {stage}/{name} in {run_dir}")
+    return parts
+
+
+def read_frame(run_dir: Path, stage: str, name: str) -> "pd.DataFrame":
+    """
+    Read a staged DataFrame back, memory-mapping its part files. Parts written
+    chunk by chunk may differ in type (e.g. downcast to int8 in one chunk and
+    int16 in the next, or all-null), so they are promoted to a common schema.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables = [
+        pq.read_table(path, memory_map=True)
+        for path in _part_files(run_dir, stage, name)
+    ]
+    return pa.concat_tables(tables, promote_options="permissive").to_pandas()
+
+
+def iter_frame_parts(
+    run_dir: Path, stage: str, name: str, columns: list[str] | None = None
+) -> Iterator["pd.DataFrame"]:
+    """Yield a staged DataFrame (or some of its columns) one part file at a time."""
+    import pyarrow.parquet as pq
+
+    for path in _part_files(run_dir, stage, name):
+        yield pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def cleanup_old_runs(keep: int | None = None) -> list[Path]:
+    """Delete all but the newest `keep` run directories. Returns the removed paths."""
+    keep = STAGING_SETTINGS.keep_runs if keep is None else keep
+    runs = list_run_dirs()
+    stale = runs[: max(len(runs) - keep, 0)]
+    for run_dir in stale:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    return stale
@@ -17,7 +17,9 @@ def parse_date(value):
     return pd.NaT
 
 
-def transform_dim_users(users_df: pd.DataFrame) -> pd.DataFrame:
+def transform_dim_users(
+    users_df: pd.DataFrame, source_system: str = SourceSystem.MYSQL.value
+) -> pd.DataFrame:
     """Transform Users table into DimUsers"""
     new_df = users_df.copy()
 
@@ -37,7 +39,7 @@ def transform_dim_users(users_df: pd.DataFrame) -> pd.DataFrame:
     new_df["createdAt"] = pd.to_datetime(new_df["createdAt"], errors="coerce")
     new_df["updatedAt"] = pd.to_datetime(new_df["updatedAt"], errors="coerce")
     new_df["sourceId"] = new_df["id"]
-    new_df["sourceSystem"] = SourceSystem.MYSQL.value
+    new_df["sourceSystem"] = source_system
 
     return new_df[
         [
@@ -55,7 +57,9 @@ def transform_dim_users(users_df: pd.DataFrame) -> pd.DataFrame:
     ]
 
 
-def transform_dim_products(products_df: pd.DataFrame) -> pd.DataFrame:
+def transform_dim_products(
+    products_df: pd.DataFrame, source_system: str = SourceSystem.MYSQL.value
+) -> pd.DataFrame:
     """Transform Products table into DimProducts"""
     new_df = products_df.copy()
 
@@ -74,7 +78,7 @@ def transform_dim_products(products_df: pd.DataFrame) -> pd.DataFrame:
     new_df["createdAt"] = pd.to_datetime(new_df["createdAt"], errors="coerce")
     new_df["updatedAt"] = pd.to_datetime(new_df["updatedAt"], errors="coerce")
     new_df["sourceId"] = new_df["id"]
-    new_df["sourceSystem"] = SourceSystem.MYSQL.value
+    new_df["sourceSystem"] = source_system
 
     return new_df[
         [
@@ -92,7 +96,9 @@ def transform_dim_products(products_df: pd.DataFrame) -> pd.DataFrame:
 
 
 def transform_dim_riders(
-    riders_df: pd.DataFrame, couriers_df: pd.DataFrame
+    riders_df: pd.DataFrame,
+    couriers_df: pd.DataFrame,
+    source_system: str = SourceSystem.MYSQL.value,
 ) -> pd.DataFrame:
     """Transform joined riders and couriers data into DimRiders"""
     new_df = riders_df.copy()
@@ -132,7 +138,7 @@ def transform_dim_riders(
     new_df["createdAt"] = pd.to_datetime(new_df["createdAt"], errors="coerce")
     new_df["updatedAt"] = pd.to_datetime(new_df["updatedAt"], errors="coerce")
     new_df["sourceId"] = new_df["riderId"]
-    new_df["sourceSystem"] = SourceSystem.MYSQL.value
+    new_df["sourceSystem"] = source_system
 
     return new_df[
         [
@@ -167,12 +173,8 @@ def generate_dim_date(
     return df
 
 
-def transform_fact_sales(joined_df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Transform joined source data into the FactSales table.
-    """
-    new_df = joined_df.copy()
-
+def load_dim_date() -> pd.DataFrame:
+    """Fetch DimDate from the warehouse, generating it first if it is empty."""
     try:
         dim_date_records = fetch_all_rows("DimDate")
 
@@ -182,6 +184,7 @@ def transform_fact_sales(joined_df: pd.DataFrame) -> pd.DataFrame:
             dim_date_df = generate_dim_date()
             upsert("DimDate", dim_date_df, "fullDate")
             print(f"\tCreated DimDate with {len(dim_date_df)} records")
+            dim_date_df = pd.DataFrame(fetch_all_rows("DimDate"))
         else:
             dim_date_df = pd.DataFrame(dim_date_records)
             print(f"\tLoaded existing DimDate ({len(dim_date_df)} records)")
@@ -189,9 +192,26 @@ def transform_fact_sales(joined_df: pd.DataFrame) -> pd.DataFrame:
     except Exception as e:
         raise RuntimeError(f"Failed to fetch DimDate from warehouse: {e}")
 
-    new_df["userId"] = new_df["userId"].fillna(0).astype(int)
-
     dim_date_df["fullDate"] = pd.to_datetime(dim_date_df["fullDate"], errors="coerce")
+    return dim_date_df
+
+
+def transform_fact_sales(
+    joined_df: pd.DataFrame,
+    dim_date_df: pd.DataFrame | None = None,
+    source_system: str = SourceSystem.MYSQL.value,
+) -> pd.DataFrame:
+    """
+    Transform joined source data into the FactSales table.
+    Pass `dim_date_df` (from load_dim_date) to avoid refetching DimDate per batch.
+    """
+    new_df = joined_df.copy()
+
+    if dim_date_df is None:
+        dim_date_df = load_dim_date()
+
+    # Dimension source ids; scd.load_fact_sales resolves them to warehouse ids
+    new_df["userId"] = new_df["userId"].fillna(0).astype(int)
 
     new_df["deliveryDate"] = new_df["deliveryDate"].apply(parse_date)
     new_df = new_df.merge(
@@ -207,7 +227,7 @@ def transform_fact_sales(joined_df: pd.DataFrame) -> pd.DataFrame:
     new_df["quantitySold"] = new_df["quantity"].fillna(0).astype(int)
     new_df["createdAt"] = pd.to_datetime(new_df["order_created"], errors="coerce")
     new_df["sourceId"] = new_df["order_id"]
-    new_df["sourceSystem"] = SourceSystem.MYSQL.value
+    new_df["sourceSystem"] = source_system
 
     result = new_df[
         [
@@ -215,6 +235,7 @@ def transform_fact_sales(joined_df: pd.DataFrame) -> pd.DataFrame:
             "deliveryDateId",
             "deliveryRiderId",
             "productId",
+            "deliveryDate",
             "quantitySold",
             "createdAt",
             "sourceId",
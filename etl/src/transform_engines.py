@@ -0,0 +1,113 @@
+import importlib
+import logging
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+
+import pandas as pd
+
+from .config import SOURCES, TRANSFORM_SETTINGS
+from .staging import iter_frame_parts, read_frame
+
+logger = logging.getLogger(__name__)
+
+TransformFn = Callable[[ModuleType, pd.DataFrame], pd.DataFrame]
+
+# Modules implementing transform_dim_users, transform_dim_products,
+# transform_dim_riders, generate_dim_date and transform_fact_sales
+TRANSFORM_ENGINES = {
+    "pandas": ".transform",
+    "polars": ".transform_polars",
+}
+
+
+def get_transform_engine(name: str = TRANSFORM_SETTINGS.engine) -> ModuleType:
+    """The transform functions of the named engine (ETL_TRANSFORM_ENGINE by default)."""
+    if name not in TRANSFORM_ENGINES:
+        raise ValueError(
+            f"Unknown transform engine: {name} (expected one of {list(TRANSFORM_ENGINES)})"
+        )
+    return importlib.import_module(TRANSFORM_ENGINES[name], __package__)
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    # Datetime resolution depends on how pandas inferred it, not on the values
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]) or (
+            df[col].dtype == object and df[col].isna().all()
+        ):
+            df[col] = pd.to_datetime(df[col]).astype("datetime64[ns]")
+    return df
+
+
+def assert_same_output(
+    expected: pd.DataFrame, actual: pd.DataFrame, label: str
+) -> None:
+    """Raise AssertionError unless both frames hold the same columns and values."""
+    try:
+        pd.testing.assert_frame_equal(
+            _normalize(expected), _normalize(actual), check_dtype=False
+        )
+    except AssertionError as e:
+        raise AssertionError(f"{label}: transform engines disagree\n{e}") from None
+
+
+def _parity_checks(
+    tag: str, couriers_df: pd.DataFrame, dim_date_df: pd.DataFrame
+) -> dict[str, tuple[str, TransformFn]]:
+    """Per warehouse table, its extract key and how to transform it with an engine."""
+    return {
+        "DimUsers": ("users", lambda m, df: m.transform_dim_users(df, tag)),
+        "DimProducts": ("products", lambda m, df: m.transform_dim_products(df, tag)),
+        "DimRiders": (
+            "riders",
+            lambda m, df: m.transform_dim_riders(df, couriers_df, tag),
+        ),
+        "FactSales": (
+            "facts",
+            lambda m, df: m.transform_fact_sales(df, dim_date_df, tag),
+        ),
+    }
+
+
+def check_parity(run_dir: Path, engine: str = "polars") -> dict[str, int]:
+    """
+    Transform a staged extract with both the pandas engine and `engine`, and
+    check the outputs are identical. Uses a generated DimDate, so no warehouse
+    is needed. Returns the rows compared per table.
+    """
+    expected, actual = get_transform_engine("pandas"), get_transform_engine(engine)
+    rows = {
+        "DimDate": 0,
+        "DimUsers": 0,
+        "DimProducts": 0,
+        "DimRiders": 0,
+        "FactSales": 0,
+    }
+
+    dim_date_df = expected.generate_dim_date()
+    assert_same_output(dim_date_df, actual.generate_dim_date(), "DimDate")
+    rows["DimDate"] = len(dim_date_df)
+    dim_date_df["id"] = range(1, len(dim_date_df) + 1)
+
+    for source in SOURCES:
+        name, tag = source.name, source.source_system
+        checks = _parity_checks(
+            tag, read_frame(run_dir, "extract", f"{name}/couriers"), dim_date_df
+        )
+        for table_name, (key, transform_fn) in checks.items():
+            for i, df in enumerate(
+                iter_frame_parts(run_dir, "extract", f"{name}/{key}")
+            ):
+                if df.empty:
+                    continue
+                result = transform_fn(expected, df)
+                assert_same_output(
+                    result, transform_fn(actual, df), f"{table_name} ({name}, part {i})"
+                )
+                rows[table_name] += len(result)
+
+        logger.info(f"{engine} engine matches pandas on {name}")
+
+    return rows
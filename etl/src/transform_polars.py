@@ -0,0 +1,245 @@
+"""
+Polars implementation of the transform functions in transform.py.
+
+Each function builds one LazyFrame query, so Polars can optimize and run it
+multithreaded (and streaming) before a single conversion back to pandas. Inputs
+and outputs are pandas DataFrames, as with the pandas engine, and the values
+must match it exactly (see transform_engines.check_parity).
+"""
+
+from datetime import date
+
+import pandas as pd
+import polars as pl
+
+from .transform import load_dim_date
+from .warehouse_models import SourceSystem
+
+# Formats tried in order by parse_date
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y"]
+
+GENDER_SYNONYMS = {"m": "male", "f": "female"}
+CATEGORY_SYNONYMS = {"toy": "toys", "bag": "bags", "make up": "makeup"}
+VEHICLE_TYPE_SYNONYMS = {
+    "motorbike": "motorcycle",
+    "bike": "bicycle",
+    "trike": "tricycle",
+}
+
+DIM_USERS_COLUMNS = [
+    "firstName",
+    "lastName",
+    "city",
+    "country",
+    "dateOfBirth",
+    "gender",
+    "createdAt",
+    "updatedAt",
+    "sourceId",
+    "sourceSystem",
+]
+DIM_PRODUCTS_COLUMNS = [
+    "productCode",
+    "category",
+    "description",
+    "name",
+    "price",
+    "createdAt",
+    "updatedAt",
+    "sourceId",
+    "sourceSystem",
+]
+DIM_RIDERS_COLUMNS = [
+    "firstName",
+    "lastName",
+    "vehicleType",
+    "courierName",
+    "age",
+    "gender",
+    "createdAt",
+    "updatedAt",
+    "sourceId",
+    "sourceSystem",
+]
+FACT_SALES_COLUMNS = [
+    "userId",
+    "deliveryDateId",
+    "deliveryRiderId",
+    "productId",
+    "deliveryDate",
+    "quantitySold",
+    "createdAt",
+    "sourceId",
+    "sourceSystem",
+]
+
+
+def _lazy(df: pd.DataFrame | pl.DataFrame | pl.LazyFrame) -> pl.LazyFrame:
+    if isinstance(df, pl.LazyFrame):
+        return df
+    if isinstance(df, pd.DataFrame):
+        df = pl.from_pandas(df)
+    return df.lazy()
+
+
+def _collect(lf: pl.LazyFrame) -> pd.DataFrame:
+    return lf.collect(engine="streaming").to_pandas()
+
+
+def parse_date(column: str) -> pl.Expr:
+    """Same as transform.parse_date: the first format that parses, else null."""
+    text = pl.col(column).cast(pl.String).str.strip_chars()
+    return pl.coalesce(
+        [
+            text.str.strptime(pl.Datetime("us"), fmt, strict=False)
+            for fmt in DATE_FORMATS
+        ]
+    ).alias(column)
+
+
+def to_datetime(lf: pl.LazyFrame, column: str) -> pl.Expr:
+    """Same as pd.to_datetime(errors="coerce") on a datetime or string column."""
+    if lf.collect_schema()[column] == pl.String:
+        return pl.col(column).str.to_datetime(strict=False).alias(column)
+    return pl.col(column).cast(pl.Datetime("us")).alias(column)
+
+
+def clean_label(
+    column: str, synonyms: dict[str, str], capitalize: bool = False
+) -> pl.Expr:
+    """Trim, lowercase, map synonyms, then title-case (or capitalize), '' if null."""
+    label = pl.col(column).str.strip_chars().str.to_lowercase().replace(synonyms)
+    if capitalize:
+        label = label.str.slice(0, 1).str.to_uppercase() + label.str.slice(1)
+    else:
+        label = label.str.to_titlecase()
+    return label.fill_null("").alias(column)
+
+
+def fill_blank(*columns: str) -> list[pl.Expr]:
+    return [pl.col(c).fill_null("") for c in columns]
+
+
+def transform_dim_users(
+    users_df: pd.DataFrame, source_system: str = SourceSystem.MYSQL.value
+) -> pd.DataFrame:
+    """Transform Users table into DimUsers"""
+    lf = _lazy(users_df)
+    lf = lf.with_columns(
+        *fill_blank("firstName", "lastName", "city", "country"),
+        parse_date("dateOfBirth"),
+        clean_label("gender", GENDER_SYNONYMS),
+        to_datetime(lf, "createdAt"),
+        to_datetime(lf, "updatedAt"),
+        pl.col("id").alias("sourceId"),
+        pl.lit(source_system).alias("sourceSystem"),
+    )
+    return _collect(lf.select(DIM_USERS_COLUMNS))
+
+
+def transform_dim_products(
+    products_df: pd.DataFrame, source_system: str = SourceSystem.MYSQL.value
+) -> pd.DataFrame:
+    """Transform Products table into DimProducts"""
+    lf = _lazy(products_df)
+    lf = lf.with_columns(
+        *fill_blank("productCode", "description", "name"),
+        clean_label("category", CATEGORY_SYNONYMS, capitalize=True),
+        pl.col("price").fill_null(0.0),
+        to_datetime(lf, "createdAt"),
+        to_datetime(lf, "updatedAt"),
+        pl.col("id").alias("sourceId"),
+        pl.lit(source_system).alias("sourceSystem"),
+    )
+    return _collect(lf.select(DIM_PRODUCTS_COLUMNS))
+
+
+def transform_dim_riders(
+    riders_df: pd.DataFrame,
+    couriers_df: pd.DataFrame,
+    source_system: str = SourceSystem.MYSQL.value,
+) -> pd.DataFrame:
+    """Transform joined riders and couriers data into DimRiders"""
+    # pandas merges int and float keys alike; Polars needs one key type
+    couriers = _lazy(couriers_df).select(
+        pl.col("id").cast(pl.Int64).alias("courierIdRef"),
+        pl.col("name").alias("courierName"),
+    )
+    lf = _lazy(riders_df).join(
+        couriers,
+        how="left",
+        left_on=pl.col("courierId").cast(pl.Int64),
+        right_on="courierIdRef",
+        maintain_order="left",
+    )
+    lf = lf.with_columns(
+        *fill_blank("firstName", "lastName", "courierName"),
+        clean_label("vehicleType", VEHICLE_TYPE_SYNONYMS),
+        pl.col("age").fill_null(0),
+        clean_label("gender", GENDER_SYNONYMS),
+        to_datetime(lf, "createdAt"),
+        to_datetime(lf, "updatedAt"),
+        pl.col("id").alias("sourceId"),
+        pl.lit(source_system).alias("sourceSystem"),
+    )
+    return _collect(lf.select(DIM_RIDERS_COLUMNS))
+
+
+def generate_dim_date(
+    start_date: date = date(2020, 1, 1), end_date: date = date(2029, 12, 31)
+) -> pd.DataFrame:
+    """Create a date dimension table for DimDate"""
+    full_date = pl.col("fullDate")
+    lf = (
+        pl.LazyFrame({"fullDate": pl.date_range(start_date, end_date, eager=True)})
+        .with_columns(full_date.cast(pl.Datetime("us")))
+        .with_columns(
+            full_date.dt.year().cast(pl.Int32).alias("year"),
+            full_date.dt.month().cast(pl.Int32).alias("month"),
+            full_date.dt.day().cast(pl.Int32).alias("day"),
+            full_date.dt.strftime("%B").alias("monthName"),
+            full_date.dt.strftime("%A").alias("dayOfTheWeek"),
+            full_date.dt.quarter().cast(pl.Int32).alias("quarter"),
+        )
+    )
+    return _collect(lf)
+
+
+def transform_fact_sales(
+    joined_df: pd.DataFrame,
+    dim_date_df: pd.DataFrame | None = None,
+    source_system: str = SourceSystem.MYSQL.value,
+) -> pd.DataFrame:
+    """
+    Transform joined source data into the FactSales table.
+    Pass `dim_date_df` (from load_dim_date) to avoid refetching DimDate per batch.
+    """
+    if dim_date_df is None:
+        dim_date_df = load_dim_date()
+
+    dim_date = _lazy(dim_date_df[["fullDate", "id"]]).select(
+        pl.col("fullDate").cast(pl.Datetime("us")),
+        pl.col("id").alias("deliveryDateId"),
+    )
+    lf = (
+        _lazy(joined_df)
+        .with_columns(parse_date("deliveryDate"))
+        .join(
+            dim_date,
+            how="left",
+            left_on="deliveryDate",
+            right_on="fullDate",
+            maintain_order="left",
+        )
+    )
+    lf = lf.with_columns(
+        pl.col("userId").fill_null(0).cast(pl.Int64),
+        pl.col("deliveryDateId").fill_null(0).cast(pl.Int64),
+        pl.col("deliveryRiderId").fill_null(0).cast(pl.Int64),
+        pl.col("product_id").fill_null(0).cast(pl.Int64).alias("productId"),
+        pl.col("quantity").fill_null(0).cast(pl.Int64).alias("quantitySold"),
+        to_datetime(lf, "order_created").alias("createdAt"),
+        pl.col("order_id").alias("sourceId"),
+        pl.lit(source_system).alias("sourceSystem"),
+    )
+    return _collect(lf.select(FACT_SALES_COLUMNS))
@@ -0,0 +1,406 @@
+import json
+import logging
+import time
+from collections.abc import Callable
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .config import VALIDATION_SETTINGS
+from .db import get_supabase_client, get_warehouse_engine
+from .warehouse import physical_design_enabled
+from .warehouse_models import RiderVehicleType
+
+logger = logging.getLogger(__name__)
+
+# A rule returns a boolean mask of the rows that FAIL it. Masks are computed on
+# whole columns, never per row. `keys` maps a dimension table to the source ids
+# known for the batch's source system (see get_dimension_keys).
+Rule = tuple[str, Callable[[pd.DataFrame, dict[str, np.ndarray]], pd.Series]]
+
+QUARANTINE_TABLE = "ETLQuarantine"
+QUARANTINE_BATCH_SIZE = 1000
+KEY_PAGE_SIZE = 1000  # PostgREST max_rows
+
+MIN_RIDER_AGE = 16
+MAX_RIDER_AGE = 100
+
+
+def not_null(column: str) -> Rule:
+    return f"not_null:{column}", lambda df, keys: df[column].isna()
+
+
+def not_blank(column: str) -> Rule:
+    return (
+        f"not_blank:{column}",
+        lambda df, keys: df[column].isna() | (df[column].astype(str).str.strip() == ""),
+    )
+
+
+def allowed(column: str, values) -> Rule:
+    values = list(values)
+    return f"allowed:{column}", lambda df, keys: ~df[column].isin(values)
+
+
+def in_range(column: str, low=None, high=None, include_low: bool = True) -> Rule:
+    """Values within [low, high] (or (low, high] without `include_low`); null fails."""
+
+    def check(df: pd.DataFrame, keys) -> pd.Series:
+        values = df[column]
+        ok = values.notna()
+        if low is not None:
+            ok &= values >= low if include_low else values > low
+        if high is not None:
+            ok &= values <= high
+        return ~ok
+
+    return f"in_range:{column}", check
+
+
+def foreign_key(column: str, dimension: str) -> Rule:
+    """The (source) id must exist in `dimension` for the batch's source system."""
+    return (
+        f"foreign_key:{column}",
+        lambda df, keys: ~df[column].isin(keys[dimension]),
+    )
+
+
+def get_validation_rules() -> dict[str, list[Rule]]:
+    """
+    Rules per warehouse table. They catch what the transforms otherwise hide:
+    unparseable dates (NaT), missing references filled with 0 and prices filled
+    with 0.0, and values the warehouse would reject for the whole batch.
+    """
+    product_rules = [not_blank("category")]
+    if VALIDATION_SETTINGS.product_categories:
+        product_rules.append(
+            allowed("category", VALIDATION_SETTINGS.product_categories)
+        )
+    product_rules.append(
+        in_range("price", 0, VALIDATION_SETTINGS.max_price, include_low=False)
+    )
+
+    return {
+        "DimUsers": [
+            not_null("dateOfBirth"),
+            not_null("createdAt"),
+            not_null("updatedAt"),
+        ],
+        "DimProducts": [
+            *product_rules,
+            not_null("createdAt"),
+            not_null("updatedAt"),
+        ],
+        "DimRiders": [
+            # courierName is blank for riders without a courier, which is valid
+            allowed("vehicleType", [v.value for v in RiderVehicleType]),
+            in_range("age", MIN_RIDER_AGE, MAX_RIDER_AGE),
+            not_null("createdAt"),
+            not_null("updatedAt"),
+        ],
+        "FactSales": [
+            not_null("deliveryDate"),
+            in_range("deliveryDateId", low=1),
+            foreign_key("userId", "DimUsers"),
+            foreign_key("productId", "DimProducts"),
+            foreign_key("deliveryRiderId", "DimRiders"),
+            in_range("quantitySold", low=1),
+            not_null("createdAt"),
+        ],
+    }
+
+
+def validate_frame(
+    table_name: str,
+    df: pd.DataFrame,
+    keys: dict[str, np.ndarray] | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame, dict[str, int]]:
+    """
+    Split a transformed batch into rows passing every rule of its table and
+    quarantined rows (with a "rules" column naming the rules they failed).
+    Returns (valid, quarantined, failures per rule).
+    """
+    rules = get_validation_rules()[table_name]
+    masks = pd.DataFrame(
+        {name: check(df, keys or {}).to_numpy(dtype=bool) for name, check in rules},
+        index=df.index,
+    )
+    failed = masks.any(axis=1).to_numpy()
+    counts = {name: int(n) for name, n in masks.sum().items() if n}
+
+    if not failed.any():
+        return df, df.iloc[:0].assign(rules=pd.Series(dtype=object)), counts
+
+    # "rule1;rule2" per failing row: a boolean × string dot product concatenates
+    names = np.array([f"{name};" for name in masks.columns], dtype=object)
+    reasons = masks.to_numpy()[failed].astype(object).dot(names)
+    quarantined = df[failed].assign(
+        rules=pd.Series(reasons, index=df.index[failed]).str.rstrip(";")
+    )
+    return df[~failed], quarantined, counts
+
+
+def fetch_dimension_keys(table_name: str, source_system: str) -> np.ndarray:
+    """Source ids of one source system already in a warehouse dimension (current versions)."""
+    if physical_design_enabled():
+        with get_warehouse_engine().connect() as conn:
+            rows = conn.execute(
+                text(
+                    f'SELECT "sourceId" FROM "{table_name}" WHERE "sourceSystem"::text = :tag AND "isCurrent"'
+                ),
+                {"tag": source_system},
+            )
+            return np.fromiter((row[0] for row in rows), dtype=np.int64)
+
+    supabase = get_supabase_client()
+    pages = []
+    offset = 0
+    while True:
+        res = (
+            supabase.table(table_name)
+            .select("sourceId")
+            .eq("sourceSystem", source_system)
+            .eq("isCurrent", True)
+            .order("id")
+            .range(offset, offset + KEY_PAGE_SIZE - 1)
+            .execute()
+        )
+        page = res.data or []
+        pages.append(np.array([row["sourceId"] for row in page], dtype=np.int64))
+        if len(page) < KEY_PAGE_SIZE:
+            return np.concatenate(pages)
+        offset += KEY_PAGE_SIZE
+
+
+def get_dimension_keys(
+    source_system: str, staged: dict[str, np.ndarray] | None = None
+) -> dict[str, np.ndarray]:
+    """
+    Source ids facts may reference: those in the warehouse dimensions plus
+    `staged` ones (valid dimension rows of this run, not loaded yet).
+    """
+    keys = {}
+    for table_name in ["DimUsers", "DimProducts", "DimRiders"]:
+        known = fetch_dimension_keys(table_name, source_system)
+        if staged and table_name in staged:
+            known = np.union1d(known, staged[table_name])
+        keys[table_name] = known
+    return keys
+
+
+def quarantine_records(
+    run_id: str, table_name: str, quarantined: pd.DataFrame
+) -> list[dict]:
+    """ETLQuarantine rows: the failed rules plus the whole transformed row as JSON."""
+    records = json.loads(
+        quarantined.drop(columns="rules").to_json(orient="records", date_format="iso")
+    )
+    return [
+        {
+            "runId": run_id,
+            "tableName": table_name,
+            "sourceSystem": record.get("sourceSystem"),
+            "sourceId": record.get("sourceId"),
+            "rules": rules.split(";"),
+            "record": record,
+        }
+        for record, rules in zip(records, quarantined["rules"])
+    ]
+
+
+def clear_quarantine(
+    run_id: str,
+    tables: list[str],
+    source_system: str | None = None,
+    id_range: tuple[int, int] | None = None,
+) -> None:
+    """
+    Remove quarantined rows of a run (optionally of one source system and
+    sourceId range), so loading it again doesn't duplicate them.
+    """
+    query = (
+        get_supabase_client()
+        .table(QUARANTINE_TABLE)
+        .delete()
+        .eq("runId", run_id)
+        .in_("tableName", tables)
+    )
+    if source_system is not None:
+        query = query.eq("sourceSystem", source_system)
+    if id_range is not None:
+        query = query.gte("sourceId", id_range[0]).lt("sourceId", id_range[1])
+    query.execute()
+
+
+def insert_quarantine(run_id: str, table_name: str, quarantined: pd.DataFrame) -> int:
+    """Insert quarantined rows into ETLQuarantine in batches. Returns the rows inserted."""
+    if quarantined.empty:
+        return 0
+
+    supabase = get_supabase_client()
+    records = quarantine_records(run_id, table_name, quarantined)
+    for i in range(0, len(records), QUARANTINE_BATCH_SIZE):
+        batch = records[i : i + QUARANTINE_BATCH_SIZE]
+        try:
+            supabase.table(QUARANTINE_TABLE).insert(batch).execute()
+        except Exception as e:
+            raise RuntimeError(
+                f"\tQuarantine of {table_name} failed on batch {i}-{i + len(batch) - 1}: {e}"
+            ) from e
+    logger.info(f"Quarantined {len(records)} {table_name} rows")
+    return len(records)
+
+
+def resolve_quarantine(run_id: str, table_name: str, loaded: pd.DataFrame) -> int:
+    """
+    Delete the ETLQuarantine rows of other runs that `loaded` (rows of this run
+    just loaded) supersedes, so only unresolved rows stay quarantined. FactSales
+    rows are matched on order and product, dimensions on sourceId.
+    Returns the rows deleted.
+    """
+    if loaded.empty:
+        return 0
+
+    supabase = get_supabase_client()
+    is_fact = table_name == "FactSales"
+    resolved: list[int] = []
+    for source_system, group in loaded.groupby("sourceSystem"):
+        keys = np.unique(group["sourceId"].to_numpy(dtype=np.int64)).tolist()
+        pairs = (
+            set(zip(group["sourceId"].astype(int), group["productId"].astype(int)))
+            if is_fact
+            else None
+        )
+        for i in range(0, len(keys), QUARANTINE_BATCH_SIZE):
+            last_id = -1
+            while True:
+                res = (
+                    supabase.table(QUARANTINE_TABLE)
+                    .select("id,sourceId,record" if is_fact else "id,sourceId")
+                    .eq("tableName", table_name)
+                    .eq("sourceSystem", source_system)
+                    .neq("runId", run_id)
+                    .in_("sourceId", keys[i : i + QUARANTINE_BATCH_SIZE])
+                    .gt("id", last_id)
+                    .order("id")
+                    .limit(KEY_PAGE_SIZE)
+                    .execute()
+                )
+                page = res.data or []
+                resolved.extend(
+                    row["id"]
+                    for row in page
+                    if pairs is None
+                    or (row["sourceId"], row["record"].get("productId")) in pairs
+                )
+                if len(page) < KEY_PAGE_SIZE:
+                    break
+                last_id = page[-1]["id"]
+
+    for i in range(0, len(resolved), QUARANTINE_BATCH_SIZE):
+        (
+            supabase.table(QUARANTINE_TABLE)
+            .delete()
+            .in_("id", resolved[i : i + QUARANTINE_BATCH_SIZE])
+            .execute()
+        )
+    if resolved:
+        logger.info(f"Resolved {len(resolved)} quarantined {table_name} rows")
+    return len(resolved)
+
+
+def fetch_quarantined_keys(table_name: str, source_system: str) -> np.ndarray:
+    """
+    Sorted distinct sourceIds of one source system's rows of a table in
+    ETLQuarantine, i.e. not loaded since (see resolve_quarantine).
+    """
+    supabase = get_supabase_client()
+    pages = []
+    last_id = -1
+    while True:
+        res = (
+            supabase.table(QUARANTINE_TABLE)
+            .select("id,sourceId")
+            .eq("tableName", table_name)
+            .eq("sourceSystem", source_system)
+            .gt("id", last_id)
+            .order("id")
+            .limit(KEY_PAGE_SIZE)
+            .execute()
+        )
+        page = res.data or []
+        pages.append(
+            np.array(
+                [row["sourceId"] for row in page if row["sourceId"] is not None],
+                dtype=np.int64,
+            )
+        )
+        if len(page) < KEY_PAGE_SIZE:
+            return np.unique(np.concatenate(pages))
+        last_id = page[-1]["id"]
+
+
+def benchmark(rows: int = 10_000_000, seed: int = 0) -> dict[str, float]:
+    """
+    Time validate_frame on a synthetic FactSales batch of `rows` rows (about 1%
+    invalid), against writing the same batch to Parquet, which every row of a
+    staged run pays anyway.
+    """
+    import tempfile
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rng = np.random.default_rng(seed)
+    dim_size = max(rows // 100, 1)
+    keys = {
+        table_name: np.arange(1, dim_size + 1, dtype=np.int64)
+        for table_name in ["DimUsers", "DimProducts", "DimRiders"]
+    }
+
+    def ids(invalid_share: float) -> np.ndarray:
+        values = rng.integers(1, dim_size + 1, rows)
+        values[rng.random(rows) < invalid_share] = 0
+        return values
+
+    delivery = pd.Timestamp("2024-01-01") + pd.to_timedelta(
+        rng.integers(0, 365, rows), "D"
+    )
+    df = pd.DataFrame(
+        {
+            "userId": ids(0.002),
+            "deliveryDateId": ids(0.002),
+            "deliveryRiderId": ids(0.002),
+            "productId": ids(0.002),
+            "deliveryDate": delivery.where(rng.random(rows) >= 0.002),
+            "quantitySold": ids(0.002),
+            "createdAt": pd.Timestamp(datetime.now()),
+            "sourceId": np.arange(rows, dtype=np.int64),
+            "sourceSystem": "MySQL",
+        }
+    )
+
+    start = time.perf_counter()
+    _, quarantined, counts = validate_frame("FactSales", df, keys)
+    validate_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False),
+            f"{tmp}/facts.parquet",
+            compression="zstd",
+        )
+        staging_seconds = time.perf_counter() - start
+
+    return {
+        "rows": rows,
+        "quarantined": len(quarantined),
+        "validateSeconds": round(validate_seconds, 3),
+        "rowsPerSecond": round(rows / validate_seconds),
+        "stagingWriteSeconds": round(staging_seconds, 3),
+        "overheadVsStaging": round(validate_seconds / staging_seconds, 3),
+        **{f"rule {name}": n for name, n in counts.items()},
+    }
@@ -0,0 +1,152 @@
+import logging
+from collections.abc import Iterable
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import text
+
+from .config import WAREHOUSE_SETTINGS
+from .db import get_warehouse_engine
+
+logger = logging.getLogger(__name__)
+
+# FactSales foreign key indexes (declared in warehouse_models and migration 0003).
+# Loads into empty partitions drop them first and rebuild them once, which is
+# much cheaper than maintaining four indexes row by row.
+FACT_SALES_FK_INDEXES = {
+    "FactSales_userId_idx": "userId",
+    "FactSales_productId_idx": "productId",
+    "FactSales_deliveryDateId_idx": "deliveryDateId",
+    "FactSales_deliveryRiderId_idx": "deliveryRiderId",
+}
+
+# Serializes partition creation between concurrent loads (any constant works)
+PARTITION_LOCK_ID = 4_202_510
+
+# Month partitions known to exist in this process
+_fact_partitions: set[date] = set()
+
+
+def physical_design_enabled() -> bool:
+    """Physical design steps need a direct Postgres connection (WAREHOUSE_DB_URL)."""
+    return bool(WAREHOUSE_SETTINGS.db_url)
+
+
+def ensure_source_systems(tags: Iterable[str]) -> None:
+    """Add the sourceSystem tags missing from the source_system enum."""
+    engine = get_warehouse_engine()
+    with engine.connect() as conn:
+        existing = set(
+            conn.execute(
+                text("SELECT unnest(enum_range(NULL::source_system))::text")
+            ).scalars()
+        )
+    missing = sorted(set(tags) - existing)
+    if not missing:
+        return
+
+    # ADD VALUE can't run inside a transaction block on older Postgres
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for tag in missing:
+            quoted = tag.replace("'", "''")
+            conn.execute(
+                text(f"ALTER TYPE source_system ADD VALUE IF NOT EXISTS '{quoted}'")
+            )
+    logger.info(f"Added {missing} to the source_system enum")
+
+
+def fact_partition_name(month: date) -> str:
+    return f"FactSales_y{month.year}m{month.month:02d}"
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def ensure_fact_partitions(delivery_dates: Iterable) -> None:
+    """Create the monthly FactSales partitions the given delivery dates fall into."""
+    months = {
+        ts.date().replace(day=1)
+        for ts in pd.to_datetime(pd.Series(list(delivery_dates))).dropna()
+    }
+    missing = sorted(months - _fact_partitions)
+    if not missing:
+        return
+
+    with get_warehouse_engine().begin() as conn:
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"), {"id": PARTITION_LOCK_ID}
+        )
+        for month in missing:
+            conn.execute(
+                text(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS "{fact_partition_name(month)}"
+                    PARTITION OF "FactSales"
+                    FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')
+                    """
+                )
+            )
+    _fact_partitions.update(missing)
+    logger.debug(f"Ensured FactSales partitions for {[m.isoformat() for m in missing]}")
+
+
+def filled_fact_months(months: Iterable[date]) -> set[date]:
+    """The given months whose FactSales partition already holds rows."""
+    filled = set()
+    with get_warehouse_engine().connect() as conn:
+        for month in months:
+            # Pruned to the month's partition, so this reads at most one row
+            if conn.execute(
+                text(
+                    """
+                    SELECT EXISTS (
+                        SELECT 1 FROM "FactSales"
+                        WHERE "deliveryDate" >= :low AND "deliveryDate" < :high
+                    )
+                    """
+                ),
+                {"low": month, "high": _next_month(month)},
+            ).scalar():
+                filled.add(month)
+    return filled
+
+
+def drop_fact_indexes() -> None:
+    """Drop the FactSales foreign key indexes before a bulk load."""
+    with get_warehouse_engine().begin() as conn:
+        for name in FACT_SALES_FK_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    logger.info("Dropped FactSales foreign key indexes for the bulk load")
+
+
+def create_fact_indexes() -> None:
+    """Create any missing FactSales foreign key indexes (on every partition)."""
+    with get_warehouse_engine().begin() as conn:
+        for name, column in FACT_SALES_FK_INDEXES.items():
+            conn.execute(
+                text(f'CREATE INDEX IF NOT EXISTS "{name}" ON "FactSales" ("{column}")')
+            )
+    logger.info("FactSales foreign key indexes are in place")
+
+
+def analyze_tables(loaded_rows: dict[str, int]) -> list[str]:
+    """
+    Refresh planner statistics of tables that just received a large load.
+    Returns the analyzed tables.
+    """
+    tables = [
+        table_name
+        for table_name, rows in loaded_rows.items()
+        if rows >= WAREHOUSE_SETTINGS.analyze_min_rows
+    ]
+    if not tables:
+        return []
+
+    with get_warehouse_engine().begin() as conn:
+        for table_name in tables:
+            conn.execute(text(f'ANALYZE "{table_name}"'))
+            logger.info(
+                f"Analyzed {table_name} ({loaded_rows[table_name]} rows loaded)"
+            )
+    return tables
@@ -1,8 +1,32 @@
-# from sqlalchemy import Column, Integer, String, Float, DateTime, Date, BigInteger, Enum
-# from sqlalchemy.ext.declarative import declarative_base
 import enum
+from datetime import date, datetime
+from typing import Any
 
-# Base = declarative_base()
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    SmallInteger,
+    String,
+    Text,
+    func,
+    text,
+    true,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+
+# Warehouse schema, owned by the Alembic migrations in etl/migrations
+class Base(DeclarativeBase):
+    pass
 
 
 class SourceSystem(enum.Enum):
@@ -11,87 +35,225 @@ class SourceSystem(enum.Enum):
 
 class RiderVehicleType(enum.Enum):
     MOTORCYCLE = "Motorcycle"
-    BIKE = "Bike"
-    TRIKE = "Trike"
+    BICYCLE = "Bicycle"
+    TRICYCLE = "Tricycle"
     CAR = "Car"
 
 
-# class DimUsers(Base):
-#     __tablename__ = "DimUsers"
-
-#     id = Column(BigInteger, primary_key=True, autoincrement=True)
-#     firstName = Column(String(255), nullable=False)
-#     lastName = Column(String(255), nullable=False)
-#     city = Column(String(255), nullable=False)
-#     country = Column(String(255), nullable=False)
-#     dateOfBirth = Column(Date, nullable=False)
-#     gender = Column(String(255), nullable=False)
-#     createdAt = Column(DateTime, nullable=False)
-#     updatedAt = Column(DateTime, nullable=False)
-#     sourceId = Column(BigInteger, nullable=False)
-#     sourceSystem = Column(Enum(SourceSystem), nullable=False)
-
-
-# class DimDate(Base):
-#     __tablename__ = "DimDate"
-
-#     id = Column(BigInteger, primary_key=True, autoincrement=True)
-#     fullDate = Column(Date, nullable=False, unique=True)
-#     year = Column(Integer, nullable=False)
-#     month = Column(Integer, nullable=False)
-#     day = Column(Integer, nullable=False)
-#     monthName = Column(String(255), nullable=False)
-#     dayOfTheWeek = Column(String(255), nullable=False)
-#     quarter = Column(String(255), nullable=False)
-
-
-# class DimRiders(Base):
-#     __tablename__ = "DimRiders"
-
-#     id = Column(BigInteger, primary_key=True, autoincrement=True)
-#     firstName = Column(String(255), nullable=False)
-#     lastName = Column(String(255), nullable=False)
-#     vehicleType = Column(String(255), nullable=False)
-#     courierName = Column(String(255), nullable=False)
-#     age = Column(Integer, nullable=False)
-#     gender = Column(String(255), nullable=False)
-#     createdAt = Column(DateTime, nullable=False)
-#     updatedAt = Column(DateTime, nullable=False)
-#     sourceId = Column(BigInteger, nullable=False)
-#     sourceSystem = Column(Enum(SourceSystem), nullable=False)
-
-
-# class DimProducts(Base):
-#     __tablename__ = "DimProducts"
-
-#     id = Column(BigInteger, primary_key=True, autoincrement=True)
-#     productCode = Column(String(255), nullable=False)
-#     category = Column(String(255), nullable=False)
-#     description = Column(String(255))
-#     name = Column(String(255), nullable=False)
-#     price = Column(Float, nullable=False)
-#     createdAt = Column(DateTime, nullable=False)
-#     updatedAt = Column(DateTime, nullable=False)
-#     sourceId = Column(BigInteger, nullable=False)
-#     sourceSystem = Column(Enum(SourceSystem), nullable=False)
-
-
-# class FactSales(Base):
-#     __tablename__ = "FactSales"
-
-#     id = Column(BigInteger, primary_key=True, autoincrement=True)
-#     userId = Column(BigInteger, nullable=False)
-#     deliveryDateId = Column(BigInteger, nullable=False)
-#     deliveryRiderId = Column(BigInteger, nullable=False)
-#     productId = Column(BigInteger, nullable=False)
-#     quantitySold = Column(BigInteger, nullable=False)
-#     createdAt = Column(DateTime, nullable=False)
-#     sourceId = Column(BigInteger, nullable=False)
-#     sourceSystem = Column(Enum(SourceSystem), nullable=False)
-
-
-# class ETLControl(Base):
-#     __tablename__ = "ETLControl"
-
-#     tableName = Column(String(255), primary_key=True)
-#     lastLoadTime = Column(DateTime, nullable=False)
+def _enum_values(enum_class) -> list[str]:
+    return [member.value for member in enum_class]
+
+
+# Postgres enums store the values ("MySQL"), not the member names
+source_system_enum = Enum(
+    SourceSystem, name="source_system", values_callable=_enum_values
+)
+rider_vehicle_type_enum = Enum(
+    RiderVehicleType, name="rider_vehicle_type", values_callable=_enum_values
+)
+
+
+# Dimension rows are versions of source rows (see scd.py and migration 0005)
+class DimUsers(Base):
+    __tablename__ = "DimUsers"
+    __table_args__ = (
+        Index(
+            "DimUsers_natural_key", "sourceSystem", "sourceId", "validFrom", unique=True
+        ),
+        Index(
+            "DimUsers_current",
+            "sourceSystem",
+            "sourceId",
+            unique=True,
+            postgresql_where=text('"isCurrent"'),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    firstName: Mapped[str] = mapped_column(String())
+    lastName: Mapped[str] = mapped_column(String())
+    city: Mapped[str] = mapped_column(String())
+    country: Mapped[str] = mapped_column(String())
+    dateOfBirth: Mapped[date] = mapped_column(Date)
+    gender: Mapped[str] = mapped_column(String())
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
+    sourceId: Mapped[int] = mapped_column(BigInteger)
+    sourceSystem: Mapped[SourceSystem] = mapped_column(source_system_enum)
+    validFrom: Mapped[datetime] = mapped_column(DateTime)
+    validTo: Mapped[datetime | None] = mapped_column(DateTime)
+    isCurrent: Mapped[bool] = mapped_column(Boolean, server_default=true())
+
+
+class DimDate(Base):
+    __tablename__ = "DimDate"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    fullDate: Mapped[date] = mapped_column(Date, unique=True)
+    year: Mapped[int] = mapped_column(SmallInteger)
+    month: Mapped[int] = mapped_column(SmallInteger)
+    day: Mapped[int] = mapped_column(SmallInteger)
+    monthName: Mapped[str] = mapped_column(String())
+    dayOfTheWeek: Mapped[str] = mapped_column(String())
+    quarter: Mapped[str] = mapped_column(String())
+
+
+class DimRiders(Base):
+    __tablename__ = "DimRiders"
+    __table_args__ = (
+        Index(
+            "DimRiders_natural_key",
+            "sourceSystem",
+            "sourceId",
+            "validFrom",
+            unique=True,
+        ),
+        Index(
+            "DimRiders_current",
+            "sourceSystem",
+            "sourceId",
+            unique=True,
+            postgresql_where=text('"isCurrent"'),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    firstName: Mapped[str] = mapped_column(String())
+    lastName: Mapped[str] = mapped_column(String())
+    vehicleType: Mapped[RiderVehicleType] = mapped_column(rider_vehicle_type_enum)
+    courierName: Mapped[str] = mapped_column(String())
+    age: Mapped[int] = mapped_column(SmallInteger)
+    gender: Mapped[str] = mapped_column(String())
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
+    sourceId: Mapped[int] = mapped_column(BigInteger)
+    sourceSystem: Mapped[SourceSystem] = mapped_column(source_system_enum)
+    validFrom: Mapped[datetime] = mapped_column(DateTime)
+    validTo: Mapped[datetime | None] = mapped_column(DateTime)
+    isCurrent: Mapped[bool] = mapped_column(Boolean, server_default=true())
+
+
+class DimProducts(Base):
+    __tablename__ = "DimProducts"
+    __table_args__ = (
+        Index(
+            "DimProducts_natural_key",
+            "sourceSystem",
+            "sourceId",
+            "validFrom",
+            unique=True,
+        ),
+        Index(
+            "DimProducts_current",
+            "sourceSystem",
+            "sourceId",
+            unique=True,
+            postgresql_where=text('"isCurrent"'),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    productCode: Mapped[str] = mapped_column(String())
+    category: Mapped[str] = mapped_column(String())
+    description: Mapped[str | None] = mapped_column(String())
+    name: Mapped[str] = mapped_column(String())
+    price: Mapped[float] = mapped_column(Float)
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    updatedAt: Mapped[datetime] = mapped_column(DateTime)
+    sourceId: Mapped[int] = mapped_column(BigInteger)
+    sourceSystem: Mapped[SourceSystem] = mapped_column(source_system_enum)
+    validFrom: Mapped[datetime] = mapped_column(DateTime)
+    validTo: Mapped[datetime | None] = mapped_column(DateTime)
+    isCurrent: Mapped[bool] = mapped_column(Boolean, server_default=true())
+
+
+class FactSales(Base):
+    """
+    Range-partitioned by delivery month (one FactSales_yYYYYmMM table per month).
+    Postgres requires the partition key in every unique key, so it is part of
+    the primary and natural keys.
+    """
+
+    __tablename__ = "FactSales"
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "deliveryDate"),
+        Index(
+            "FactSales_natural_key",
+            "sourceSystem",
+            "sourceId",
+            "productId",
+            "deliveryDate",
+            unique=True,
+        ),
+        # Foreign key indexes, dropped and rebuilt around full loads (see warehouse.py)
+        Index("FactSales_userId_idx", "userId"),
+        Index("FactSales_productId_idx", "productId"),
+        Index("FactSales_deliveryDateId_idx", "deliveryDateId"),
+        Index("FactSales_deliveryRiderId_idx", "deliveryRiderId"),
+        {"postgresql_partition_by": 'RANGE ("deliveryDate")'},
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, autoincrement=True)
+    userId: Mapped[int] = mapped_column(BigInteger, ForeignKey("DimUsers.id"))
+    deliveryDateId: Mapped[int] = mapped_column(BigInteger, ForeignKey("DimDate.id"))
+    deliveryRiderId: Mapped[int] = mapped_column(BigInteger, ForeignKey("DimRiders.id"))
+    productId: Mapped[int] = mapped_column(BigInteger, ForeignKey("DimProducts.id"))
+    deliveryDate: Mapped[date] = mapped_column(Date)
+    quantitySold: Mapped[int] = mapped_column(BigInteger)
+    createdAt: Mapped[datetime] = mapped_column(DateTime)
+    sourceId: Mapped[int] = mapped_column(BigInteger)
+    sourceSystem: Mapped[SourceSystem] = mapped_column(source_system_enum)
+
+
+class ETLControl(Base):
+    __tablename__ = "ETLControl"
+
+    tableName: Mapped[str] = mapped_column(Text, primary_key=True)
+    sourceName: Mapped[str] = mapped_column(Text, primary_key=True)
+    lastLoadTime: Mapped[datetime] = mapped_column(DateTime)
+
+
+class ETLPartitions(Base):
+    """Work queue of distributed runs (see distributed.py)."""
+
+    __tablename__ = "ETLPartitions"
+    __table_args__ = (Index("ETLPartitions_claim", "status", "phase", "id"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    runId: Mapped[str] = mapped_column(Text)
+    sourceName: Mapped[str] = mapped_column(Text)
+    tableName: Mapped[str] = mapped_column(Text)
+    phase: Mapped[int] = mapped_column(SmallInteger)
+    low: Mapped[int] = mapped_column(BigInteger)
+    high: Mapped[int] = mapped_column(BigInteger)
+    since: Mapped[datetime | None] = mapped_column(DateTime)
+    watermark: Mapped[datetime] = mapped_column(DateTime)
+    status: Mapped[str] = mapped_column(Text, server_default="pending")
+    leaseOwner: Mapped[str | None] = mapped_column(Text)
+    leaseExpiresAt: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    attempts: Mapped[int] = mapped_column(Integer, server_default="0")
+    rows: Mapped[int | None] = mapped_column(Integer)
+    error: Mapped[str | None] = mapped_column(Text)
+    updatedAt: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class ETLQuarantine(Base):
+    """Transformed rows that failed validation (see validate.py)."""
+
+    __tablename__ = "ETLQuarantine"
+    __table_args__ = (
+        Index("ETLQuarantine_run", "runId", "tableName", "sourceSystem", "sourceId"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    runId: Mapped[str] = mapped_column(Text)
+    tableName: Mapped[str] = mapped_column(Text)
+    sourceSystem: Mapped[str | None] = mapped_column(Text)
+    sourceId: Mapped[int | None] = mapped_column(BigInteger)
+    rules: Mapped[list[str]] = mapped_column(ARRAY(Text))
+    record: Mapped[dict[str, Any]] = mapped_column(JSONB)
+    quarantinedAt: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
@@ -0,0 +1,155 @@
+from collections.abc import Callable
+from typing import Any
+
+import pandas as pd
+import pytest
+
+from src import db
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """The subset of the PostgREST query builder the ETL uses, over DataFrames."""
+
+    def __init__(self, client: "FakeSupabase", table_name: str):
+        self.client = client
+        self.table_name = table_name
+        self.action = "select"
+        self.columns: list[str] | None = None
+        self.filters: list[tuple[str, Callable[[pd.Series], pd.Series]]] = []
+        self.ordering: tuple[str, bool] | None = None
+        self.row_limit: int | None = None
+        self.row_range: tuple[int, int] | None = None
+        self.payload: Any = None
+        self.on_conflict: str | None = None
+
+    def select(self, columns: str = "*", count=None):
+        self.columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def _filter(self, column, check):
+        self.filters.append((column, check))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda s: s == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda s: s != value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda s: s > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda s: s >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda s: s < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda s: s <= value)
+
+    def in_(self, column, values):
+        return self._filter(column, lambda s: s.isin(list(values)))
+
+    def order(self, column, desc=False):
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, n):
+        self.row_limit = n
+        return self
+
+    def range(self, start, end):
+        self.row_range = (start, end)
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.action, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def _mask(self, df: pd.DataFrame) -> pd.Series:
+        mask = pd.Series(True, index=df.index)
+        for column, check in self.filters:
+            if column not in df:
+                return pd.Series(False, index=df.index)
+            mask &= check(df[column]).fillna(False).astype(bool)
+        return mask
+
+    def execute(self) -> FakeResponse:
+        df = self.client.tables.setdefault(self.table_name, pd.DataFrame())
+        if self.action in ("insert", "upsert"):
+            return FakeResponse(self.client.write(self.table_name, self))
+        mask = self._mask(df)
+        if self.action == "delete":
+            self.client.tables[self.table_name] = df[~mask].reset_index(drop=True)
+            return FakeResponse(df[mask].to_dict("records"))
+        if self.action == "update":
+            for column, value in self.payload.items():
+                df.loc[mask, column] = value
+            return FakeResponse(df[mask].to_dict("records"))
+
+        rows = df[mask]
+        if self.ordering:
+            rows = rows.sort_values(self.ordering[0], ascending=not self.ordering[1])
+        if self.row_range:
+            rows = rows.iloc[self.row_range[0] : self.row_range[1] + 1]
+        if self.row_limit is not None:
+            rows = rows.iloc[: self.row_limit]
+        if self.columns and self.columns != ["*"]:
+            rows = rows[self.columns]
+        records = [
+            {k: (None if v is pd.NA else v) for k, v in row.items()}
+            for row in rows.astype(object).where(rows.notna(), None).to_dict("records")
+        ]
+        return FakeResponse(records, count=int(mask.sum()))
+
+
+class FakeSupabase:
+    """In-memory stand-in for the Supabase client; ids are assigned on insert."""
+
+    def __init__(self):
+        self.tables: dict[str, pd.DataFrame] = {}
+        self.next_id = 1
+
+    def table(self, table_name: str) -> FakeQuery:
+        return FakeQuery(self, table_name)
+
+    def write(self, table_name: str, query: FakeQuery) -> list[dict]:
+        rows = [dict(row) for row in query.payload]
+        for row in rows:
+            if "id" not in row:
+                row["id"] = self.next_id
+                self.next_id += 1
+        new = pd.DataFrame(rows)
+        old = self.tables.get(table_name, pd.DataFrame())
+        if query.on_conflict and not old.empty:
+            keys = [c.strip() for c in query.on_conflict.split(",")]
+            replaced = old.set_index(keys).index.isin(new.set_index(keys).index)
+            old = old[~replaced]
+        self.tables[table_name] = pd.concat([old, new], ignore_index=True)
+        return rows
+
+
+@pytest.fixture
+def supabase(monkeypatch) -> FakeSupabase:
+    client = FakeSupabase()
+    monkeypatch.setattr(db, "_supabase_client", client)
+    return client
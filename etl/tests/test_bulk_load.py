@@ -0,0 +1,56 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from src import pipeline
+from src.config import SOURCE_SETTINGS
+from src.memory import MemoryGovernor
+from src.staging import write_frame_parts
+
+
+@pytest.fixture
+def index_calls(supabase, monkeypatch) -> list[str]:
+    calls: list[str] = []
+    monkeypatch.setattr(pipeline, "physical_design_enabled", lambda: True)
+    monkeypatch.setattr(pipeline, "load_fact_sales", lambda *args, **kwargs: None)
+    monkeypatch.setattr(pipeline, "resolve_quarantine", lambda *args: 0)
+    monkeypatch.setattr(pipeline, "drop_fact_indexes", lambda: calls.append("drop"))
+    monkeypatch.setattr(pipeline, "create_fact_indexes", lambda: calls.append("create"))
+    return calls
+
+
+def load_facts(tmp_path, monkeypatch, filled: set[date]) -> set[date]:
+    """Load staged facts of January and February 2025; returns the months checked."""
+    checked: set[date] = set()
+
+    def filled_fact_months(months):
+        checked.update(months)
+        return filled & set(months)
+
+    monkeypatch.setattr(pipeline, "filled_fact_months", filled_fact_months)
+    facts = pd.DataFrame(
+        {"deliveryDate": pd.to_datetime(["2025-01-31", "2025-02-01", None])}
+    )
+    write_frame_parts(
+        tmp_path, "validate", f"{SOURCE_SETTINGS.name}/FactSales", iter([facts])
+    )
+    pipeline._load_tables(tmp_path, ["FactSales"], MemoryGovernor(budget_mb=0))
+    return checked
+
+
+def test_indexes_are_dropped_when_only_empty_partitions_are_loaded(
+    tmp_path, monkeypatch, index_calls
+):
+    checked = load_facts(tmp_path, monkeypatch, filled={date(2024, 12, 1)})
+
+    assert checked == {date(2025, 1, 1), date(2025, 2, 1)}
+    assert index_calls == ["drop", "create"]
+
+
+def test_indexes_are_kept_when_a_loaded_partition_holds_rows(
+    tmp_path, monkeypatch, index_calls
+):
+    load_facts(tmp_path, monkeypatch, filled={date(2025, 2, 1)})
+
+    assert index_calls == []
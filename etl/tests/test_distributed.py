@@ -0,0 +1,48 @@
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import mysql
+
+from src import distributed
+from src.extract import build_joined_query, build_table_query
+from src.source_models import User
+
+
+def test_heartbeat_renews_the_lease_while_the_partition_is_processed(monkeypatch):
+    renewals = []
+    monkeypatch.setattr(
+        distributed,
+        "renew_lease",
+        lambda partition, worker_id, lease_seconds: renewals.append(partition["id"]),
+    )
+
+    with distributed.LeaseHeartbeat({"id": 7}, "w1", lease_seconds=0.03) as heartbeat:
+        time.sleep(0.1)
+        heartbeat.check()
+
+    assert len(renewals) >= 2
+    assert set(renewals) == {7}
+
+
+def test_heartbeat_check_raises_once_the_lease_is_lost(monkeypatch):
+    def renew_lease(partition, worker_id, lease_seconds):
+        raise RuntimeError(f"Lost the lease on partition {partition['id']}")
+
+    monkeypatch.setattr(distributed, "renew_lease", renew_lease)
+
+    with distributed.LeaseHeartbeat({"id": 7}, "w1", lease_seconds=0.03) as heartbeat:
+        time.sleep(0.05)
+        with pytest.raises(RuntimeError, match="Lost the lease"):
+            heartbeat.check()
+
+
+def test_partitions_extract_up_to_the_run_watermark():
+    watermark = datetime(2025, 2, 1, 12, 0)
+
+    query = build_table_query(User, "2025-01-01T00:00:00", until=watermark)
+    joined, params = build_joined_query(id_range=(0, 100), until=watermark)
+
+    assert "`Users`.`updatedAt` <=" in str(query.compile(dialect=mysql.dialect()))
+    assert "o.updatedAt <= :until AND oi.updatedAt <= :until" in str(joined)
+    assert params["until"] == watermark
@@ -0,0 +1,41 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src import memory
+from src.memory import MemoryGovernor, RSSSampler
+
+
+def test_sampler_keeps_the_highest_rss_seen_while_running(monkeypatch):
+    samples = iter([100.0, 180.0])
+    monkeypatch.setattr(memory, "get_rss_mb", lambda: next(samples, 120.0))
+
+    with RSSSampler(interval=0.01) as sampler:
+        time.sleep(0.1)
+
+    assert sampler.peak_mb == 180.0
+
+
+def test_stage_reports_stage_rss_apart_from_the_process_peak(monkeypatch):
+    monkeypatch.setattr(memory, "get_rss_mb", lambda: 150.0)
+    monkeypatch.setattr(memory, "get_process_peak_rss_mb", lambda: 900.0)
+    governor = MemoryGovernor(budget_mb=0)
+
+    with governor.stage("transform"):
+        pass
+
+    assert governor.peaks["transform"]["rss_mb"] == 150.0
+    assert governor.peaks["transform"]["process_rss_mb"] == 900.0
+
+
+def test_frames_tracked_from_several_threads_are_all_counted():
+    governor = MemoryGovernor(budget_mb=0)
+    frames = [pd.DataFrame({"id": range(1000)}) for _ in range(200)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(governor.track, frames))
+
+    assert governor.live_bytes() == sum(memory.frame_bytes(df) for df in frames)
+    del frames
+    assert governor.live_bytes() == 0
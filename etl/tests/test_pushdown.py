@@ -0,0 +1,68 @@
+import pandas as pd
+
+from src.pushdown import finish_frame
+
+CREATED = pd.Timestamp("2025-01-06 07:00:00")
+
+# Lowercased labels as they reach clean_label's capitalization, with word
+# boundaries of every kind str.title() recognizes (punctuation, digits,
+# underscores, accented and non-Latin letters)
+LABELS = [
+    "",
+    "bicycle",
+    "motor-cycle",
+    "e-bike",
+    "4x4 car",
+    "car_pool",
+    "o'neil",
+    "tuk tuk",
+    "éclair-été",
+    "motor-é",
+    "straße",
+    "łódź-koło",
+    "ψ-car",
+    "x²y",
+]
+
+
+def capitalize_like_mysql(label: str) -> str:
+    """CONCAT(UPPER(LEFT(label, 1)), SUBSTRING(label, 2)), as clean_label does."""
+    return label[:1].upper() + label[1:]
+
+
+def rider_rows(vehicle_types: list[str], genders: list[str]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "firstName": "Ana",
+            "lastName": "Garcia",
+            "vehicleType": vehicle_types,
+            "courierName": "",
+            "age": 24,
+            "gender": genders,
+            "createdAt": CREATED,
+            "updatedAt": CREATED,
+            "sourceId": range(len(vehicle_types)),
+        }
+    )
+
+
+def test_finish_frame_title_cases_like_str_title():
+    df = rider_rows(
+        [capitalize_like_mysql(label) for label in LABELS],
+        [capitalize_like_mysql(label) for label in reversed(LABELS)],
+    )
+
+    result = finish_frame("riders", df, "MySQL")
+
+    assert result["vehicleType"].tolist() == [label.title() for label in LABELS]
+    assert result["gender"].tolist() == [label.title() for label in reversed(LABELS)]
+    assert (result["sourceSystem"] == "MySQL").all()
+
+
+def test_finish_frame_title_cases_object_columns_too():
+    labels = pd.Series([capitalize_like_mysql(label) for label in LABELS], dtype=object)
+    df = rider_rows(labels, labels)
+
+    result = finish_frame("riders", df, "MySQL")
+
+    assert result["vehicleType"].tolist() == [label.title() for label in LABELS]
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import pipeline, reconcile
+from src.config import SOURCE_SETTINGS
+from src.memory import MemoryGovernor
+from src.staging import write_frame_parts
+from src.validate import fetch_quarantined_keys, insert_quarantine
+
+TAG = SOURCE_SETTINGS.source_system
+NAME = SOURCE_SETTINGS.name
+
+
+def riders(source_ids: list[int]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "firstName": "Ana",
+            "lastName": "Garcia",
+            "vehicleType": "Bicycle",
+            "courierName": "Lalamove",
+            "age": 24,
+            "gender": "Female",
+            "createdAt": pd.Timestamp("2025-01-06 07:00:00"),
+            "updatedAt": pd.Timestamp("2025-01-06 07:00:00"),
+            "sourceId": source_ids,
+            "sourceSystem": TAG,
+        }
+    )
+
+
+def facts(pairs: list[tuple[int, int]]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "userId": 1,
+            "deliveryDateId": 1,
+            "deliveryRiderId": 1,
+            "productId": [product for _, product in pairs],
+            "deliveryDate": pd.Timestamp("2025-02-01"),
+            "quantitySold": 1,
+            "createdAt": pd.Timestamp("2025-01-30 14:00:00"),
+            "sourceId": [order for order, _ in pairs],
+            "sourceSystem": TAG,
+        }
+    )
+
+
+def quarantine(run_id: str, table_name: str, df: pd.DataFrame) -> None:
+    insert_quarantine(run_id, table_name, df.assign(rules="allowed:vehicleType"))
+
+
+def load_run(tmp_path, monkeypatch, run_id: str, table_name: str, df: pd.DataFrame):
+    """Load a staged, validated table of a later run through the pipeline."""
+    monkeypatch.setattr(pipeline, "load_dimension", lambda *args, **kwargs: None)
+    monkeypatch.setattr(pipeline, "load_fact_sales", lambda *args, **kwargs: None)
+    monkeypatch.setattr(pipeline, "physical_design_enabled", lambda: False)
+    monkeypatch.setattr(pipeline, "get_last_load_times", lambda name: {})
+
+    run_dir = tmp_path / run_id
+    write_frame_parts(run_dir, "validate", f"{NAME}/{table_name}", iter([df]))
+    pipeline._load_tables(run_dir, [table_name], MemoryGovernor(budget_mb=0))
+
+
+def reconciled_exclusions(monkeypatch, table_name: str) -> np.ndarray:
+    """The keys reconcile leaves out of the checksums of `table_name`."""
+    calls = []
+
+    def find_mismatched_ranges(*args, excluded=None, **kwargs):
+        calls.append(excluded)
+        return []
+
+    monkeypatch.setattr(reconcile, "get_key_upper_bound", lambda *args: 1)
+    monkeypatch.setattr(reconcile, "find_mismatched_ranges", find_mismatched_ranges)
+    reconcile.reconcile([table_name], repair=False)
+    return calls[0]
+
+
+def test_loading_a_quarantined_key_in_a_later_run_resolves_it(
+    supabase, tmp_path, monkeypatch
+):
+    quarantine("run1", "DimRiders", riders([3, 4]))
+    assert fetch_quarantined_keys("DimRiders", TAG).tolist() == [3, 4]
+
+    load_run(tmp_path, monkeypatch, "run2", "DimRiders", riders([3]))
+
+    assert fetch_quarantined_keys("DimRiders", TAG).tolist() == [4]
+    assert reconciled_exclusions(monkeypatch, "DimRiders").tolist() == [4]
+
+
+def test_fact_quarantine_is_resolved_per_order_item(supabase, tmp_path, monkeypatch):
+    quarantine("run1", "FactSales", facts([(5, 7), (5, 8), (6, 7)]))
+
+    # Only item (5, 7) is fixed; order 5 still has a quarantined item
+    load_run(tmp_path, monkeypatch, "run2", "FactSales", facts([(5, 7), (6, 7)]))
+
+    remaining = supabase.tables["ETLQuarantine"]
+    assert [r["productId"] for r in remaining["record"]] == [8]
+    assert reconciled_exclusions(monkeypatch, "FactSales").tolist() == [5]
+
+
+def test_rows_quarantined_by_the_loading_run_are_kept(supabase, tmp_path, monkeypatch):
+    quarantine("run2", "DimRiders", riders([3]))
+
+    load_run(tmp_path, monkeypatch, "run2", "DimRiders", riders([3]))
+
+    assert fetch_quarantined_keys("DimRiders", TAG).tolist() == [3]
+
+
+@pytest.fixture(autouse=True)
+def quarantine_table(supabase):
+    supabase.tables["ETLQuarantine"] = pd.DataFrame(
+        columns=["id", "runId", "tableName", "sourceSystem", "sourceId", "rules"]
+    )
@@ -0,0 +1,139 @@
+import pandas as pd
+import pytest
+
+from src.transform_engines import assert_same_output, get_transform_engine
+
+TAG = "MySQL"
+CREATED = pd.Timestamp("2025-01-06 07:00:00")
+
+# Source rows shaped as the extract reads them: DATETIME columns as timestamps
+# or None (MySQL zero dates), with nulls, blanks, synonyms, padding and
+# unparseable dates in the text columns
+
+
+def users() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4, 5],
+            "firstName": ["Ana", None, "", "  Li ", "Bo"],
+            "lastName": ["Garcia", "Cruz", None, "", "Ng"],
+            "city": ["Manila", None, "", "Cebu", "Davao"],
+            "country": ["PH", "PH", None, "", "PH"],
+            "dateOfBirth": [
+                "1990-05-17",
+                "05/17/1990",
+                "0000-00-00",
+                None,
+                "17.05.1990",
+            ],
+            "gender": [" M", "f", "FEMALE", None, ""],
+            "createdAt": [CREATED, CREATED, None, None, CREATED],
+            "updatedAt": [CREATED, None, CREATED, CREATED, None],
+        }
+    )
+
+
+def products() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "productCode": ["P-1", None, "", "P-4"],
+            "category": [" Toy", "make up", None, "BAGS "],
+            "description": [None, "", "Soft", "Bag"],
+            "name": ["Bear", None, "Lipstick", ""],
+            "price": [9.5, None, 0.0, 12.25],
+            "createdAt": [CREATED, None, CREATED, CREATED],
+            "updatedAt": [CREATED, CREATED, None, None],
+        }
+    )
+
+
+def riders() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4, 5],
+            "firstName": ["Ana", None, "", "Li", "Bo"],
+            "lastName": ["Garcia", "", None, "Ng", "Ong"],
+            "vehicleType": ["motorbike", " Bike ", "TRIKE", None, "motor-cycle"],
+            "courierId": [1, 2, None, 99, 1],
+            "age": [24, None, 31, 40, 19],
+            "gender": ["m", "F", None, "", "female"],
+            "createdAt": [CREATED, CREATED, None, CREATED, CREATED],
+            "updatedAt": [CREATED, None, CREATED, CREATED, CREATED],
+        }
+    )
+
+
+def couriers() -> pd.DataFrame:
+    return pd.DataFrame({"id": [1, 2], "name": ["Lalamove", None]})
+
+
+def facts() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "order_id": [10, 10, 11, 12, 13],
+            "userId": [1, 1, None, 3, 4],
+            "deliveryDate": ["2025-02-01", "2025-02-01", "02/03/2025", "", None],
+            "deliveryRiderId": [1, 1, 2, None, 5],
+            "product_id": [1, 2, 3, None, 4],
+            "quantity": [2, 1, None, 5, 0],
+            "order_created": [CREATED, CREATED, None, None, CREATED],
+        }
+    )
+
+
+@pytest.fixture(scope="module")
+def dim_date() -> pd.DataFrame:
+    df = get_transform_engine("pandas").generate_dim_date()
+    df["id"] = range(1, len(df) + 1)
+    return df
+
+
+TRANSFORMS = {
+    "DimUsers": (users, lambda m, df, dim_date: m.transform_dim_users(df, TAG)),
+    "DimProducts": (
+        products,
+        lambda m, df, dim_date: m.transform_dim_products(df, TAG),
+    ),
+    "DimRiders": (
+        riders,
+        lambda m, df, dim_date: m.transform_dim_riders(df, couriers(), TAG),
+    ),
+    "FactSales": (
+        facts,
+        lambda m, df, dim_date: m.transform_fact_sales(df, dim_date, TAG),
+    ),
+}
+
+
+@pytest.mark.parametrize("table_name", TRANSFORMS)
+def test_polars_matches_pandas_on_messy_rows(table_name, dim_date):
+    frame_fn, transform_fn = TRANSFORMS[table_name]
+    pandas_engine = get_transform_engine("pandas")
+    polars_engine = get_transform_engine("polars")
+
+    assert_same_output(
+        transform_fn(pandas_engine, frame_fn(), dim_date),
+        transform_fn(polars_engine, frame_fn(), dim_date),
+        table_name,
+    )
+
+
+@pytest.mark.parametrize("table_name", TRANSFORMS)
+def test_polars_matches_pandas_on_empty_parts(table_name, dim_date):
+    frame_fn, transform_fn = TRANSFORMS[table_name]
+    empty = frame_fn().iloc[0:0]
+
+    assert_same_output(
+        transform_fn(get_transform_engine("pandas"), empty, dim_date),
+        transform_fn(get_transform_engine("polars"), empty, dim_date),
+        table_name,
+    )
+
+
+def test_generated_dim_date_matches():
+    assert_same_output(
+        get_transform_engine("pandas").generate_dim_date(),
+        get_transform_engine("polars").generate_dim_date(),
+        "DimDate",
+    )
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from src.validate import validate_frame
+
+
+def test_riders_without_a_courier_pass_validation():
+    df = pd.DataFrame(
+        {
+            "firstName": "Ana",
+            "lastName": "Garcia",
+            "vehicleType": "Bicycle",
+            "courierName": ["Lalamove", ""],
+            "age": 24,
+            "gender": "Female",
+            "createdAt": pd.Timestamp("2025-01-06 07:00:00"),
+            "updatedAt": pd.Timestamp("2025-01-06 07:00:00"),
+            "sourceId": [1, 2],
+            "sourceSystem": "MySQL",
+        }
+    )
+
+    valid, bad, counts = validate_frame("DimRiders", df)
+
+    assert valid["sourceId"].tolist() == [1, 2]
+    assert bad.empty
+    assert counts == {}
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pandas as pd
+
+from src import load
+from src.config import DEFAULT_SOURCE_NAME, MySQLSettings
+
+SINGLE_SOURCE_TAG = MySQLSettings().source_system
+
+
+def configure_sources(monkeypatch, *sources: MySQLSettings) -> None:
+    by_name = {source.name: source for source in sources}
+    monkeypatch.setattr(load, "get_source_settings", lambda name: by_name[name])
+
+
+def test_watermarks_are_kept_per_source(supabase, monkeypatch):
+    configure_sources(
+        monkeypatch,
+        MySQLSettings(name="main"),
+        MySQLSettings(name="eu", source_system="EU"),
+    )
+    load.update_last_load_time("FactSales", datetime(2025, 2, 1), "main")
+    load.update_last_load_time("FactSales", datetime(2025, 3, 1), "eu")
+    load.update_last_load_time("FactSales", datetime(2025, 3, 2), "eu")
+
+    assert len(supabase.tables["ETLControl"]) == 2
+    assert load.get_last_load_times("main")["FactSales"] == "2025-02-01T00:00:00"
+    assert load.get_last_load_times("eu")["FactSales"] == "2025-03-02T00:00:00"
+
+
+def test_single_source_watermarks_carry_over_to_the_source_with_its_tag(
+    supabase, monkeypatch
+):
+    configure_sources(
+        monkeypatch,
+        MySQLSettings(name="main", source_system=SINGLE_SOURCE_TAG),
+        MySQLSettings(name="eu", source_system=SINGLE_SOURCE_TAG + "-EU"),
+    )
+    supabase.tables["ETLControl"] = pd.DataFrame(
+        [
+            {
+                "tableName": "FactSales",
+                "sourceName": DEFAULT_SOURCE_NAME,
+                "lastLoadTime": "2025-02-01T00:00:00",
+            }
+        ]
+    )
+
+    assert load.get_last_load_times("main")["FactSales"] == "2025-02-01T00:00:00"
+    assert load.get_last_load_times("eu")["FactSales"] is None
+
+    load.update_last_load_time("FactSales", datetime(2025, 3, 1), "main")
+    assert load.get_last_load_times("main")["FactSales"] == "2025-03-01T00:00:00"